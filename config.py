@@ -75,3 +75,10 @@ PLUGINS_CONFIG = {
     #     ],
     # },
 }
+
+# Plugins listed here run in worker processes instead of the main process, which suits CPU-heavy plugins.
+# They still share the single connection and flood protection of the bot.
+ISOLATED_PLUGINS = []
+
+# Reload plugins, commands and this configuration when their files change, without reconnecting.
+HOT_RELOAD = False
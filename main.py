@@ -1,7 +1,7 @@
 import signal
 
 import config
-from plugins import PluginManager
+from plugins import PluginManager, PluginWatcher
 from ts3client import TS3Client
 from ts3client.utils.logger import create_logger
 
@@ -12,6 +12,8 @@ def main():
     def sigint_handler(sig, frame):
         logger.info("Stopping...")
         print("\nStopping...")
+        if plugin_watcher is not None:
+            plugin_watcher.stop()
         plugin_manager.stop()
         ts3_client.disconnect()
         logger.info("Stopped.")
@@ -38,9 +40,15 @@ def main():
         ts3_client.set_description(config.BOT_CONFIG["description"])
 
     print("Starting plugins...")
-    plugin_manager = PluginManager(ts3_client, config.PLUGINS_CONFIG)
+    plugin_manager = PluginManager(ts3_client, config.PLUGINS_CONFIG, isolated=getattr(config, "ISOLATED_PLUGINS", []))
     plugin_manager.run()
 
+    plugin_watcher = None
+    if getattr(config, "HOT_RELOAD", False):
+        print("Watching plugins and configuration for changes...")
+        plugin_watcher = PluginWatcher(plugin_manager, config)
+        plugin_watcher.start()
+
     signal.signal(signal.SIGINT, sigint_handler)
     print("Press Ctrl+C to exit")
 
@@ -1,2 +1,3 @@
 from .errors import ConfigurationError
+from .hot_reload import PluginWatcher
 from .plugin_manager import PluginManager
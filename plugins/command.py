@@ -4,7 +4,12 @@ from ts3client.utils.logger import create_logger
 
 
 class Command:
-    """Base class for all commands."""
+    """
+    Base class for all commands.
+    Subcommands map a word after the trigger to the name of the method that handles them, e.g. {"add": "run_add"}.
+    """
+
+    subcommands: dict[str, str] = {}
 
     def __init__(self, client: TS3Client, trigger: str, *args, **kwargs):
         self.client = client
@@ -14,6 +19,9 @@ class Command:
     def run(self):
         raise ImplementationError(self.__class__.__name__, "Command does not have a run() method.")
 
+    def cleanup(self) -> None:
+        """Called when the command handler stops, releases what the command holds, such as threads or connections."""
+
     def ready(self) -> None:
         """Broadcasts that the command is ready."""
         self.logger.info(f"{self.name} initialized.")
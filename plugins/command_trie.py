@@ -0,0 +1,65 @@
+from typing import Any, Optional
+
+
+class CommandTrie:
+    """
+    Maps triggers of one or more words to values. Every node is a dict of the next words, so resolving a message
+    costs a dict lookup per word of the matched trigger, no matter how many triggers there are.
+    The longest trigger wins, which lets subcommands such as "weather forecast" live next to "weather".
+    """
+
+    _VALUE = None
+
+    def __init__(self) -> None:
+        self._root: dict = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, trigger: str, value: Any) -> None:
+        """
+        Adds a trigger.
+
+        :param trigger: The trigger, words are separated by whitespace.
+        :type trigger: str
+        :param value: The value to resolve the trigger to.
+        :type value: Any
+        :raises ValueError: If the trigger is empty or already taken.
+        """
+        words = trigger.split()
+        if not words:
+            raise ValueError("A trigger needs at least one word.")
+
+        node = self._root
+        for word in words:
+            node = node.setdefault(word, {})
+        if self._VALUE in node:
+            raise ValueError(f"The trigger '{trigger}' is already taken.")
+        node[self._VALUE] = value
+        self._size += 1
+
+    def resolve(self, text: str) -> Optional[tuple[Any, str]]:
+        """
+        Finds the longest trigger at the start of a text.
+
+        :param text: The text, without the command prefix.
+        :type text: str
+        :return: The value of the trigger and the rest of the text, or None if no trigger matches.
+        :rtype: tuple[Any, str] | None
+        """
+        words = text.split()
+        node = self._root
+        match = None
+        for depth, word in enumerate(words, 1):
+            node = node.get(word)
+            if node is None:
+                break
+            if self._VALUE in node:
+                match = (node[self._VALUE], depth)
+        if match is None:
+            return None
+
+        value, depth = match
+        rest = text.split(None, depth)
+        return value, rest[depth] if len(rest) > depth else ""
@@ -20,7 +20,8 @@ class Help(Command):
             description = "No description available."
             if "description" in commands[c]:
                 description = commands[c]["description"]
-            commands_help.append(f"{prefix}{commands[c]['trigger']} - {description}")
+            aliases = "".join(f", {prefix}{alias}" for alias in commands[c].get("aliases", []))
+            commands_help.append(f"{prefix}{commands[c]['trigger']}{aliases} - {description}")
 
         help_text = "\nAvailable commands:\n\n" + "\n".join(commands_help)
         self.client.send_private_message(message.invokerid, help_text)
@@ -1,5 +1,11 @@
+import http.client
 import json
-import urllib.request
+import threading
+import time
+import urllib.error
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
 
 from ts3client import TS3Client
 from ts3client.message import Message
@@ -9,15 +15,158 @@ from ..command import Command
 API_URL = "http://api.weatherapi.com/v1"
 
 
+def normalize_location(location: str) -> str:
+    """Returns the cache key of a location, locations that only differ in case or whitespace share it."""
+    return " ".join(location.split()).casefold()
+
+
+class WeatherAPI:
+    """
+    A client for the current weather of WeatherAPI.com. Requests run on a small thread pool, every worker keeps its
+    HTTP connection open between requests. Responses are cached per normalized location for ttl seconds, and
+    concurrent requests for the same location share a single fetch. Expired responses are evicted when a response is
+    added, and at most max_entries responses are kept, the oldest ones are evicted first.
+
+    :param api_key: The API key for WeatherAPI.com.
+    :type api_key: str
+    :param url: The base URL of the API, defaults to API_URL.
+    :type url: str, optional
+    :param ttl: The number of seconds a response is cached, defaults to 600.
+    :type ttl: float, optional
+    :param workers: The number of concurrent requests, defaults to 4.
+    :type workers: int, optional
+    :param timeout: The timeout of a request in seconds, defaults to 10.
+    :type timeout: float, optional
+    :param max_entries: The maximum number of cached responses, defaults to 1000.
+    :type max_entries: int, optional
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        url: str = API_URL,
+        ttl: float = 600,
+        workers: int = 4,
+        timeout: float = 10,
+        max_entries: int = 1000,
+    ):
+        parts = urllib.parse.urlsplit(url)
+        self.api_key = api_key
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._scheme = parts.scheme
+        self._netloc = parts.netloc
+        self._path = parts.path.rstrip("/")
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="WeatherAPI")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Ordered by the time a response was added, so expired responses are at the front.
+        self._cache: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._pending: dict[str, Future] = {}
+
+    def fetch(self, location: str) -> Future:
+        """
+        Returns a future of the current weather for a location, without blocking.
+        The future is already done if the location is cached.
+
+        :param location: The location.
+        :type location: str
+        :return: A future of the decoded response, it raises urllib.error.HTTPError if the API rejected the request.
+        :rtype: Future[dict]
+        """
+        key = normalize_location(location)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and time.monotonic() - cached[0] < self.ttl:
+                future: Future = Future()
+                future.set_result(cached[1])
+                return future
+            if key in self._pending:
+                return self._pending[key]
+            future = self._pending[key] = self._executor.submit(self._fetch, key)
+        return future
+
+    def get(self, location: str) -> dict:
+        """Returns the current weather for a location, blocking until it is fetched."""
+        return self.fetch(location).result()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _fetch(self, key: str) -> dict:
+        try:
+            data = self._request(f"{self._path}/current.json?{urllib.parse.urlencode({'key': self.api_key, 'q': key})}")
+            with self._lock:
+                self._store(key, data, time.monotonic())
+            return data
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _store(self, key: str, data: dict, now: float) -> None:
+        self._cache[key] = (now, data)
+        self._cache.move_to_end(key)
+        # Every location a user types is a key, so the cache is pruned on every insert.
+        while self._cache and now - next(iter(self._cache.values()))[0] >= self.ttl:
+            self._cache.popitem(last=False)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def _request(self, path: str) -> dict:
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request("GET", path, headers={"Accept": "application/json"})
+                response = connection.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError) as error:
+                connection.close()
+                self._local.connection = None
+                # The server may have closed the kept-alive connection, retry once on a new one.
+                if attempt or isinstance(error, TimeoutError):
+                    raise
+                continue
+
+            if response.status != 200:
+                raise urllib.error.HTTPError(
+                    f"{self._scheme}://{self._netloc}{path}", response.status, response.reason, response.headers, None
+                )
+            return json.loads(body)
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            if self._scheme == "https":
+                connection = http.client.HTTPSConnection(self._netloc, timeout=self.timeout)
+            else:
+                connection = http.client.HTTPConnection(self._netloc, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+
 class Weather(Command):
     """Get the weather for a location."""
 
-    def __init__(self, client: TS3Client, trigger: str, api_key: str, *args, **kwargs):
+    def __init__(
+        self,
+        client: TS3Client,
+        trigger: str,
+        api_key: str,
+        *args,
+        api_url: str = API_URL,
+        cache_ttl: int = 600,
+        cache_size: int = 1000,
+        workers: int = 4,
+        **kwargs,
+    ):
         super().__init__(client, trigger)
         self.api_key = api_key
+        self.api = WeatherAPI(api_key, api_url, cache_ttl, workers, max_entries=cache_size)
 
     def run(self, message: Message):
         """Get the weather for a location.
+        The weather is fetched in the background, the answer is sent once it arrives.
 
         :param api_key: The API key for WeatherAPI.com.
         :type api_key: str
@@ -29,12 +178,26 @@ class Weather(Command):
 
         self.logger.info(f"User {message.invokername} triggered the weather command.")
         location = message.content.split(" ", 1)[1]
+        self.api.fetch(location).add_done_callback(lambda future: self.reply(message, future))
+
+    def cleanup(self) -> None:
+        self.api.close()
 
+    def reply(self, message: Message, future: Future) -> None:
+        """Answers a weather request once its data has been fetched."""
         try:
-            weather_data = self.get_weather_data(location)
+            weather_data = future.result()
+        except CancelledError:
+            # The command was cleaned up before the request ran, there is nobody left to answer.
+            self.logger.debug(f"Weather request of {message.invokername} was cancelled.")
+            return
         except urllib.error.HTTPError:
             self.client.send_private_message(message.invokerid, "Location not found.")
             return
+        except Exception as error:
+            self.logger.warning(f"Weather request failed: {error}")
+            self.client.send_private_message(message.invokerid, "The weather service is not available right now.")
+            return
 
         self.client.send_private_message(
             message.invokerid,
@@ -45,7 +208,4 @@ class Weather(Command):
         )
 
     def get_weather_data(self, location: str) -> dict:
-        api_endpoint = f"{API_URL}/current.json?key={self.api_key}&q={location}"
-        with urllib.request.urlopen(api_endpoint) as response:
-            data = json.loads(response.read())
-            return data
+        return self.api.get(location)
@@ -0,0 +1,145 @@
+import importlib
+import os
+import sys
+import threading
+from types import ModuleType
+from typing import Optional
+
+from ts3client.utils.logger import create_logger
+
+from . import commands as all_commands
+from . import plugins as all_plugins
+from .plugin_manager import PluginManager
+
+logger = create_logger("PluginWatcher", "logs/main.log")
+
+
+class PluginWatcher:
+    """
+    Watches the source files of the plugins and commands, and the configuration module, and applies changes to a
+    running plugin manager. A changed plugin or command is re-imported and the plugins that use it are restarted
+    against the same connection, a changed configuration is re-imported and applied with apply_config().
+    Files are compared by their modification time, so an editor that saves a file twice only causes a reload per poll.
+
+    :param manager: The plugin manager to apply changes to.
+    :type manager: PluginManager
+    :param config: The configuration module, defaults to None (configuration changes are not watched).
+    :type config: ModuleType, optional
+    :param interval: The number of seconds between checks, defaults to 1.
+    :type interval: float, optional
+    """
+
+    def __init__(self, manager: PluginManager, config: ModuleType = None, interval: float = 1) -> None:
+        self.manager = manager
+        self.config = config
+        self.interval = interval
+        self._mtimes: dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.check()
+
+    def start(self) -> None:
+        """Starts checking for changes on a background thread."""
+        self._thread = threading.Thread(target=self._watch, name="PluginWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def files(self) -> list[str]:
+        """Returns the files that are watched."""
+        files = []
+        for package in (all_plugins, all_commands):
+            directory = os.path.dirname(package.__file__)
+            files += [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith(".py")]
+        if self.config is not None:
+            files.append(self.config.__file__)
+        return [os.path.abspath(file) for file in files]
+
+    def check(self) -> list[str]:
+        """
+        Compares the modification times of the watched files with the previous check.
+
+        :return: The files that were added or changed since the previous check.
+        :rtype: list[str]
+        """
+        changed = []
+        for file in self.files():
+            try:
+                mtime = os.stat(file).st_mtime
+            except OSError:
+                continue
+            if file in self._mtimes and self._mtimes[file] != mtime:
+                changed.append(file)
+            elif file not in self._mtimes and self._mtimes:
+                changed.append(file)
+            self._mtimes[file] = mtime
+        return changed
+
+    def apply(self, changed: list[str]) -> None:
+        """
+        Reloads what depends on the changed files: the configuration is applied as a whole, the plugins that use a
+        changed module are reloaded with their current configuration.
+
+        :param changed: The changed files.
+        :type changed: list[str]
+        """
+        for package in (all_plugins, all_commands):
+            # The package exports the plugins and commands, a new one has to be imported before it can be used.
+            if os.path.abspath(package.__file__) in changed:
+                try:
+                    importlib.reload(package)
+                except Exception as e:
+                    logger.exception(f"Reloading {package.__name__} failed: {e}")
+
+        reloaded = []
+        if self.config is not None and os.path.abspath(self.config.__file__) in changed:
+            logger.info("The configuration changed, applying it...")
+            try:
+                importlib.reload(self.config)
+            except Exception as e:
+                logger.exception(f"Reloading the configuration failed, keeping the running plugins: {e}")
+            else:
+                reloaded = self.manager.apply_config(self.config.PLUGINS_CONFIG)
+
+        modules = {module_name(file) for file in changed}
+        for plugin_name in list(self.manager.plugins):
+            # A plugin whose configuration changed was already reloaded with the new source.
+            if plugin_name not in reloaded and modules & plugin_modules(plugin_name):
+                logger.info(f"The source of {plugin_name} changed, reloading it...")
+                self.manager.reload(plugin_name)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                changed = self.check()
+                if changed:
+                    self.apply(changed)
+            except Exception:
+                logger.exception("Applying changes failed.")
+
+
+def module_name(file: str) -> Optional[str]:
+    """Returns the name of the imported module of a file, or None if it was not imported."""
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        if path is not None and os.path.abspath(path) == file:
+            return name
+    return None
+
+
+def plugin_modules(plugin_name: str) -> set[str]:
+    """Returns the names of the modules a plugin is reloaded with, including the submodules of its packages."""
+    plugin_class = getattr(all_plugins, plugin_name, None)
+    if plugin_class is None:
+        # A plugin that is listed but does not exist yet, the package may start exporting it.
+        return {all_plugins.__name__}
+
+    packages = [*plugin_class.reload_modules, plugin_class.__module__]
+    return {
+        name
+        for name in list(sys.modules)
+        if any(name == package or name.startswith(f"{package}.") for package in packages)
+    }
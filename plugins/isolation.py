@@ -0,0 +1,324 @@
+import itertools
+import multiprocessing
+import threading
+from concurrent.futures import Future
+from typing import Callable, Iterable, Optional
+
+from ts3client import TS3Client
+from ts3client.event import Event
+from ts3client.message import Message
+from ts3client.ts3query.ts3query_command import CommandsWrapper, TS3QueryCommand
+from ts3client.ts3query.ts3query_response import TS3QueryResponse
+from ts3client.utils import patterns
+from ts3client.utils.logger import create_logger
+
+from .plugin import Plugin
+from .runtime import PluginRuntime
+
+logger = create_logger("PluginProcess", "logs/main.log")
+
+
+def encode_response(response: TS3QueryResponse) -> tuple[int, bytes]:
+    """Reduces a response to what is needed to parse it again, the regex match cannot be pickled."""
+    return response.index, response.response
+
+
+def decode_response(encoded: tuple[int, bytes]) -> TS3QueryResponse:
+    index, raw = encoded
+    return TS3QueryResponse(index, patterns.RESPONSE_END_BYTES.search(raw), raw)
+
+
+class QueryProxy:
+    """
+    Stands in for TS3Query in a plugin process and sends the commands to the parent process over a pipe.
+    Calls that are made while a previous call is being written are sent together in a single message, and the
+    parent sends all their commands in a single pipelined batch. Events and messages that the parent receives are
+    streamed to the proxy, which keeps them and runs its response hooks just like TS3Query does. The other methods
+    of TS3Query are called on the parent's query, except keep_alive(), which waits until the plugin is stopped.
+
+    :param connection: The end of the pipe in the plugin process.
+    :type connection: multiprocessing.connection.Connection
+    :param stop: Set when the parent asks the plugin to stop.
+    :type stop: threading.Event
+    """
+
+    def __init__(self, connection, stop: threading.Event, limit: int = 1000) -> None:
+        self.commands = CommandsWrapper(self)
+        self._connection = connection
+        self._stop = stop
+        self._limit = limit
+        self._ids = itertools.count()
+        self._pending: dict[int, Future] = {}
+        self._outbox: list[tuple[int, str, tuple]] = []
+        self._flushing = False
+        self._lock = threading.Lock()
+        self._events: list[Event] = []
+        self._messages: list[Message] = []
+        self._response_hooks: list[Callable] = []
+        self._reader = threading.Thread(target=self._read, name="QueryProxy-reader", daemon=True)
+        self._reader.start()
+
+    @property
+    def events(self) -> list[Event]:
+        return self._events
+
+    @property
+    def messages(self) -> list[Message]:
+        return self._messages
+
+    @property
+    def unread_events(self) -> list[Event]:
+        return [event for event in self._events if not event.used]
+
+    @property
+    def unread_messages(self) -> list[Message]:
+        return [message for message in self._messages if not message.used]
+
+    @property
+    def host(self) -> str:
+        return self._call("get", ("host",))
+
+    def connected(self) -> bool:
+        return not self._connection.closed
+
+    def login(self, login: str, password: str) -> Optional[TS3QueryResponse]:
+        encoded = self._call("call", ("login", (login, password)))
+        return decode_response(encoded) if encoded is not None else None
+
+    def logout(self) -> Optional[TS3QueryResponse]:
+        encoded = self._call("call", ("logout", ()))
+        return decode_response(encoded) if encoded is not None else None
+
+    def exit(self) -> None:
+        self._call("call", ("exit", ()))
+
+    def send(self, command: TS3QueryCommand, use_cache: bool = True) -> TS3QueryResponse:
+        return self.send_batch([command])[0]
+
+    def send_batch(self, commands: list[TS3QueryCommand]) -> list[TS3QueryResponse]:
+        if not commands:
+            return []
+        responses = [decode_response(encoded) for encoded in self._call("send", (commands,))]
+        for command, response in zip(commands, responses):
+            self._received(command, response)
+        return responses
+
+    def send_stream(self, command: TS3QueryCommand, body: Iterable[bytes]) -> TS3QueryResponse:
+        response = decode_response(self._call("stream", (command, list(body))))
+        self._received(command, response)
+        return response
+
+    def start_polling(self, polling_rate: float = 1) -> None:
+        self._call("call", ("start_polling", (polling_rate,)))
+
+    def stop_polling(self) -> None:
+        self._call("call", ("stop_polling", ()))
+
+    def keep_alive(self) -> None:
+        # Waiting for the parent's polling thread would block the calls of the plugin, the plugin lives until stopped.
+        self._stop.wait()
+
+    def add_response_hook(self, hook: Callable[[TS3QueryCommand, TS3QueryResponse], None]) -> None:
+        if hook not in self._response_hooks:
+            self._response_hooks.append(hook)
+
+    def remove_response_hook(self, hook: Callable[[TS3QueryCommand, TS3QueryResponse], None]) -> None:
+        if hook in self._response_hooks:
+            self._response_hooks.remove(hook)
+
+    def _call(self, kind: str, args: tuple):
+        future: Future = Future()
+        with self._lock:
+            call_id = next(self._ids)
+            self._pending[call_id] = future
+            self._outbox.append((call_id, kind, args))
+            flush, self._flushing = not self._flushing, True
+        if flush:
+            self._flush()
+        return future.result()
+
+    def _flush(self) -> None:
+        while True:
+            with self._lock:
+                calls, self._outbox = self._outbox, []
+                if not calls:
+                    self._flushing = False
+                    return
+            self._connection.send(("calls", calls))
+
+    def _read(self) -> None:
+        while True:
+            try:
+                kind, payload = self._connection.recv()
+            except (EOFError, OSError):
+                # The parent is gone, nothing will answer the pending calls.
+                self._stop.set()
+                with self._lock:
+                    pending, self._pending = self._pending, {}
+                for future in pending.values():
+                    future.set_exception(ConnectionError("The plugin process lost its connection to the bot."))
+                return
+
+            if kind == "results":
+                for call_id, error, result in payload:
+                    with self._lock:
+                        future = self._pending.pop(call_id)
+                    if error is not None:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(result)
+            elif kind == "responses":
+                for command, encoded in payload:
+                    self._received(command, decode_response(encoded))
+            elif kind == "stop":
+                self._stop.set()
+
+    def _received(self, command: TS3QueryCommand, response: TS3QueryResponse) -> None:
+        # Responses arrive on the reader thread and on the threads that made the calls.
+        with self._lock:
+            self._events = [event for event in self._events if not event.used][-self._limit :] + response.events
+            messages = [message for message in self._messages if not message.used]
+            self._messages = messages[-self._limit :] + response.messages
+        for hook in list(self._response_hooks):
+            try:
+                hook(command, response)
+            except Exception:
+                logger.exception("Response hook failed.")
+
+
+def run_isolated(plugin_class: type[Plugin], config: dict, connection) -> None:
+    """Runs a plugin in a plugin process, with a client whose query is a QueryProxy."""
+    stop = threading.Event()
+    client = TS3Client()
+    client.attach(QueryProxy(connection, stop))
+    plugin = plugin_class(client, stop)
+
+    if not plugin.scheduled:
+        plugin.run(**config)
+        return
+
+    runtime = PluginRuntime(client)
+    runtime.start()
+    runtime.add(plugin, config)
+    stop.wait()
+    runtime.stop()
+
+
+class PluginProcess:
+    """
+    Runs a plugin in a worker process, so its work does not compete for the GIL with the query reader.
+    The parent process keeps the only connection to the server: commands of the plugin are sent through the
+    client's query, so they share its lock and flood protection, and the events and messages of all responses are
+    streamed to the plugin.
+
+    :param client: The client of the parent process.
+    :type client: TS3Client
+    :param plugin_class: The plugin, it has to be importable in the worker process.
+    :type plugin_class: type[Plugin]
+    :param config: The configuration of the plugin.
+    :type config: dict
+    """
+
+    def __init__(self, client: TS3Client, plugin_class: type[Plugin], config: dict) -> None:
+        self.client = client
+        self.plugin_class = plugin_class
+        self.config = config
+        self.process: Optional[multiprocessing.Process] = None
+        self._connection = None
+        self._send_lock = threading.Lock()
+        self._serving = threading.local()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def name(self) -> str:
+        return self.plugin_class.__name__
+
+    def start(self) -> None:
+        """Starts the worker process and the thread that serves its calls."""
+        context = multiprocessing.get_context("spawn")
+        self._connection, child = context.Pipe()
+        self.process = context.Process(
+            target=run_isolated, args=(self.plugin_class, self.config, child), name=f"{self.name}-process", daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.client.query.add_response_hook(self._forward)
+        self._thread = threading.Thread(target=self._serve, name=f"{self.name}-proxy", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        """Asks the plugin to stop, and terminates the worker process if it does not exit within timeout seconds."""
+        self.client.query.remove_response_hook(self._forward)
+        try:
+            self._send(("stop", None))
+        except OSError:
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            logger.warning(f"{self.name} did not stop within {timeout} seconds, terminating it.")
+            self.process.terminate()
+            self.process.join()
+        self._connection.close()
+        self._thread.join(timeout)
+
+    def _send(self, message: tuple) -> None:
+        with self._send_lock:
+            self._connection.send(message)
+
+    def _serve(self) -> None:
+        self._serving.active = True
+        while True:
+            try:
+                _, calls = self._connection.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                self._send(("results", self._execute(calls)))
+            except OSError:
+                return
+
+    def _execute(self, calls: list[tuple[int, str, tuple]]) -> list[tuple[int, Optional[Exception], object]]:
+        # The commands of all calls that arrived together go out as one pipelined batch.
+        sends = [(call_id, args[0]) for call_id, kind, args in calls if kind == "send"]
+        commands = [command for _, batch in sends for command in batch]
+        results: dict[int, tuple[Optional[Exception], object]] = {}
+        try:
+            responses = [encode_response(response) for response in self.client.query.send_batch(commands)]
+            for call_id, batch in sends:
+                results[call_id], responses = (None, responses[: len(batch)]), responses[len(batch) :]
+        except Exception as error:
+            results.update({call_id: (self._error(error), None) for call_id, _ in sends})
+
+        for call_id, kind, args in calls:
+            if kind == "send":
+                continue
+            try:
+                if kind == "stream":
+                    results[call_id] = (None, encode_response(self.client.query.send_stream(*args)))
+                elif kind == "call":
+                    name, call_args = args
+                    result = getattr(self.client.query, name)(*call_args)
+                    if isinstance(result, TS3QueryResponse):
+                        result = encode_response(result)
+                    results[call_id] = (None, result)
+                elif kind == "get":
+                    results[call_id] = (None, getattr(self.client.query, args[0]))
+                else:
+                    raise ValueError(f"Unknown call {kind}.")
+            except Exception as error:
+                results[call_id] = (self._error(error), None)
+        return [(call_id, *results[call_id]) for call_id, _, _ in calls]
+
+    @staticmethod
+    def _error(error: Exception) -> Exception:
+        # Not every exception can be rebuilt from its pickled arguments.
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+    def _forward(self, command: TS3QueryCommand, response: TS3QueryResponse) -> None:
+        # Responses to the plugin's own commands are returned with its call.
+        if getattr(self._serving, "active", False) or not (response.events or response.messages):
+            return
+        try:
+            self._send(("responses", [(command, encode_response(response))]))
+        except OSError:
+            pass
@@ -1,16 +1,32 @@
+from __future__ import annotations
+
 import threading
+from typing import TYPE_CHECKING, Callable, Optional
 
 from plugins.errors import ImplementationError
 from ts3client import TS3Client
+from ts3client.event import Event
 from ts3client.utils.logger import create_logger
 
+if TYPE_CHECKING:
+    from .runtime import PluginRuntime
+
 
 class Plugin:
-    """Base class for all plugins."""
+    """
+    Base class for all plugins.
+    A plugin either loops in run() on its own thread until its event is set, or, if scheduled is True, registers jobs
+    and event handlers in run() and returns. Scheduled plugins share the threads of the plugin runtime.
+    """
+
+    scheduled = False
+    # Modules or packages besides its own that are re-imported when the plugin is reloaded.
+    reload_modules: tuple[str, ...] = ()
 
     def __init__(self, client: TS3Client, event: threading.Event):
         self.client = client
         self.event = event
+        self.runtime: Optional[PluginRuntime] = None
         self.logger = create_logger(self.name, "logs/plugins.log")
         self.logger.info(f"Initializing {self.name}...")
         print(f"Initializing {self.name}...")
@@ -22,11 +38,45 @@ class Plugin:
         self.logger.info(f"Stopping {self.name}...")
         self.event.set()
 
+    def cleanup(self) -> None:
+        """Called after a scheduled plugin was stopped, to release what it acquired in run()."""
+
     def ready(self) -> None:
         """Broadcasts that the plugin is ready."""
         self.logger.info(f"{self.name} initialized.")
         print(f"{self.name} initialized.")
 
+    def every(self, interval: float, function: Callable, *args, delay: float = 0, name: str = None) -> str:
+        """
+        Calls a function every interval seconds on the plugin runtime, the first time after delay seconds.
+
+        :return: The name of the job, it can be cancelled with cancel().
+        :rtype: str
+        """
+        return self._runtime().schedule(self, function, *args, delay=delay, interval=interval, name=name)
+
+    def after(self, delay: float, function: Callable, *args, name: str = None) -> str:
+        """
+        Calls a function once after delay seconds on the plugin runtime. A job with the same name is replaced.
+
+        :return: The name of the job, it can be cancelled with cancel().
+        :rtype: str
+        """
+        return self._runtime().schedule(self, function, *args, delay=delay, name=name)
+
+    def cancel(self, name: str) -> bool:
+        """Cancels a job, returns whether it was scheduled."""
+        return self._runtime().cancel(self, name)
+
+    def on(self, event_type: type[Event], handler: Callable[[Event], None]) -> None:
+        """Calls a handler on the plugin runtime with every event of a type."""
+        self._runtime().on(self, event_type, handler)
+
+    def _runtime(self) -> PluginRuntime:
+        if self.runtime is None:
+            raise ImplementationError(self.name, "Jobs and event handlers need the plugin runtime.")
+        return self.runtime
+
     @property
     def name(self):
         return self.__class__.__name__
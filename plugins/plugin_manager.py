@@ -1,59 +1,206 @@
+import importlib
 import inspect
-from threading import Event, Thread
+import sys
+from threading import Event, RLock, Thread
+from typing import Iterable, Optional
 
 from ts3client import TS3Client
 from ts3client.utils.logger import create_logger
 
 from . import plugins as all_plugins
 from .errors import ConfigurationError, ImplementationError
+from .isolation import PluginProcess
 from .plugin import Plugin
+from .runtime import PluginRuntime
 
 logger = create_logger("PluginManager", "logs/main.log")
 
 
 class PluginManager:
-    def __init__(self, client: TS3Client, plugins: dict[str, dict]):
+    def __init__(
+        self, client: TS3Client, plugins: dict[str, dict], workers: int = 4, isolated: Optional[Iterable[str]] = None
+    ):
         logger.info("Initializing plugin manager...")
-        self.plugins = plugins
+        self.plugins = dict(plugins)
         self.client = client
-        self.threads: dict[int, tuple[Thread, Event]] = {}
+        self.isolated = set(isolated or ())
+        self.instances: dict[str, Plugin] = {}
+        self.threads: dict[str, tuple[Thread, Event]] = {}
+        self.processes: dict[str, PluginProcess] = {}
+        self.runtime = PluginRuntime(client, workers)
+        self._lock = RLock()
         logger.info(f"Found {len(self.plugins)} plugins: {', '.join(self.plugins.keys())}")
 
     def run(self):
         logger.info("Starting plugins...")
+        self.runtime.start()
         for plugin_name, config in self.plugins.items():
-            if plugin_name not in all_plugins.__all__:
-                raise ImplementationError(
-                    plugin_name,
-                    f"Plugin {plugin_name} was listed in the configuration, but not found in the plugins directory.",
-                )
-
-            stop = Event()
-            plugin: Plugin = getattr(all_plugins, plugin_name)(self.client, stop)
-
-            if not hasattr(plugin, "run"):
-                raise ImplementationError(
-                    plugin_name,
-                    f"Plugin {plugin_name} does not have a run() method.",
-                )
-
-            validate_config(plugin, config)
+            self.start(plugin_name, config)
+
+    def start(self, plugin_name: str, config: dict, plugin: Plugin = None) -> None:
+        """
+        Starts a plugin: on its own thread, on the plugin runtime if it is scheduled, or in a worker process if it is
+        isolated.
+
+        :param plugin_name: The name of the plugin class.
+        :type plugin_name: str
+        :param config: The configuration of the plugin.
+        :type config: dict
+        :param plugin: An instance that was already created and validated, defaults to None.
+        :type plugin: Plugin, optional
+        """
+        with self._lock:
+            plugin = plugin or self._create(plugin_name, config)
+            self.plugins[plugin_name] = config
+
+            if plugin_name in self.isolated:
+                logger.info(f"Starting {plugin_name} in a worker process...")
+                self.processes[plugin_name] = PluginProcess(self.client, type(plugin), config)
+                self.processes[plugin_name].start()
+                return
+
+            self.instances[plugin_name] = plugin
+            if plugin.scheduled:
+                logger.info(f"Starting {plugin_name} on the plugin runtime...")
+                self.runtime.add(plugin, config)
+                return
 
             logger.info(f"Starting {plugin_name}...")
             thread = Thread(target=plugin.run, kwargs=config)
             thread.start()
             thread.name = f"{plugin_name}-{thread.ident}"
-            self.threads[thread.ident] = (thread, stop)
+            self.threads[plugin_name] = (thread, plugin.event)
             logger.info(f"Started {plugin_name} with thread name {thread.name}")
 
+    def stop_plugin(self, plugin_name: str, timeout: int = 5) -> None:
+        """
+        Stops a single plugin through its event and waits for it to finish.
+
+        :param plugin_name: The name of the plugin class.
+        :type plugin_name: str
+        :param timeout: The maximum number of seconds to wait, defaults to 5.
+        :type timeout: int, optional
+        """
+        with self._lock:
+            logger.info(f"Stopping {plugin_name}...")
+            if plugin_name in self.processes:
+                self.processes.pop(plugin_name).stop(timeout)
+                return
+
+            plugin = self.instances.pop(plugin_name, None)
+            if plugin is None:
+                return
+            if plugin.scheduled:
+                self.runtime.remove(plugin)
+                if not self.runtime.drain(plugin, timeout):
+                    logger.warning(f"{plugin_name} did not stop within {timeout} seconds.")
+                return
+
+            thread, stop = self.threads.pop(plugin_name)
+            stop.set()
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.warning(f"{plugin_name} did not stop within {timeout} seconds.")
+
+    def reload(self, plugin_name: str, config: dict = None, timeout: int = 5) -> bool:
+        """
+        Re-imports the module of a plugin and replaces the running instance with a new one, against the same
+        connection. The old instance is only stopped once the new module was imported and the configuration was
+        validated, so a broken change leaves it running.
+
+        :param plugin_name: The name of the plugin class.
+        :type plugin_name: str
+        :param config: The new configuration, defaults to None (the current one).
+        :type config: dict, optional
+        :param timeout: The maximum number of seconds to wait for the old instance, defaults to 5.
+        :type timeout: int, optional
+        :return: Whether the plugin was reloaded.
+        :rtype: bool
+        """
+        with self._lock:
+            config = self.plugins.get(plugin_name, {}) if config is None else config
+            try:
+                current = getattr(all_plugins, plugin_name, None)
+                reload_modules([*getattr(current, "reload_modules", ()), getattr(current, "__module__", None)])
+                importlib.reload(all_plugins)
+                plugin = self._create(plugin_name, config)
+            except Exception as e:
+                logger.exception(f"Reloading {plugin_name} failed, keeping the running instance: {e}")
+                return False
+
+            self.stop_plugin(plugin_name, timeout)
+            logger.info(f"Reloading {plugin_name}...")
+            self.start(plugin_name, config, plugin)
+            return True
+
+    def apply_config(self, plugins: dict[str, dict], timeout: int = 5) -> list[str]:
+        """
+        Applies a new plugin configuration: removed plugins are stopped, added plugins are started and plugins whose
+        configuration changed are reloaded.
+
+        :param plugins: The new configuration, by plugin name.
+        :type plugins: dict[str, dict]
+        :param timeout: The maximum number of seconds to wait for a plugin to stop, defaults to 5.
+        :type timeout: int, optional
+        :return: The names of the plugins that were reloaded, their modules were re-imported as well.
+        :rtype: list[str]
+        """
+        reloaded = []
+        with self._lock:
+            for plugin_name in [name for name in self.plugins if name not in plugins]:
+                self.stop_plugin(plugin_name, timeout)
+                del self.plugins[plugin_name]
+            for plugin_name, config in plugins.items():
+                if plugin_name not in self.plugins:
+                    try:
+                        self.start(plugin_name, config)
+                    except (ConfigurationError, ImplementationError) as e:
+                        logger.error(f"Not starting {plugin_name}: {e}")
+                elif config != self.plugins[plugin_name] and self.reload(plugin_name, config, timeout):
+                    reloaded.append(plugin_name)
+        return reloaded
+
     def stop(self, timeout: int = 5):
         logger.info("Stopping all plugins...")
-        for thread, stop in self.threads.values():
-            logger.info(f"Stopping {thread.name}...")
+        for _, stop in self.threads.values():
             stop.set()
+        for process in self.processes.values():
+            logger.info(f"Stopping {process.name}...")
+            process.stop(timeout)
+        self.runtime.stop(timeout)
+        for thread, _ in self.threads.values():
+            logger.info(f"Stopping {thread.name}...")
             thread.join(timeout)
             logger.info(f"Stopped {thread.name}.")
 
+    def _create(self, plugin_name: str, config: dict) -> Plugin:
+        if plugin_name not in all_plugins.__all__:
+            raise ImplementationError(
+                plugin_name,
+                f"Plugin {plugin_name} was listed in the configuration, but not found in the plugins directory.",
+            )
+
+        plugin: Plugin = getattr(all_plugins, plugin_name)(self.client, Event())
+
+        if not hasattr(plugin, "run"):
+            raise ImplementationError(
+                plugin_name,
+                f"Plugin {plugin_name} does not have a run() method.",
+            )
+
+        validate_config(plugin, config)
+        return plugin
+
+
+def reload_modules(names: list[str]) -> None:
+    """Re-imports modules that are loaded, the submodules of a package before the package itself."""
+    for name in names:
+        if name is None or name not in sys.modules:
+            continue
+        for submodule in sorted(module for module in sys.modules if module.startswith(f"{name}.")):
+            importlib.reload(sys.modules[submodule])
+        importlib.reload(sys.modules[name])
+
 
 def validate_config(plugin: Plugin, config: dict):
     signature = inspect.signature(plugin.run)
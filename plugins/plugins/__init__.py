@@ -1,6 +1,7 @@
 from .afk_mover import AFK_Mover
 from .command_handler import CommandHandler
 from .doodler import Doodler
+from .metrics import Metrics
 from .welcomer import Welcomer
 
-__all__ = ["AFK_Mover", "CommandHandler", "Doodler", "Welcomer"]
+__all__ = ["AFK_Mover", "CommandHandler", "Doodler", "Metrics", "Welcomer"]
@@ -1,7 +1,24 @@
+import threading
+import time
+
+from ts3client import TS3Client
+from ts3client.errors import INVALID_CLIENT_ID
+from ts3client.event import ClientEnterViewEvent, ClientLeftViewEvent, ClientMovedEvent
+from ts3client.ts3client_response import TS3ClientResponse
+from ts3client.ts3query.ts3query_command import TS3QueryCommand
+
 from ..plugin import Plugin
+from ..timer_wheel import TimerWheel
 
 
 class AFK_Mover(Plugin):
+    scheduled = True
+
+    def __init__(self, client: TS3Client, event: threading.Event):
+        super().__init__(client, event)
+        self.wheel = TimerWheel(start=time.monotonic())
+        self.channels: dict[int, int] = {}
+
     def run(
         self,
         afk_channel_id: int,
@@ -12,6 +29,8 @@ class AFK_Mover(Plugin):
     ):
         """
         Moves clients to the AFK channel if they are AFK for a certain amount of time.
+        The idle times of all clients are read once, after that only clients whose predicted deadline has passed
+        are checked again. Deadlines follow the clientmoved, cliententerview and clientleftview events.
 
         :param client: A TS3Client instance.
         :type client: TS3Client
@@ -19,7 +38,7 @@ class AFK_Mover(Plugin):
         :type afk_channel_id: int
         :param afk_time: The amount of time in seconds a client has to be idle to be moved to the AFK channel.
         :type afk_time: int
-        :param check_interval: The interval in seconds to check for AFK clients, defaults to 1.
+        :param check_interval: The interval in seconds to check for expired deadlines and events, defaults to 1.
         :type check_interval: int
         :param ignore_channels: A list of channel IDs to ignore, defaults to [].
         :type ignore_channels: list[int]
@@ -27,20 +46,90 @@ class AFK_Mover(Plugin):
         :type move_message: str
         """
 
-        afk_time = afk_time * 1000
+        self.afk_channel_id = afk_channel_id
+        self.afk_time = afk_time
+        self.ignore_channels = set(ignore_channels)
+        self.move_message = move_message
+
+        self.client.enable_server_events()
+        self.client.enable_channel_events()
+        self.load(time.monotonic())
+        self.on(ClientEnterViewEvent, self.entered)
+        self.on(ClientLeftViewEvent, self.left)
+        self.on(ClientMovedEvent, self.moved)
+        self.every(check_interval, self.tick, delay=check_interval)
         self.ready()
 
-        while not self.event.is_set():
-            self.logger.debug("Checking for AFK clients...")
-            for user in self.client.get_users():
-                if user.cid == afk_channel_id or user.cid in ignore_channels:
-                    continue
+    def tick(self) -> None:
+        self.check(time.monotonic())
+
+    def load(self, now: float) -> None:
+        """Reads the idle time of every client once and schedules their deadlines."""
+        self.logger.debug("Loading idle times...")
+        for row in TS3ClientResponse(self.client.query.commands.clientlist(times=True)):
+            if "clid" not in row or row.get("client_type", 0) != 0:
+                continue
+            self.channels[row["clid"]] = row.get("cid")
+            self.schedule(row["clid"], now, row.get("client_idle_time", 0))
+
+    def schedule(self, clid: int, now: float, idle_time: int = 0) -> None:
+        """Schedules a client for the moment it would reach afk_time, unless it is in an ignored channel."""
+        if self.ignored(clid):
+            self.wheel.cancel(clid)
+            return
+        self.wheel.schedule(clid, now + max(0, self.afk_time - idle_time / 1000))
+
+    def ignored(self, clid: int) -> bool:
+        return self.channels.get(clid) == self.afk_channel_id or self.channels.get(clid) in self.ignore_channels
+
+    def entered(self, event: ClientEnterViewEvent) -> None:
+        if event.client_type == 0:
+            self.channels[event.clid] = event.ctid
+            self.schedule(event.clid, time.monotonic())
+
+    def left(self, event: ClientLeftViewEvent) -> None:
+        self.channels.pop(event.clid, None)
+        self.wheel.cancel(event.clid)
+
+    def moved(self, event: ClientMovedEvent) -> None:
+        if event.clid not in self.channels:
+            return
+        self.channels[event.clid] = event.ctid
+        if self.ignored(event.clid):
+            self.wheel.cancel(event.clid)
+        elif event.invokerid in (None, 0, event.clid):
+            # Switching channels is activity.
+            self.schedule(event.clid, time.monotonic())
+        elif event.clid not in self.wheel:
+            # Moved out of an ignored channel by someone else, the idle time is unknown.
+            self.wheel.schedule(event.clid, time.monotonic())
+
+    def check(self, now: float) -> None:
+        """Checks the clients whose deadline has passed and moves those who are still idle."""
+        expired = self.wheel.advance(now)
+        if not expired:
+            return
+
+        self.logger.debug(f"Checking {len(expired)} clients...")
+        commands = [TS3QueryCommand("clientinfo", kwargs={"clid": clid}) for clid in expired]
+        for clid, response in zip(expired, self.client.query.send_batch(commands)):
+            if response.error_id == INVALID_CLIENT_ID:
+                self.channels.pop(clid, None)
+                continue
+            if response.error_id != 0:
+                self.schedule(clid, now)
+                continue
 
-                user_info = self.client.get_user_info(user.clid)
+            info = response.data.get(0, {})
+            self.channels[clid] = info.get("cid", self.channels.get(clid))
+            idle_time = info.get("client_idle_time", 0)
+            if idle_time < self.afk_time * 1000:
+                self.schedule(clid, now, idle_time)
+                continue
+            if self.ignored(clid):
+                continue
 
-                if user_info.client_idle_time > afk_time:
-                    self.logger.info(f"Moving {user.client_nickname} to AFK channel...")
-                    self.client.move_user(user.clid, afk_channel_id)
-                    self.client.send_private_message(user.clid, move_message)
-            self.logger.debug(f"Sleeping for {check_interval} seconds...")
-            self.event.wait(check_interval)
+            self.logger.info(f"Moving {info.get('client_nickname')} to AFK channel...")
+            self.client.move_user(clid, self.afk_channel_id)
+            self.client.send_private_message(clid, self.move_message)
+            self.channels[clid] = self.afk_channel_id
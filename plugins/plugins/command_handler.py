@@ -1,12 +1,55 @@
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from ts3client import TS3Client
+from ts3client.message import Message
+
 from .. import commands as all_commands
 from ..command import Command
+from ..command_trie import CommandTrie
 from ..plugin import Plugin
+from ..rate_limiter import RateLimiter
+from ..worker_pool import Task, WorkerPool
+
+
+@dataclass
+class Route:
+    command: Command
+    handler: Callable[[Message], None]
+    timeout: Optional[float] = None
+    permission: Optional[tuple[str, int]] = None
+    cooldown: Optional[RateLimiter] = None
 
 
 class CommandHandler(Plugin):
-    def run(self, prefix: str = "!", commands: dict = {}, check_interval: int = 1):
+    scheduled = True
+    reload_modules = (all_commands.__name__,)
+
+    def __init__(self, client: TS3Client, event: threading.Event):
+        super().__init__(client, event)
+        self.prefix = "!"
+        self.routes = CommandTrie()
+        self.commands: list[Command] = []
+        self.user_cooldown: Optional[RateLimiter] = None
+        self.command_cooldown: Optional[RateLimiter] = None
+        self.pool: Optional[WorkerPool] = None
+        self.gated = False
+
+    def run(
+        self,
+        prefix: str = "!",
+        commands: dict = {},
+        check_interval: int = 1,
+        workers: int = 4,
+        max_pending: int = 100,
+        timeout: int = 30,
+        cooldowns: dict = {},
+    ):
         """
         Handles commands.
+        Commands run on a pool of workers, so a slow command does not hold up the others. The commands of a user run
+        in the order they were sent.
 
         :param prefix: The prefix to use for commands, defaults to "!".
         :type prefix: str
@@ -14,13 +57,25 @@ class CommandHandler(Plugin):
         :type commands: dict
         :param check_interval: The interval in seconds to check for commands, defaults to 1.
         :type check_interval: int
+        :param workers: The number of commands that can run at the same time, defaults to 4.
+        :type workers: int
+        :param max_pending: The maximum number of commands waiting for a worker, defaults to 100.
+        :type max_pending: int
+        :param timeout: The number of seconds after which a command no longer holds up the next command of the same user, defaults to 30.
+        :type timeout: int
+        :param cooldowns: Token buckets that limit how often commands can be used, "user" limits all commands of a user and "command" every command per user, e.g. {"user": {"rate": 0.5, "burst": 5}}, defaults to {}.
+        :type cooldowns: dict
         """
 
         if len(commands) == 0:
             self.logger.info("No commands to load.")
             return
 
-        loaded_commands: list[Command] = []
+        self.prefix = prefix
+        self.routes = CommandTrie()
+        self.commands = []
+        self.user_cooldown = RateLimiter.from_config(cooldowns["user"]) if "user" in cooldowns else None
+        self.command_cooldown = RateLimiter.from_config(cooldowns["command"]) if "command" in cooldowns else None
         for command_name, command_config in commands.items():
             if command_name not in all_commands.__all__:
                 self.logger.info(f"Command {command_name} not found. Skipping...")
@@ -28,38 +83,106 @@ class CommandHandler(Plugin):
 
             self.logger.info(f"Loading command {command_name}...")
             loaded_command: Command = getattr(all_commands, command_name)(self.client, **command_config)
-            loaded_commands.append(loaded_command)
+            self.commands.append(loaded_command)
+            self.add_routes(loaded_command, command_config, timeout)
 
-        if len(loaded_commands) == 0:
+        if len(self.routes) == 0:
             self.logger.info("No commands loaded.")
             return
 
-        self.logger.info(f"Loaded {len(loaded_commands)} commands...")
-        triggers = [command.trigger for command in loaded_commands]
-
+        self.logger.info(f"Loaded {len(self.routes)} command triggers...")
+        self.gated = any("permission" in command_config for command_config in commands.values())
+        if self.gated:
+            # Clients that enter or move are picked up from events, so their permissions can be fetched in advance.
+            self.client.enable_server_events()
+            self.client.enable_channel_events()
+            if not self.client.permissions.loaded:
+                self.logger.info("Loading permissions...")
+                self.client.permissions.load()
+
+        self.pool = WorkerPool(workers, max_pending, name=self.name, on_timeout=self.timed_out)
+        self.timeout = timeout
+        self.every(check_interval, self.poll)
         self.ready()
 
-        while not self.event.is_set():
-            self.logger.debug("Checking for new messages...")
-            messages = self.client.get_unread_messages()
-
-            for message in messages:
-                self.logger.debug(f"Received message from '{message.invokername}': {message.content}")
-                if not message.content.startswith(prefix):
-                    self.logger.debug(f"Message does not start with prefix '{prefix}'. Skipping...")
-                    continue
-
-                message.mark_as_used()
-
-                trigger = message.content[len(prefix) :].split(" ")[0]
-
-                if trigger not in triggers:
-                    self.logger.debug(f"Trigger '{trigger}' not found. Skipping...")
-                    continue
-
-                command = loaded_commands[triggers.index(trigger)]
-
-                self.logger.info(f"Running command '{command.name}'...")
-                command.run(message)
+    def cleanup(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(timeout=self.timeout)
+        # The commands are cleaned up after the pool, so no queued call runs against a closed command.
+        for command in self.commands:
+            try:
+                command.cleanup()
+            except Exception:
+                self.logger.exception(f"Cleaning up {command.name} failed.")
+
+    def poll(self) -> None:
+        self.logger.debug("Checking for new messages...")
+        if self.gated:
+            # One batch for the clients that entered or moved since the last poll, the checks then cost no queries.
+            self.client.permissions.prefetch()
+        for message in self.client.get_unread_messages():
+            self.dispatch(message)
+
+    def add_routes(self, command: Command, config: dict, timeout: Optional[float] = None) -> None:
+        """
+        Registers the trigger and aliases of a command, and the subcommands it declares below each of them.
+
+        :param command: The command.
+        :type command: Command
+        :param config: The configuration of the command.
+        :type config: dict
+        :param timeout: The timeout of the command if its configuration has none, defaults to None.
+        :type timeout: float, optional
+        """
+        permission = (config["permission"], config.get("permission_value", 1)) if "permission" in config else None
+        timeout = config.get("timeout", timeout)
+        cooldown = RateLimiter.from_config(config["cooldown"]) if "cooldown" in config else self.command_cooldown
+        for trigger in [command.trigger, *config.get("aliases", [])]:
+            self.routes.add(trigger, Route(command, command.run, timeout, permission, cooldown))
+            for subcommand, method in command.subcommands.items():
+                self.routes.add(
+                    f"{trigger} {subcommand}", Route(command, getattr(command, method), timeout, permission, cooldown)
+                )
+
+    def dispatch(self, message: Message) -> bool:
+        """
+        Resolves the command of a message and queues it on the worker pool.
 
-            self.event.wait(check_interval)
+        :param message: The message.
+        :type message: Message
+        :return: Whether a command was queued.
+        :rtype: bool
+        """
+        self.logger.debug(f"Received message from '{message.invokername}': {message.content}")
+        if not message.content.startswith(self.prefix):
+            self.logger.debug(f"Message does not start with prefix '{self.prefix}'. Skipping...")
+            return False
+
+        message.mark_as_used()
+
+        resolved = self.routes.resolve(message.content[len(self.prefix) :])
+        if resolved is None:
+            self.logger.debug(f"No command found for '{message.content}'. Skipping...")
+            return False
+
+        route: Route = resolved[0]
+        # Over the limit, the message is dropped without an answer, so spamming commands costs no queries.
+        if self.user_cooldown is not None and not self.user_cooldown.allow(message.invokeruid):
+            self.logger.debug(f"User {message.invokername} is on cooldown. Skipping...")
+            return False
+        if route.cooldown is not None and not route.cooldown.allow((message.invokeruid, route.command.name)):
+            self.logger.debug(f"User {message.invokername} is on cooldown for '{route.command.name}'. Skipping...")
+            return False
+
+        if route.permission and not self.client.has_permission(message.invokerid, *route.permission):
+            self.logger.info(f"User {message.invokername} lacks permission for '{route.command.name}'. Skipping...")
+            return False
+
+        self.logger.info(f"Running command '{route.command.name}'...")
+        if not self.pool.submit(route.handler, message, key=message.invokeruid, timeout=route.timeout):
+            self.logger.warning(f"Too many pending commands, dropping '{route.command.name}' of {message.invokername}.")
+            return False
+        return True
+
+    def timed_out(self, task: Task) -> None:
+        self.logger.warning(f"Command '{task.name}' did not finish within {task.timeout} seconds.")
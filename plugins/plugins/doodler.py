@@ -1,58 +1,183 @@
-from datetime import datetime, timedelta
+import threading
+import time
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+
+from ts3client import TS3Client
+from ts3client.event import ServerEditedEvent
+from ts3client.ts3client_response import TS3ClientResponse
 
 from ..plugin import Plugin
 
 
-def date_range(start_date, end_date) -> str:
-    start_date = datetime.strptime(start_date, "%d-%m-%Y")
-    end_date = datetime.strptime(end_date, "%d-%m-%Y")
-    delta = timedelta(days=1)
-    current_date = start_date
-    while current_date <= end_date:
-        yield current_date.strftime("%d-%m-%Y")
-        current_date += delta
+def parse_date(value: str) -> tuple[int, int, int | None]:
+    """
+    Parses a date in the format dd-mm-yyyy, or dd-mm for a date that recurs every year.
+
+    :param value: The date.
+    :type value: str
+    :return: The day, month and year, the year is None for recurring dates.
+    :rtype: tuple[int, int, int | None]
+    """
+    parts = value.split("-")
+    if len(parts) == 2:
+        parsed = datetime.strptime(f"{value}-2000", "%d-%m-%Y")
+        return parsed.day, parsed.month, None
+    parsed = datetime.strptime(value, "%d-%m-%Y")
+    return parsed.day, parsed.month, parsed.year
+
+
+class DoodleSchedule:
+    """
+    The banners of a server over time. Every doodle covers whole days from its start to its end date, dates without
+    a year recur every year and a yearly range may wrap around the new year. Where doodles overlap, the one
+    configured first wins.
+    The doodles are merged into a sorted index of the moments the banner changes, built for the years around the
+    current one, so the banner at any time and the next transition are found with a binary search.
+
+    :param default: The banner outside of all doodles.
+    :type default: str
+    :param doodles: The doodles, each with a url and either a date or a startDate and endDate.
+    :type doodles: list[dict]
+    """
+
+    def __init__(self, default: str, doodles: list[dict]) -> None:
+        self.default = default
+        self.doodles: list[tuple[tuple[int, int, int | None], tuple[int, int, int | None], str]] = []
+        for doodle in doodles:
+            if "date" in doodle:
+                start = end = parse_date(doodle["date"])
+            elif "startDate" in doodle and "endDate" in doodle:
+                start, end = parse_date(doodle["startDate"]), parse_date(doodle["endDate"])
+            else:
+                raise ValueError(f"Doodle {doodle.get('url')} needs a date or a startDate and endDate.")
+            if (start[2] is None) != (end[2] is None):
+                raise ValueError(f"Doodle {doodle.get('url')} mixes a yearly and a fixed date.")
+            self.doodles.append((start, end, doodle["url"]))
+
+        self._year: int | None = None
+        self._bounds: list[datetime] = []
+        self._banners: list[str] = []
+
+    def banner(self, now: datetime) -> str:
+        """Returns the banner at a time."""
+        self._build(now.year)
+        index = bisect_right(self._bounds, now) - 1
+        return self._banners[index] if index >= 0 else self.default
+
+    def next_transition(self, now: datetime) -> datetime | None:
+        """Returns the next time after now the banner changes, None if it never changes again."""
+        self._build(now.year)
+        index = bisect_right(self._bounds, now)
+        return self._bounds[index] if index < len(self._bounds) else None
+
+    def _intervals(self, year: int) -> list[tuple[datetime, datetime, int, str]]:
+        intervals = []
+        for priority, (start, end, url) in enumerate(self.doodles):
+            if start[2] is not None:
+                years = [(start[2], end[2])]
+            else:
+                # A range that ends before it starts wraps around the new year.
+                wraps = (end[1], end[0]) < (start[1], start[0])
+                years = [(y, y + wraps) for y in range(year - 1, year + 2)]
+            for start_year, end_year in years:
+                try:
+                    first = date(start_year, start[1], start[0])
+                    last = date(end_year, end[1], end[0])
+                except ValueError:
+                    # 29-02 in a year that is not a leap year.
+                    continue
+                if first <= last:
+                    intervals.append(
+                        (
+                            datetime.combine(first, datetime.min.time()),
+                            datetime.combine(last + timedelta(days=1), datetime.min.time()),
+                            priority,
+                            url,
+                        )
+                    )
+        return intervals
+
+    def _build(self, year: int) -> None:
+        if self._year == year:
+            return
+
+        boundaries: dict[datetime, tuple[list, list]] = {}
+        for start, end, priority, url in self._intervals(year):
+            boundaries.setdefault(start, ([], []))[0].append((priority, url))
+            boundaries.setdefault(end, ([], []))[1].append((priority, url))
+
+        active: set[tuple[int, str]] = set()
+        bounds, banners = [], []
+        current = self.default
+        for moment in sorted(boundaries):
+            starting, ending = boundaries[moment]
+            active.difference_update(ending)
+            active.update(starting)
+            banner = min(active)[1] if active else self.default
+            if banner != current:
+                bounds.append(moment)
+                banners.append(banner)
+                current = banner
+
+        self._year, self._bounds, self._banners = year, bounds, banners
 
 
 class Doodler(Plugin):
-    def run(self, default: str, doodles: list[dict] = []):
+    scheduled = True
+
+    def __init__(self, client: TS3Client, event: threading.Event):
+        super().__init__(client, event)
+        self.current: str | None = None
+        self._stale = True
+
+    def run(self, default: str, doodles: list = [], check_interval: int = 60):
         """
         Change the server banner on given dates.
+        The banner is changed with a single serveredit at the moment a doodle starts or ends. The current banner is
+        read once and afterwards only when a serveredited event does not tell the new banner.
 
         :param default: The default server banner to use.
         :type default: str
-        :param doodles: The server banners to use on given dates, e.g. [{"date": "25-12-2025", "url": "https://myserver.net/christmas-banner.png"}, {"startDate": "01-01-2025", "endDate": "07-01-2025", "url": "https://myserver.net/new-year-banner.png"}], defaults to []
+        :param doodles: The server banners to use on given dates, e.g. [{"date": "25-12", "url": "https://myserver.net/christmas-banner.png"}, {"startDate": "01-01-2025", "endDate": "07-01-2025", "url": "https://myserver.net/new-year-banner.png"}], dates without a year recur every year, defaults to []
         :type doodles: list[dict]
+        :param check_interval: The maximum number of seconds between checks for serveredited events, defaults to 60.
+        :type check_interval: int
         """
+        self.schedule = DoodleSchedule(default, doodles)
+        self.check_interval = check_interval
 
-        transformed = {}
-        # Transform doodles to a dict with the url as key and the date(s) as value
-        for doodle in doodles:
-            if "date" in doodle:
-                transformed[doodle["url"]] = [doodle["date"]]
-            elif "startDate" in doodle and "endDate" in doodle:
-                transformed[doodle["url"]] = list(date_range(doodle["startDate"], doodle["endDate"]))
-
+        self.client.enable_server_events()
+        self.on(ServerEditedEvent, self.edited)
+        self.tick()
         self.ready()
 
-        while not self.event.is_set():
-            self.logger.debug("Checking doodles...")
-
-            current_date = datetime.today().strftime("%d-%m-%Y")
-            new_banner = default
+    def tick(self) -> None:
+        """Updates the banner and schedules the next check at the next transition, or after check_interval."""
+        self.update(datetime.now())
+        transition = self.schedule.next_transition(datetime.now())
+        delay = self.check_interval if transition is None else transition.timestamp() - time.time()
+        self.after(max(0, min(delay, self.check_interval)), self.tick)
 
-            for url, dates in transformed.items():
-                if current_date in dates:
-                    new_banner = url
-                    break
+    def edited(self, event: ServerEditedEvent) -> None:
+        """Keeps the cached banner up to date, an edit that does not tell the banner makes it read it again."""
+        if event.virtualserver_hostbanner_gfx_url is not None:
+            self.current = event.virtualserver_hostbanner_gfx_url
+        else:
+            self._stale = True
 
-            server_info = self.client.query.commands.serverinfo().data[0]
-            current_banner = server_info.get("virtualserver_hostbanner_gfx_url")
-            if current_banner != new_banner:
-                self.logger.info(f"Setting server banner to {new_banner}")
-                self.client.query.commands.serveredit(
-                    virtualserver_hostbanner_gfx_url=new_banner,
-                    virtualserver_hostbanner_mode=2,
-                )
+    def update(self, now: datetime) -> None:
+        """Sets the banner of the schedule at a time, unless the cached banner already matches it."""
+        if self._stale:
+            self._stale = False
+            self.current = TS3ClientResponse(self.client.query.commands.serverinfo())[0].get(
+                "virtualserver_hostbanner_gfx_url"
+            )
 
-            hours_until_midnight = 24 - datetime.today().hour
-            self.event.wait(60 * 60 * hours_until_midnight)
+        banner = self.schedule.banner(now)
+        if self.current != banner:
+            self.logger.info(f"Setting server banner to {banner}")
+            self.client.query.commands.serveredit(
+                virtualserver_hostbanner_gfx_url=banner, virtualserver_hostbanner_mode=2
+            )
+            self.current = banner
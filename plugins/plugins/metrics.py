@@ -0,0 +1,188 @@
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ts3client import TS3Client
+from ts3client.ts3query.ts3query_command import TS3QueryCommand
+
+from ..plugin import Plugin
+
+# Gauge name: (command, property, help text)
+GAUGES = {
+    "ts3_clients_online": ("serverinfo", "virtualserver_clientsonline", "Clients online, including query clients."),
+    "ts3_query_clients_online": ("serverinfo", "virtualserver_queryclientsonline", "Query clients online."),
+    "ts3_max_clients": ("serverinfo", "virtualserver_maxclients", "Maximum number of clients."),
+    "ts3_channels": ("serverinfo", "virtualserver_channelsonline", "Channels on the virtual server."),
+    "ts3_uptime_seconds": ("serverinfo", "virtualserver_uptime", "Uptime of the virtual server."),
+    "ts3_ping_milliseconds": ("serverinfo", "virtualserver_total_ping", "Average ping of the clients."),
+    "ts3_packet_loss_ratio": ("serverinfo", "virtualserver_total_packetloss_total", "Average packet loss."),
+    "ts3_bandwidth_sent_bytes_per_second": (
+        "serverrequestconnectioninfo",
+        "connection_bandwidth_sent_last_second_total",
+        "Bandwidth sent in the last second.",
+    ),
+    "ts3_bandwidth_received_bytes_per_second": (
+        "serverrequestconnectioninfo",
+        "connection_bandwidth_received_last_second_total",
+        "Bandwidth received in the last second.",
+    ),
+    "ts3_bytes_sent_total": ("serverrequestconnectioninfo", "connection_bytes_sent_total", "Bytes sent."),
+    "ts3_bytes_received_total": ("serverrequestconnectioninfo", "connection_bytes_received_total", "Bytes received."),
+    "ts3_instance_virtual_servers_running": (
+        "hostinfo",
+        "virtualservers_running_total",
+        "Virtual servers running on the instance.",
+    ),
+    "ts3_instance_clients_online": (
+        "hostinfo",
+        "virtualservers_total_clients_online",
+        "Clients online on all virtual servers of the instance.",
+    ),
+}
+
+COMMANDS = ("serverinfo", "serverrequestconnectioninfo", "hostinfo")
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class MetricsRegistry:
+    """
+    Keeps the last samples of every gauge in fixed-size ring buffers and the rendered Prometheus text of the newest
+    ones, so scrapes never wait for or reach the query connection.
+
+    :param history: The number of samples to keep per gauge, defaults to 240.
+    :type history: int, optional
+    """
+
+    def __init__(self, history: int = 240) -> None:
+        self.history = history
+        self.samples: dict[str, deque[tuple[float, float]]] = {}
+        self.latencies: dict[str, deque[float]] = {}
+        self.exposition = b""
+        self._lock = threading.Lock()
+
+    def record(self, name: str, value: float, timestamp: float = None) -> None:
+        with self._lock:
+            buffer = self.samples.setdefault(name, deque(maxlen=self.history))
+            buffer.append((time.time() if timestamp is None else timestamp, value))
+
+    def record_latency(self, command: str, seconds: float) -> None:
+        with self._lock:
+            self.latencies.setdefault(command, deque(maxlen=self.history)).append(seconds)
+
+    def render(self) -> bytes:
+        """
+        Renders the newest sample of every gauge and the query latencies in the Prometheus text format.
+
+        :return: The exposition, also stored in the exposition attribute.
+        :rtype: bytes
+        """
+        lines = []
+        with self._lock:
+            for name, buffer in self.samples.items():
+                if not buffer:
+                    continue
+                timestamp, value = buffer[-1]
+                lines.append(f"# HELP {name} {GAUGES[name][2] if name in GAUGES else name}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value:g} {int(timestamp * 1000)}")
+
+            if self.latencies:
+                lines.append(
+                    "# HELP ts3_query_latency_seconds Round trip time of query commands, from write to parsed response."
+                )
+                lines.append("# TYPE ts3_query_latency_seconds summary")
+            for command, buffer in self.latencies.items():
+                ordered = sorted(buffer)
+                for quantile in QUANTILES:
+                    value = ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+                    lines.append(f'ts3_query_latency_seconds{{command="{command}",quantile="{quantile}"}} {value:g}')
+                lines.append(f'ts3_query_latency_seconds_sum{{command="{command}"}} {sum(ordered):g}')
+                lines.append(f'ts3_query_latency_seconds_count{{command="{command}"}} {len(ordered)}')
+
+            self.exposition = "\n".join([*lines, ""]).encode()
+            return self.exposition
+
+    def sample(self, client: TS3Client) -> None:
+        """
+        Queries serverinfo, serverrequestconnectioninfo and hostinfo once, records their gauges and latencies
+        and renders the exposition. The latency is the round trip TS3Query measured from writing the command to
+        parsing its response, so waiting for flood protection or for the query lock is not included.
+
+        :param client: The client to query.
+        :type client: TS3Client
+        """
+        timestamp = time.time()
+        for command in COMMANDS:
+            response = client.query.send(TS3QueryCommand(command), use_cache=False)
+            if response is None:
+                continue
+            if response.latency is not None:
+                self.record_latency(command, response.latency)
+            if response.error_id != 0:
+                continue
+
+            row = response.data.get(0, {})
+            for name, (source, key, _) in GAUGES.items():
+                if source == command and key in row:
+                    try:
+                        self.record(name, float(row[key]), timestamp)
+                    except ValueError:
+                        continue
+        self.render()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+
+        body = self.server.registry.exposition
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class Metrics(Plugin):
+    scheduled = True
+
+    def run(self, port: int = 9192, host: str = "127.0.0.1", interval: int = 15, history: int = 240):
+        """
+        Samples server metrics on a schedule and serves them in the Prometheus text format on /metrics.
+
+        :param port: The port of the HTTP endpoint, defaults to 9192.
+        :type port: int
+        :param host: The address of the HTTP endpoint, defaults to "127.0.0.1".
+        :type host: str
+        :param interval: The interval in seconds between samples, defaults to 15.
+        :type interval: int
+        :param history: The number of samples to keep per gauge, defaults to 240.
+        :type history: int
+        """
+
+        self.registry = MetricsRegistry(history)
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        self.server.registry = self.registry
+        threading.Thread(target=self.server.serve_forever, name=f"{self.name}-http", daemon=True).start()
+        self.logger.info(f"Serving metrics on http://{host}:{self.server.server_address[1]}/metrics")
+        self.every(interval, self.sample)
+        self.ready()
+
+    def cleanup(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def sample(self) -> None:
+        self.logger.debug("Sampling metrics...")
+        try:
+            self.registry.sample(self.client)
+        except Exception as e:
+            self.logger.error(f"Sampling metrics failed: {e}")
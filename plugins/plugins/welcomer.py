@@ -1,27 +1,117 @@
+import os
 import random
+import sqlite3
+import time
 
-from ts3client import TS3Client
+from ts3client.event import ClientEnterViewEvent, ClientLeftViewEvent
 
 from ..plugin import Plugin
+from ..send_queue import SendQueue
+
+
+class SeenStore:
+    """
+    The unique identifiers of all clients that were greeted before, held in a set and backed by a SQLite database.
+    New identifiers are written with flush(), so a burst of first-time clients costs a single transaction.
+
+    :param path: The path of the database file.
+    :type path: str
+    """
+
+    def __init__(self, path: str) -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS seen (uid TEXT PRIMARY KEY, first_seen REAL NOT NULL)")
+        self._seen = {uid for (uid,) in self._connection.execute("SELECT uid FROM seen")}
+        self._pending: list[tuple[str, float]] = []
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def __contains__(self, uid: str) -> bool:
+        return uid in self._seen
+
+    def add(self, uid: str) -> bool:
+        """Marks a unique identifier as seen, returns whether it is seen for the first time."""
+        if uid in self._seen:
+            return False
+        self._seen.add(uid)
+        self._pending.append((uid, time.time()))
+        return True
+
+    def flush(self) -> int:
+        """Writes the identifiers added since the last flush, returns their number."""
+        pending, self._pending = self._pending, []
+        if pending:
+            with self._connection:
+                self._connection.executemany("INSERT OR IGNORE INTO seen (uid, first_seen) VALUES (?, ?)", pending)
+        return len(pending)
+
+    def close(self) -> None:
+        self.flush()
+        self._connection.close()
 
 
 class Welcomer(Plugin):
-    def run(self, messages: list = ["Welcome to the server!"]):
+    scheduled = True
+
+    def run(
+        self,
+        messages: list = ["Welcome to the server!"],
+        first_time_messages: list = [],
+        database: str = "data/welcomer.sqlite",
+        rate: int = 5,
+        burst: int = 10,
+        max_age: int = 60,
+    ):
         """
-        Send a welcome message to new clients.
+        Send a welcome message to clients that join the server, first-time clients get a different message.
+        Greetings are queued and sent in batches of at most rate messages per second, greetings to clients that
+        left before their turn or that waited longer than max_age seconds are dropped.
 
-        :param messages: The choice of messages to send to new clients.
+        :param messages: The choice of messages to send to returning clients, defaults to ["Welcome to the server!"].
         :type messages: list[str]
+        :param first_time_messages: The choice of messages to send to first-time clients, defaults to messages.
+        :type first_time_messages: list[str]
+        :param database: The path of the database of seen clients, defaults to "data/welcomer.sqlite".
+        :type database: str
+        :param rate: The number of greetings per second, defaults to 5.
+        :type rate: int
+        :param burst: The number of greetings that can be saved up while it is quiet, defaults to 10.
+        :type burst: int
+        :param max_age: The number of seconds after which a queued greeting is dropped, defaults to 60.
+        :type max_age: int
         """
+        self.messages = messages
+        self.first_time_messages = first_time_messages or messages
+        self.seen = SeenStore(database)
+        self.queue = SendQueue(self.client, rate, burst, max_age=max_age)
+
+        self.client.enable_server_events()
+        self.on(ClientEnterViewEvent, self.entered)
+        self.on(ClientLeftViewEvent, self.left)
+        self.every(1 / rate, self.tick)
         self.ready()
 
-        while not self.event.is_set():
-            self.logger.debug("Checking for new clients...")
-            for event in self.client.get_user_entered_events():
-                if event.client_type == 1:
-                    event.used = True
-                    continue
-                self.logger.info(f"Sending welcome message to {event.client_nickname}...")
-                self.client.send_private_message(event.clid, random.choice(messages))
-                event.used = True
-            self.event.wait(1)
+    def cleanup(self) -> None:
+        self.seen.close()
+
+    def tick(self) -> None:
+        self.queue.flush()
+        self.seen.flush()
+
+    def entered(self, event: ClientEnterViewEvent) -> None:
+        if event.client_type != 0:
+            return
+        uid = event.client_unique_identifier
+        first_time = uid is not None and self.seen.add(uid)
+        message = random.choice(self.first_time_messages if first_time else self.messages)
+        self.logger.info(f"Welcoming {event.client_nickname}...")
+        if not self.queue.put(event.clid, message):
+            self.logger.warning(f"Greeting queue is full, not welcoming {event.client_nickname}.")
+
+    def left(self, event: ClientLeftViewEvent) -> None:
+        self.queue.discard(event.clid)
@@ -0,0 +1,62 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+
+class RateLimiter:
+    """
+    Token buckets per key. Every bucket holds at most burst tokens and refills at rate tokens per second, a call
+    takes one token. A bucket is only its token count and the time it was last used, and a bucket that has been idle
+    long enough to be full again is dropped, since a new bucket behaves the same.
+
+    :param rate: The number of tokens added per second.
+    :type rate: float
+    :param burst: The maximum number of tokens in a bucket, defaults to 1.
+    :type burst: float, optional
+    """
+
+    def __init__(self, rate: float, burst: float = 1) -> None:
+        if rate <= 0 or burst < 1:
+            raise ValueError("The rate must be positive and the burst at least 1.")
+
+        self.rate = rate
+        self.burst = burst
+        self._buckets: OrderedDict[Hashable, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "RateLimiter":
+        """Creates a rate limiter from a dict with a rate and an optional burst."""
+        return cls(config["rate"], config.get("burst", 1))
+
+    def allow(self, key: Hashable, now: float = None) -> bool:
+        """
+        Takes a token from the bucket of a key.
+
+        :param key: The key.
+        :type key: Hashable
+        :param now: The current time, defaults to time.monotonic().
+        :type now: float, optional
+        :return: Whether a token was available.
+        :rtype: bool
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._evict(now)
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - allowed, now)
+            return allowed
+
+    def _evict(self, now: float) -> None:
+        # Buckets are ordered by their last use, so the idle ones are at the front.
+        while self._buckets:
+            key, (tokens, updated) = next(iter(self._buckets.items()))
+            if updated + (self.burst - tokens) / self.rate > now:
+                break
+            del self._buckets[key]
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Optional
+
+from ts3client import TS3Client
+from ts3client.event import Event
+from ts3client.utils.logger import create_logger
+
+from .timer_wheel import TimerWheel
+from .worker_pool import WorkerPool
+
+if TYPE_CHECKING:
+    from .plugin import Plugin
+
+logger = create_logger("PluginRuntime", "logs/main.log")
+
+
+@dataclass
+class Job:
+    plugin: Plugin
+    name: str
+    function: Callable
+    args: tuple
+    interval: Optional[float] = None
+    due: float = 0
+
+
+class PluginRuntime:
+    """
+    Runs scheduled plugins on a single scheduler thread and a shared pool of workers, instead of a thread per plugin.
+    Plugins register periodic or delayed jobs and event handlers. Due jobs are found with a timer wheel, events are
+    dispatched from a single response hook. All calls of a plugin - its run(), jobs, event handlers and cleanup() -
+    run one after another in the order they became due, so a plugin never runs concurrently with itself.
+
+    :param client: The client the plugins use.
+    :type client: TS3Client
+    :param workers: The number of worker threads shared by all plugins, defaults to 4.
+    :type workers: int, optional
+    :param max_pending: The maximum number of calls waiting for a worker, defaults to 1000.
+    :type max_pending: int, optional
+    :param resolution: The precision of the scheduler in seconds, defaults to 0.1.
+    :type resolution: float, optional
+    """
+
+    def __init__(self, client: TS3Client, workers: int = 4, max_pending: int = 1000, resolution: float = 0.1):
+        self.client = client
+        self.resolution = resolution
+        self.pool = WorkerPool(workers, max_pending, name="PluginRuntime")
+        self.plugins: list[Plugin] = []
+        self._wheel = TimerWheel(resolution, start=time.monotonic())
+        self._jobs: dict[tuple[int, str], Job] = {}
+        self._handlers: dict[type, list[tuple[Plugin, Callable]]] = {}
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Starts the scheduler thread and the event dispatch."""
+        self.client.query.add_response_hook(self._dispatch)
+        self._thread = threading.Thread(target=self._loop, name="PluginRuntime-scheduler", daemon=True)
+        self._thread.start()
+
+    def add(self, plugin: Plugin, config: dict) -> None:
+        """
+        Adds a plugin and calls its run() method with its configuration on the workers.
+
+        :param plugin: The plugin.
+        :type plugin: Plugin
+        :param config: The configuration of the plugin.
+        :type config: dict
+        """
+        with self._lock:
+            plugin.runtime = self
+            self.plugins.append(plugin)
+        self.submit(plugin, partial(plugin.run, **config))
+
+    def remove(self, plugin: Plugin) -> None:
+        """
+        Stops a plugin: its jobs and event handlers are dropped, its event is set, and its cleanup() runs after the
+        calls that are already queued for it.
+
+        :param plugin: The plugin.
+        :type plugin: Plugin
+        """
+        with self._lock:
+            if plugin not in self.plugins:
+                return
+            self.plugins.remove(plugin)
+            for key in [key for key, job in self._jobs.items() if job.plugin is plugin]:
+                del self._jobs[key]
+                self._wheel.cancel(key)
+            for event_type, handlers in self._handlers.items():
+                handlers[:] = [(owner, handler) for owner, handler in handlers if owner is not plugin]
+        plugin.event.set()
+        self.pool.submit(plugin.cleanup, key=id(plugin))
+
+    def drain(self, plugin: Plugin, timeout: float = None) -> bool:
+        """Waits until the calls that are queued for a plugin have run, returns False on timeout."""
+        done = threading.Event()
+        return self.pool.submit(done.set, key=id(plugin)) and done.wait(timeout)
+
+    def submit(self, plugin: Plugin, function: Callable, *args) -> bool:
+        """Runs a function for a plugin on the workers, after the calls that are already queued for that plugin."""
+        if not self.pool.submit(function, *args, key=id(plugin)):
+            logger.warning(
+                f"Too many pending calls, dropping {getattr(function, '__name__', function)} of {plugin.name}."
+            )
+            return False
+        return True
+
+    def schedule(
+        self, plugin: Plugin, function: Callable, *args, delay: float = 0, interval: float = None, name: str = None
+    ) -> str:
+        """
+        Schedules a job of a plugin. A job with the same name replaces the previous one.
+
+        :param plugin: The plugin.
+        :type plugin: Plugin
+        :param function: The function to call.
+        :type function: Callable
+        :param args: The arguments to call it with.
+        :param delay: The number of seconds until the first call, defaults to 0.
+        :type delay: float, optional
+        :param interval: The number of seconds between calls, defaults to None (once).
+        :type interval: float, optional
+        :param name: The name of the job, defaults to the name of the function.
+        :type name: str, optional
+        :return: The name of the job.
+        :rtype: str
+        """
+        name = name or getattr(function, "__name__", repr(function))
+        job = Job(plugin, name, function, args, interval, time.monotonic() + delay)
+        with self._lock:
+            self._jobs[(id(plugin), name)] = job
+            self._wheel.schedule((id(plugin), name), job.due)
+        return name
+
+    def cancel(self, plugin: Plugin, name: str) -> bool:
+        """Cancels a job of a plugin, returns whether it was scheduled."""
+        with self._lock:
+            self._wheel.cancel((id(plugin), name))
+            return self._jobs.pop((id(plugin), name), None) is not None
+
+    def on(self, plugin: Plugin, event_type: type[Event], handler: Callable[[Event], None]) -> None:
+        """
+        Calls a handler of a plugin with every event of a type that arrives with a response.
+
+        :param plugin: The plugin.
+        :type plugin: Plugin
+        :param event_type: The event class.
+        :type event_type: type[Event]
+        :param handler: The handler.
+        :type handler: Callable[[Event], None]
+        """
+        with self._lock:
+            self._handlers.setdefault(event_type, []).append((plugin, handler))
+
+    def stop(self, timeout: float = 5) -> None:
+        """
+        Stops all plugins in one drain: no further jobs are started, every plugin's event is set, the calls that are
+        already queued run, then every plugin's cleanup() runs.
+
+        :param timeout: The maximum number of seconds to wait for the drain, defaults to 5.
+        :type timeout: float, optional
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.client.query.remove_response_hook(self._dispatch)
+        for plugin in list(self.plugins):
+            self.remove(plugin)
+        self.pool.shutdown(timeout=timeout)
+
+    def _loop(self) -> None:
+        while not self._stopped.wait(self.resolution):
+            with self._lock:
+                due = [self._jobs[key] for key in self._wheel.advance(time.monotonic()) if key in self._jobs]
+            for job in due:
+                if not self.submit(job.plugin, self._run, job):
+                    with self._lock:
+                        self._reschedule(job)
+
+    def _run(self, job: Job) -> None:
+        with self._lock:
+            if self._jobs.get((id(job.plugin), job.name)) is not job:
+                # Cancelled or replaced while it was waiting for a worker.
+                return
+        try:
+            if not job.plugin.event.is_set():
+                job.function(*job.args)
+        finally:
+            with self._lock:
+                self._reschedule(job)
+
+    def _reschedule(self, job: Job) -> None:
+        key = (id(job.plugin), job.name)
+        if self._jobs.get(key) is not job:
+            # The job was cancelled or replaced in the meantime.
+            return
+        if job.interval is None or job.plugin.event.is_set():
+            del self._jobs[key]
+            return
+        job.due = max(job.due + job.interval, time.monotonic())
+        self._wheel.schedule(key, job.due)
+
+    def _dispatch(self, command, response) -> None:
+        for event in response.events:
+            with self._lock:
+                handlers = list(self._handlers.get(type(event), []))
+            for plugin, handler in handlers:
+                self.submit(plugin, handler, event)
@@ -0,0 +1,106 @@
+import time
+from collections import OrderedDict
+
+from ts3client import TS3Client
+from ts3client.constants import TargetMode
+from ts3client.ts3query.ts3query_command import TS3QueryCommand
+
+
+class SendQueue:
+    """
+    Queues private messages and sends them in pipelined batches, paced by a token bucket of rate messages per second
+    that holds at most burst messages. flush() never waits for tokens and sends at most rate messages, even when the
+    bucket holds more, so a single flush never takes more than a second's worth of the query's send slots and other
+    plugins get their commands in between.
+    There is at most one queued message per client; messages to clients that left or that waited longer than
+    max_age seconds are dropped instead of being sent late.
+
+    :param client: The client to send with.
+    :type client: TS3Client
+    :param rate: The number of messages per second, defaults to 5.
+    :type rate: float, optional
+    :param burst: The number of messages that can be sent at once, defaults to 10.
+    :type burst: int, optional
+    :param max_size: The maximum number of queued messages, defaults to 1000.
+    :type max_size: int, optional
+    :param max_age: The number of seconds after which a queued message is dropped, defaults to 60.
+    :type max_age: float, optional
+    """
+
+    def __init__(
+        self, client: TS3Client, rate: float = 5, burst: int = 10, max_size: int = 1000, max_age: float = 60
+    ) -> None:
+        if rate <= 0 or burst < 1:
+            raise ValueError("The rate must be positive and the burst at least 1.")
+
+        self.client = client
+        self.rate = rate
+        self.burst = burst
+        self.max_size = max_size
+        self.max_age = max_age
+        self.dropped = 0
+        self._queue: OrderedDict[int, tuple[float, str]] = OrderedDict()
+        self._tokens = float(burst)
+        self._updated: float | None = None
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __contains__(self, clid: int) -> bool:
+        return clid in self._queue
+
+    def put(self, clid: int, message: str, now: float = None) -> bool:
+        """
+        Queues a message, replacing a message that is still queued for the same client.
+
+        :param clid: The client ID.
+        :type clid: int
+        :param message: The message.
+        :type message: str
+        :param now: The current time, defaults to time.monotonic().
+        :type now: float, optional
+        :return: Whether the message was queued, False if the queue is full.
+        :rtype: bool
+        """
+        if clid not in self._queue and len(self._queue) >= self.max_size:
+            self.dropped += 1
+            return False
+        self._queue[clid] = (time.monotonic() if now is None else now, message)
+        return True
+
+    def discard(self, clid: int) -> bool:
+        """Removes the queued message of a client, returns whether there was one."""
+        return self._queue.pop(clid, None) is not None
+
+    def flush(self, now: float = None) -> int:
+        """
+        Sends as many queued messages as the bucket allows, but at most rate, in a single batch, oldest first.
+
+        :param now: The current time, defaults to time.monotonic().
+        :type now: float, optional
+        :return: The number of messages sent.
+        :rtype: int
+        """
+        now = time.monotonic() if now is None else now
+        if self._updated is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+        commands = []
+        limit = min(int(self._tokens), max(1, int(self.rate)))
+        while self._queue and len(commands) < limit:
+            clid, (queued, message) = self._queue.popitem(last=False)
+            if now - queued > self.max_age:
+                self.dropped += 1
+                continue
+            commands.append(
+                TS3QueryCommand(
+                    "sendtextmessage", kwargs={"targetmode": TargetMode.CLIENT.value, "target": clid, "msg": message}
+                )
+            )
+        if not commands:
+            return 0
+
+        self._tokens -= len(commands)
+        self.client.query.send_batch(commands)
+        return len(commands)
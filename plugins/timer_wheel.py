@@ -0,0 +1,115 @@
+from typing import Hashable
+
+
+class TimerWheel:
+    """
+    A hierarchical timer wheel. Scheduling and cancelling a deadline is O(1), and advancing the wheel only touches
+    the deadlines that expire or move down to a finer level, no matter how many deadlines are scheduled.
+    Level 0 has slots of resolution seconds, every further level has slots that span a whole turn of the level below.
+    Deadlines further out than the top level are parked in it and placed again when it turns.
+
+    :param resolution: The length of a level 0 slot in seconds, defaults to 1.
+    :type resolution: float, optional
+    :param slots: The number of slots per level, defaults to 64.
+    :type slots: int, optional
+    :param levels: The number of levels, defaults to 4 (about 194 days with the defaults).
+    :type levels: int, optional
+    :param start: The current time in seconds, defaults to 0.
+    :type start: float, optional
+    """
+
+    def __init__(self, resolution: float = 1, slots: int = 64, levels: int = 4, start: float = 0) -> None:
+        self.resolution = resolution
+        self.slots = slots
+        self.levels = levels
+        self._tick = int(start // resolution)
+        self._wheels: list[list[set]] = [[set() for _ in range(slots)] for _ in range(levels)]
+        self._entries: dict[Hashable, tuple[int, int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def deadline(self, key: Hashable) -> float | None:
+        """Returns the time a key is scheduled for, rounded up to the resolution."""
+        entry = self._entries.get(key)
+        return entry[0] * self.resolution if entry else None
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """
+        Schedules a key to expire at a time, replacing its previous deadline.
+
+        :param key: The key.
+        :type key: Hashable
+        :param deadline: The time in seconds, deadlines in the past expire with the next tick.
+        :type deadline: float
+        """
+        self.cancel(key)
+        tick = -int(-deadline // self.resolution)
+        self._place(key, max(tick, self._tick + 1))
+
+    def cancel(self, key: Hashable) -> bool:
+        """
+        Removes a key from the wheel.
+
+        :param key: The key.
+        :type key: Hashable
+        :return: Whether the key was scheduled.
+        :rtype: bool
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        _, level, slot = entry
+        self._wheels[level][slot].discard(key)
+        return True
+
+    def advance(self, now: float) -> list[Hashable]:
+        """
+        Moves the wheel forward to a time and removes the keys whose deadline has passed.
+
+        :param now: The current time in seconds.
+        :type now: float
+        :return: The expired keys, earliest first.
+        :rtype: list[Hashable]
+        """
+        target = int(now // self.resolution)
+        expired: list[Hashable] = []
+        while self._tick < target:
+            if not self._entries:
+                self._tick = target
+                break
+
+            self._tick += 1
+            for level in range(1, self.levels):
+                if self._tick % self.slots**level:
+                    break
+                self._cascade(level)
+
+            bucket = self._wheels[0][self._tick % self.slots]
+            if bucket:
+                keys = [key for key in bucket if self._entries[key][0] <= self._tick]
+                for key in keys:
+                    bucket.discard(key)
+                    del self._entries[key]
+                expired.extend(keys)
+        return expired
+
+    def _cascade(self, level: int) -> None:
+        bucket = self._wheels[level][(self._tick // self.slots**level) % self.slots]
+        keys = list(bucket)
+        bucket.clear()
+        for key in keys:
+            tick = self._entries.pop(key)[0]
+            self._place(key, tick)
+
+    def _place(self, key: Hashable, tick: int) -> None:
+        delta = tick - self._tick
+        level = 0
+        while level < self.levels - 1 and delta >= self.slots ** (level + 1):
+            level += 1
+        slot = (tick // self.slots**level) % self.slots
+        self._wheels[level][slot].add(key)
+        self._entries[key] = (tick, level, slot)
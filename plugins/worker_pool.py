@@ -0,0 +1,199 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable, Optional
+
+from ts3client.utils.logger import create_logger
+
+logger = create_logger("WorkerPool", "logs/main.log")
+
+
+@dataclass
+class Task:
+    function: Callable
+    args: tuple
+    key: Hashable
+    timeout: Optional[float] = None
+    started: Optional[float] = None
+    timed_out: bool = field(default=False, init=False)
+
+    @property
+    def name(self) -> str:
+        return getattr(self.function, "__qualname__", repr(self.function))
+
+
+class WorkerPool:
+    """
+    A bounded pool of worker threads. Tasks with the same key run one after another in the order they were submitted,
+    tasks with different keys run concurrently.
+    A task that runs longer than its timeout is given up on: the next task of its key may start and a new worker
+    replaces the one that is still busy with it, which exits once the task returns.
+
+    :param workers: The number of worker threads, defaults to 4.
+    :type workers: int, optional
+    :param max_pending: The maximum number of tasks waiting to run, defaults to 100.
+    :type max_pending: int, optional
+    :param name: The name prefix of the worker threads, defaults to "Worker".
+    :type name: str, optional
+    :param on_timeout: Called with a task that exceeded its timeout, defaults to None.
+    :type on_timeout: Callable[[Task], None], optional
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_pending: int = 100,
+        name: str = "Worker",
+        on_timeout: Callable[[Task], Any] = None,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("A worker pool needs at least one worker.")
+
+        self.workers = workers
+        self.max_pending = max_pending
+        self.name = name
+        self.on_timeout = on_timeout
+        self._queues: dict[Hashable, deque[Task]] = {}
+        self._ready: deque[Hashable] = deque()
+        self._running: dict[Hashable, Task] = {}
+        self._pending = 0
+        self._threads: set[threading.Thread] = set()
+        self._stuck = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._watchdog: Optional[threading.Thread] = None
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Returns the number of tasks that are waiting or running."""
+        with self._condition:
+            return self._pending + len(self._running)
+
+    def submit(self, function: Callable, *args, key: Hashable = None, timeout: float = None) -> bool:
+        """
+        Queues a task.
+
+        :param function: The function to call.
+        :type function: Callable
+        :param args: The arguments to call it with.
+        :param key: Tasks with the same key run in order, defaults to None (no ordering).
+        :type key: Hashable, optional
+        :param timeout: The number of seconds after which the task is given up on, defaults to None (never).
+        :type timeout: float, optional
+        :return: Whether the task was queued, False if the pool is full or shut down.
+        :rtype: bool
+        """
+        with self._condition:
+            if self._closed or self._pending >= self.max_pending:
+                return False
+
+            task = Task(function, args, object() if key is None else key, timeout)
+            queue = self._queues.setdefault(task.key, deque())
+            if not queue and task.key not in self._running:
+                self._ready.append(task.key)
+            queue.append(task)
+            self._pending += 1
+
+            if len(self._threads) - self._stuck < self.workers:
+                self._start_worker()
+            if timeout is not None and self._watchdog is None:
+                self._watchdog = threading.Thread(target=self._watch, name=f"{self.name}-watchdog", daemon=True)
+                self._watchdog.start()
+            self._condition.notify_all()
+            return True
+
+    def shutdown(self, wait: bool = True, timeout: float = None) -> None:
+        """
+        Stops accepting tasks. The queued tasks are still run, then the workers exit.
+
+        :param wait: Whether to wait for the workers, defaults to True.
+        :type wait: bool, optional
+        :param timeout: The maximum number of seconds to wait, defaults to None (no limit).
+        :type timeout: float, optional
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            threads = list(self._threads)
+        if not wait:
+            return
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in threads:
+            thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
+
+    def _start_worker(self) -> None:
+        self._count += 1
+        thread = threading.Thread(target=self._work, name=f"{self.name}-{self._count}", daemon=True)
+        self._threads.add(thread)
+        thread.start()
+
+    def _work(self) -> None:
+        thread = threading.current_thread()
+        while True:
+            with self._condition:
+                while not self._ready and not (self._closed and not self._pending):
+                    self._condition.wait()
+                if not self._ready:
+                    self._threads.discard(thread)
+                    return
+
+                key = self._ready.popleft()
+                task = self._queues[key].popleft()
+                if not self._queues[key]:
+                    del self._queues[key]
+                self._pending -= 1
+                task.started = time.monotonic()
+                self._running[key] = task
+                self._condition.notify_all()
+
+            try:
+                task.function(*task.args)
+            except Exception:
+                logger.exception(f"Task {task.name} failed.")
+
+            with self._condition:
+                if task.timed_out:
+                    # The watchdog already released the key and started a replacement.
+                    self._threads.discard(thread)
+                    self._stuck -= 1
+                    return
+                del self._running[key]
+                if key in self._queues:
+                    self._ready.append(key)
+                    self._condition.notify_all()
+
+    def _watch(self) -> None:
+        with self._condition:
+            while not (self._closed and not self._pending and not self._running):
+                now = time.monotonic()
+                deadlines = [
+                    (task.started + task.timeout, key)
+                    for key, task in self._running.items()
+                    if task.timeout is not None
+                ]
+                expired = [self._expire(key) for deadline, key in deadlines if deadline <= now]
+                if expired and self.on_timeout is not None:
+                    self._condition.release()
+                    try:
+                        for task in expired:
+                            self.on_timeout(task)
+                    finally:
+                        self._condition.acquire()
+                    continue
+
+                waits = [deadline - now for deadline, _ in deadlines if deadline > now]
+                self._condition.wait(min(waits) if waits else None)
+            self._watchdog = None
+
+    def _expire(self, key: Hashable) -> Task:
+        task = self._running.pop(key)
+        task.timed_out = True
+        logger.warning(f"Task {task.name} exceeded its timeout of {task.timeout} seconds.")
+        if key in self._queues:
+            self._ready.append(key)
+        self._stuck += 1
+        self._start_worker()
+        self._condition.notify_all()
+        return task
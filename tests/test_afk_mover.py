@@ -0,0 +1,112 @@
+import threading
+
+import pytest
+
+from plugins.plugins import AFK_Mover, afk_mover
+from plugins.runtime import PluginRuntime
+from ts3client import TS3Client
+
+from .utils import FakeClock, FakeQuery, make_response
+
+AFK_CHANNEL = 9
+CONFIG = {"afk_channel_id": AFK_CHANNEL, "afk_time": 60, "check_interval": 60, "ignore_channels": [2]}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock(advance=False)
+    monkeypatch.setattr(afk_mover, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def connect(clock):
+    runtimes = []
+
+    def start(idle: dict[int, int]) -> tuple[TS3Client, AFK_Mover]:
+        client, plugin = create(idle)
+        runtime = PluginRuntime(client)
+        runtimes.append(runtime)
+        runtime.start()
+        runtime.add(plugin, CONFIG)
+        assert runtime.drain(plugin, 5)
+        return client, plugin
+
+    yield start
+    for runtime in runtimes:
+        runtime.stop(1)
+
+
+def create(idle: dict[int, int]) -> tuple[TS3Client, AFK_Mover]:
+    def client_info(command):
+        clid = command.kwargs["clid"]
+        if clid not in idle:
+            return make_response(b"", 512, rb"invalid\sclientID")
+        return f"cid=1 client_nickname=client{clid} client_idle_time={idle[clid]}".encode()
+
+    client = TS3Client()
+    client.query = FakeQuery(
+        {
+            "clientlist": b"clid=1 cid=1 client_type=0 client_idle_time=0|"
+            b"clid=2 cid=1 client_type=0 client_idle_time=50000|"
+            b"clid=3 cid=2 client_type=0 client_idle_time=90000|"
+            b"clid=4 cid=1 client_type=1 client_idle_time=90000",
+            "clientinfo": client_info,
+        }
+    )
+    return client, AFK_Mover(client, threading.Event())
+
+
+def commands(client: TS3Client) -> list[str]:
+    return [command.command for command in client.query.sent if command.command != "servernotifyregister"]
+
+
+def test_only_expired_clients_are_checked(connect):
+    idle = {1: 0, 2: 50000, 3: 90000}
+    client, plugin = connect(idle)
+    assert sorted(plugin.wheel._entries) == [1, 2]
+
+    plugin.check(1005)
+    assert commands(client) == ["clientlist"]
+
+    idle[2] = 60000
+    plugin.check(1010)
+    assert [command.kwargs for command in client.query.sent if command.command == "clientinfo"] == [{"clid": 2}]
+    assert commands(client)[-2:] == ["clientmove", "sendtextmessage"]
+    assert 2 not in plugin.wheel
+
+
+def test_active_clients_are_rescheduled(connect):
+    idle = {1: 0, 2: 50000, 3: 90000}
+    client, plugin = connect(idle)
+
+    # Client 2 was active in between, so it is checked again when its new idle time would reach afk_time.
+    idle[2] = 5000
+    plugin.check(1010)
+    assert plugin.wheel.deadline(2) == 1065
+    assert "clientmove" not in commands(client)
+
+
+def test_deadlines_follow_events(connect, clock):
+    idle = {1: 0, 2: 50000, 3: 90000}
+    client, plugin = connect(idle)
+    clock.now = 1020
+
+    client.query.responses["version"] = (
+        b"notifyclientmoved ctid=2 reasonid=0 clid=1\n\r"
+        b"notifyclientleftview cfid=1 ctid=0 reasonid=8 clid=2\n\r"
+        b"notifyclientmoved ctid=1 reasonid=1 invokerid=7 clid=3\n\r"
+        b"notifycliententerview cfid=0 ctid=1 reasonid=0 clid=5 client_type=0 client_nickname=new\n\r"
+        b"version=3.13.7"
+    )
+    client.query.commands.version()
+    assert plugin.runtime.drain(plugin, 5)
+
+    assert 1 not in plugin.wheel and 2 not in plugin.wheel
+    # Moved out of an ignored channel by someone else: checked right away.
+    assert plugin.wheel.deadline(3) == 1020
+    assert plugin.wheel.deadline(5) == 1080
+
+    del idle[3]
+    plugin.check(1020)
+    assert 3 not in plugin.channels
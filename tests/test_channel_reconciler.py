@@ -0,0 +1,115 @@
+import itertools
+
+import pytest
+
+from ts3client import TS3Client
+from ts3client.channel import ChannelReconciler
+
+from .utils import FakeQuery
+
+CHANNELLIST = (
+    b"cid=1 pid=0 channel_order=0 channel_name=Lobby channel_topic=Welcome channel_flag_permanent=1 "
+    b"channel_maxclients=-1|"
+    b"cid=2 pid=0 channel_order=1 channel_name=Gaming channel_topic channel_flag_permanent=1 channel_maxclients=-1|"
+    b"cid=3 pid=2 channel_order=0 channel_name=CS2 channel_topic channel_flag_permanent=1 channel_maxclients=5|"
+    b"cid=4 pid=2 channel_order=3 channel_name=Minecraft channel_topic channel_flag_permanent=1 channel_maxclients=-1|"
+    b"cid=5 pid=2 channel_order=4 channel_name=Valorant channel_topic channel_flag_permanent=1 channel_maxclients=-1|"
+    b"cid=6 pid=0 channel_order=2 channel_name=AFK channel_topic channel_flag_permanent=1 channel_maxclients=-1"
+)
+
+LAYOUT = [
+    {"name": "Lobby", "topic": "Welcome", "flag_permanent": True},
+    {
+        "name": "Gaming",
+        "flag_permanent": True,
+        "children": [{"name": "CS2", "maxclients": 5}, {"name": "Minecraft"}, {"name": "Valorant"}],
+    },
+    {"name": "AFK"},
+]
+
+
+def connect() -> TS3Client:
+    ids = itertools.count(100)
+    client = TS3Client()
+    client.query = FakeQuery({"channellist": CHANNELLIST, "channelcreate": lambda _: f"cid={next(ids)}".encode()})
+    return client
+
+
+def test_unchanged_layout_costs_one_read():
+    client = connect()
+    assert ChannelReconciler(client).apply(LAYOUT, prune=True) == []
+    assert [command.command for command in client.query.sent] == ["channellist"]
+    assert client.query.batches == []
+
+
+def test_edits_only_changed_listed_properties():
+    client = connect()
+    layout = [
+        {"name": "Lobby", "topic": "Hello there", "flag_permanent": True, "description": "Only set on create"},
+        {"name": "Gaming", "children": [{"name": "CS2", "channel_maxclients": 10}]},
+    ]
+    steps = ChannelReconciler(client).plan(layout)
+    assert [str(step) for step in steps] == [
+        "channeledit cid=1 channel_topic=Hello there",
+        "channeledit cid=3 channel_maxclients=10",
+    ]
+
+
+def test_only_the_fewest_channels_are_moved():
+    client = connect()
+    layout = [{"name": "Gaming", "children": [{"name": "Valorant"}, {"name": "CS2"}, {"name": "Minecraft"}]}]
+    steps = ChannelReconciler(client).plan(layout)
+    assert [(step.command, step.kwargs) for step in steps] == [("channelmove", {"cid": 5, "cpid": 2, "order": 0})]
+
+
+def test_created_channels_are_referenced_by_later_steps():
+    client = connect()
+    layout = [
+        {"name": "Lobby", "topic": "Hi"},
+        {"name": "Events", "flag_permanent": 1, "children": [{"name": "Stage"}, {"name": "Backstage"}]},
+        {"name": "Gaming"},
+    ]
+    steps = ChannelReconciler(client).apply(layout)
+
+    assert [str(step) for step in steps] == [
+        "channeledit cid=1 channel_topic=Hi",
+        "channelcreate channel_name=Events channel_flag_permanent=1 cpid=0 channel_order=1",
+        "channelcreate channel_name=Stage cpid=</Events> channel_order=0",
+        "channelcreate channel_name=Backstage cpid=</Events> channel_order=</Events/Stage>",
+    ]
+    batches = [[command.encoded.rstrip() for command in batch] for batch in client.query.batches]
+    assert batches == [
+        [
+            b"channeledit cid=1 channel_topic=Hi",
+            b"channelcreate channel_name=Events channel_flag_permanent=1 cpid=0 channel_order=1",
+        ],
+        [b"channelcreate channel_name=Stage cpid=100 channel_order=0"],
+        [b"channelcreate channel_name=Backstage cpid=100 channel_order=101"],
+    ]
+
+
+def test_prune_deletes_unmanaged_channels_first():
+    client = connect()
+    layout = [{"name": "Lobby"}, {"name": "Gaming", "children": [{"name": "CS2"}]}, {"name": "Music"}]
+    steps = ChannelReconciler(client).plan(layout, prune=True)
+    assert [(step.command, step.path) for step in steps] == [
+        ("channeldelete", "/AFK"),
+        ("channeldelete", "/Gaming/Minecraft"),
+        ("channeldelete", "/Gaming/Valorant"),
+        ("channelcreate", "/Music"),
+    ]
+
+
+def test_dry_run_sends_nothing():
+    client = connect()
+    steps = ChannelReconciler(client).apply([{"name": "Music"}], prune=True, dry_run=True)
+    assert len(steps) == 4
+    assert client.query.batches == []
+
+
+def test_invalid_layouts_are_rejected():
+    client = connect()
+    with pytest.raises(ValueError):
+        ChannelReconciler(client).plan([{"topic": "No name"}])
+    with pytest.raises(ValueError):
+        ChannelReconciler(client).plan([{"name": "Lobby", "colour": "red"}])
@@ -0,0 +1,71 @@
+from ts3client.channel import Channel, ChannelTree
+from ts3client.ts3query.ts3query_command import TS3QueryCommand
+
+from .utils import make_response
+
+CHANNELLIST = (
+    b"cid=1 pid=0 channel_order=0 channel_name=Lobby total_clients=0 channel_needed_subscribe_power=0|"
+    b"cid=2 pid=0 channel_order=1 channel_name=Gaming total_clients=0 channel_needed_subscribe_power=0|"
+    b"cid=4 pid=2 channel_order=3 channel_name=Minecraft total_clients=0 channel_needed_subscribe_power=0|"
+    b"cid=3 pid=2 channel_order=0 channel_name=CS2 total_clients=0 channel_needed_subscribe_power=0|"
+    b"cid=5 pid=3 channel_order=0 channel_name=Team\\sA total_clients=0 channel_needed_subscribe_power=0"
+)
+
+
+def make_tree() -> ChannelTree:
+    tree = ChannelTree()
+    tree.feed(TS3QueryCommand("channellist"), make_response(CHANNELLIST))
+    return tree
+
+
+def test_tree_lookups():
+    tree = make_tree()
+    assert [channel.cid for channel in tree.children()] == [1, 2]
+    assert [channel.cid for channel in tree.children(2)] == [3, 4]
+    assert tree.parent(5).cid == 3
+    assert [channel.cid for channel in tree.walk()] == [1, 2, 3, 5, 4]
+    assert tree.find_by_path("Gaming/CS2/Team A").cid == 5
+    assert tree.find_by_path("Gaming/Team A") is None
+    assert tree.path_of(5) == "Gaming/CS2/Team A"
+
+
+def test_tree_is_cleared_when_the_context_changes():
+    tree = make_tree()
+    tree.feed(TS3QueryCommand("use", kwargs={"sid": 2}), make_response(b"", 1024, rb"invalid\sserverID"))
+    assert tree.loaded and len(tree) == 5
+
+    tree.feed(TS3QueryCommand("use", kwargs={"sid": 2}), make_response(b""))
+    assert not tree.loaded and len(tree) == 0
+    assert tree.find_by_path("Gaming") is None and tree.children() == []
+
+    tree.feed(TS3QueryCommand("channellist"), make_response(CHANNELLIST))
+    assert tree.loaded and tree.find_by_path("Gaming/CS2").cid == 3
+
+
+def test_tree_follows_channel_events():
+    tree = make_tree()
+    tree.feed(
+        TS3QueryCommand("version"),
+        make_response(
+            b"notifychannelcreated cid=6 cpid=2 channel_name=Valorant channel_order=3 channel_codec=4 invokerid=1\n\r"
+            b"notifychannelmoved cid=4 cpid=0 order=1 invokerid=1\n\r"
+            b"notifychanneledited cid=2 reasonid=10 channel_name=Games\n\r"
+            b"version=3.13.7"
+        ),
+    )
+    assert [channel.cid for channel in tree.children(2)] == [3, 6]
+    assert [channel.cid for channel in tree.children()] == [1, 4, 2]
+    assert tree.get(2).channel_order == 4
+    assert tree.find_by_path("Games/Valorant").cid == 6
+
+    tree.feed(TS3QueryCommand("version"), make_response(b"notifychanneldeleted cid=3 invokerid=1\n\rversion=3.13.7"))
+    assert 5 not in tree
+    assert tree.find_by_path("Games/CS2") is None
+    assert tree.get(6).channel_order == 0
+
+
+def test_tree_add_keeps_sibling_order():
+    tree = ChannelTree([Channel(1, 0, 0, "A"), Channel(2, 0, 1, "B")])
+    tree.add(Channel(3, 0, 1, "C"))
+    assert [channel.cid for channel in tree.children()] == [1, 3, 2]
+    assert tree.get(2).channel_order == 3
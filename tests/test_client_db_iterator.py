@@ -0,0 +1,46 @@
+from ts3client import TS3Client
+
+from .utils import FakeQuery, make_response
+
+USERS = 25
+
+
+def clientdblist(command):
+    start, duration = command.kwargs["start"], command.kwargs["duration"]
+    rows = [
+        f"cldbid={i + 1} client_unique_identifier=uid{i}= client_nickname=user{i} client_created=0".encode()
+        for i in range(start, min(start + duration, USERS))
+    ]
+    if not rows:
+        return make_response(b"", 1281, rb"database\sempty\sresult\sset")
+    if ("count", True) in command.args:
+        rows[-1] += f" count={USERS}".encode()
+    return make_response(b"|".join(rows))
+
+
+def connect() -> TS3Client:
+    client = TS3Client()
+    client.query = FakeQuery({"clientdblist": clientdblist})
+    return client
+
+
+def test_iterates_all_pages():
+    client = connect()
+    scan = client.iter_client_db(page_size=10)
+    users = list(scan)
+    assert [user.cldbid for user in users] == list(range(1, USERS + 1))
+    assert scan.total == USERS
+    assert scan.progress == 1.0
+    assert [command.kwargs["start"] for command in client.query.sent] == [0, 10, 20]
+
+
+def test_resumes_from_offset():
+    client = connect()
+    scan = client.iter_client_db(page_size=10)
+    for user in scan:
+        if user.cldbid == 13:
+            break
+    assert scan.offset == 13
+
+    assert [user.cldbid for user in scan] == list(range(14, USERS + 1))
+    assert scan.offset == USERS
@@ -0,0 +1,174 @@
+import threading
+import time
+
+import pytest
+
+from plugins import commands as all_commands
+from plugins.command import Command
+from plugins.command_trie import CommandTrie
+from plugins.plugins import CommandHandler
+from plugins.rate_limiter import RateLimiter
+from plugins.runtime import PluginRuntime
+from plugins.worker_pool import WorkerPool
+from ts3client import TS3Client
+from ts3client.message import Message
+
+from .utils import FakeQuery
+
+
+class Record(Command):
+    subcommands = {"add": "run_add"}
+
+    def __init__(self, client: TS3Client, trigger: str, *args, delay: float = 0, **kwargs):
+        super().__init__(client, trigger)
+        self.delay = delay
+        self.calls: list[tuple[str, str]] = []
+
+    def run(self, message: Message):
+        time.sleep(self.delay)
+        self.calls.append(("run", message.content))
+
+    def run_add(self, message: Message):
+        self.calls.append(("add", message.content))
+
+    def cleanup(self):
+        self.calls.append(("cleanup", ""))
+
+
+def message(content: str, uid: str = "uid=") -> Message:
+    return Message(
+        targetmode=1, msg=content.replace(" ", r"\s"), target=1, invokerid=5, invokername="user", invokeruid=uid
+    )
+
+
+def test_trie_resolves_the_longest_trigger():
+    trie = CommandTrie()
+    trie.add("weather", "current")
+    trie.add("weather forecast", "forecast")
+    trie.add("w", "current")
+
+    assert trie.resolve("weather Berlin") == ("current", "Berlin")
+    assert trie.resolve("weather  forecast New York") == ("forecast", "New York")
+    assert trie.resolve("w") == ("current", "")
+    assert trie.resolve("weatherman") is None
+    with pytest.raises(ValueError):
+        trie.add("weather", "again")
+
+
+def test_aliases_and_subcommands_are_dispatched():
+    handler = CommandHandler(TS3Client(), threading.Event())
+    handler.prefix = "!"
+    handler.routes = CommandTrie()
+    handler.pool = WorkerPool(2)
+    command = Record(handler.client, "note")
+    handler.add_routes(command, {"trigger": "note", "aliases": ["n"]})
+
+    assert handler.dispatch(message("!n hello"))
+    assert handler.dispatch(message("!note add milk"))
+    assert not handler.dispatch(message("!unknown"))
+    assert not handler.dispatch(message("no prefix"))
+    handler.pool.shutdown()
+    assert command.calls == [("run", "!n hello"), ("add", "!note add milk")]
+
+
+def test_commands_of_a_user_stay_ordered():
+    pool = WorkerPool(4)
+    calls: list[tuple[str, int]] = []
+    # The first commands of all four users only get past the barrier if they run at the same time.
+    barrier = threading.Barrier(4, timeout=5)
+
+    def work(user: str, number: int):
+        if number == 0:
+            barrier.wait()
+        calls.append((user, number))
+
+    for number in range(3):
+        for user in "abcd":
+            assert pool.submit(work, user, number, key=user)
+    pool.shutdown()
+
+    assert not barrier.broken
+    assert len(calls) == 12
+    for user in "abcd":
+        assert [number for name, number in calls if name == user] == [0, 1, 2]
+
+
+def test_slow_commands_time_out():
+    pool = WorkerPool(1, max_pending=2)
+    timed_out = []
+    pool.on_timeout = timed_out.append
+    started = threading.Event()
+    release = threading.Event()
+    done = threading.Event()
+
+    def stuck():
+        started.set()
+        release.wait(5)
+
+    assert pool.submit(stuck, key="a", timeout=0.1)
+    assert started.wait(2)
+    assert pool.submit(done.set, key="a")
+    assert pool.submit(done.set, key="b")
+    assert not pool.submit(done.set, key="c")
+
+    # The next command of the same user and of others run while the slow one is still stuck.
+    assert done.wait(2)
+    assert [task.name for task in timed_out] == ["test_slow_commands_time_out.<locals>.stuck"]
+    release.set()
+    pool.shutdown(timeout=2)
+    assert len(pool) == 0
+
+
+def test_buckets_refill_and_are_evicted_when_idle():
+    limiter = RateLimiter(rate=0.5, burst=2)
+    assert [limiter.allow("a", now=0) for _ in range(3)] == [True, True, False]
+    assert limiter.allow("a", now=1) is False
+    assert limiter.allow("a", now=2) is True
+    assert limiter.allow("b", now=2) is True
+    assert len(limiter) == 2
+
+    # Both buckets are full again after four idle seconds, so they are dropped.
+    assert limiter.allow("c", now=6.5) is True
+    assert len(limiter) == 1
+
+
+def test_over_limit_commands_are_dropped_before_any_query():
+    client = TS3Client()
+    client.query = FakeQuery()
+    handler = CommandHandler(client, threading.Event())
+    handler.pool = WorkerPool(2)
+    handler.user_cooldown = RateLimiter(rate=0.001, burst=3)
+    handler.command_cooldown = RateLimiter(rate=0.001, burst=2)
+    note = Record(client, "note")
+    handler.add_routes(note, {"trigger": "note"})
+    other = Record(client, "other")
+    handler.add_routes(other, {"trigger": "other", "cooldown": {"rate": 0.001, "burst": 5}})
+
+    dispatched = [handler.dispatch(message(content)) for content in ["!note", "!note add x", "!note", "!other"]]
+    # The dropped third note still counts against the user's bucket, so spamming a command on cooldown does not pay.
+    assert dispatched == [True, True, False, False]
+    assert handler.dispatch(message("!note", uid="someone else="))
+    assert handler.dispatch(message("!other", uid="someone else="))
+    handler.pool.shutdown()
+
+    assert len(note.calls) == 3 and len(other.calls) == 1
+    assert not client.query.sent
+
+
+def test_loaded_commands_are_cleaned_up_after_the_pool(monkeypatch):
+    monkeypatch.setattr(all_commands, "Record", Record, raising=False)
+    monkeypatch.setattr(all_commands, "__all__", [*all_commands.__all__, "Record"])
+    client = TS3Client()
+    client.query = FakeQuery()
+    runtime = PluginRuntime(client)
+    runtime.start()
+    handler = CommandHandler(client, threading.Event())
+    runtime.add(handler, {"commands": {"Record": {"trigger": "note", "delay": 0.2}}})
+    deadline = time.monotonic() + 5
+    while handler.pool is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    command = handler.commands[0]
+    assert handler.dispatch(message("!note hello"))
+    runtime.stop()
+    assert command.calls == [("run", "!note hello"), ("cleanup", "")]
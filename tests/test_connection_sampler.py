@@ -0,0 +1,81 @@
+from ts3client import TS3Client
+from ts3client.user import ClientSeries, ConnectionSampler
+
+from .utils import FakeQuery, make_response
+
+INVALID_CLIENT = make_response(b"", 512, rb"invalid\sclientID")
+
+
+class FakeClients:
+    """Answers clientlist and clientinfo for clients whose byte counters grow by a fixed amount per clientinfo."""
+
+    def __init__(self, rates: dict[int, int]) -> None:
+        self.rates = rates
+        self.counters = {clid: 0 for clid in rates}
+
+    def responses(self) -> dict:
+        return {"clientlist": self.client_list, "clientinfo": self.client_info}
+
+    def client_list(self, _):
+        clients = [f"clid={clid} client_nickname=client{clid} client_type=0" for clid in self.rates]
+        return "|".join([*clients, "clid=99 client_nickname=serveradmin client_type=1"]).encode()
+
+    def client_info(self, command):
+        clid = command.kwargs["clid"]
+        if clid not in self.rates:
+            return INVALID_CLIENT
+        self.counters[clid] += self.rates[clid]
+        return (
+            f"client_database_id={clid + 100} client_nickname=client{clid} "
+            f"connection_bytes_sent_total={self.counters[clid]} connection_bytes_received_total={self.counters[clid]} "
+            f"connection_packets_sent_total={self.counters[clid] // 100} connection_packets_received_total=0"
+        ).encode()
+
+
+def test_series_keep_rates_in_a_ring_buffer():
+    series = ClientSeries(1, capacity=3)
+    assert not series.add(10, {"bytes_sent": 0})
+    for second in range(11, 16):
+        assert series.add(second, {"bytes_sent": (second - 10) * second})
+
+    assert series.times() == [13, 14, 15]
+    assert series.values("bytes_sent") == [3 * 13 - 2 * 12, 4 * 14 - 3 * 13, 5 * 15 - 4 * 14]
+    assert series.latest("bytes_sent") == 19
+    assert series.mean("bytes_sent", since=14) == (17 + 19) / 2
+    # A counter going backwards starts over instead of recording a negative rate.
+    assert not series.add(16, {"bytes_sent": 0})
+    assert len(series) == 3
+
+
+def test_sampler_stays_within_budget_and_rotates():
+    clients = FakeClients({clid: 1000 for clid in range(1, 8)})
+    client = TS3Client()
+    client.query = FakeQuery(clients.responses())
+    sampler = ConnectionSampler(client, budget=4)
+
+    sent = [sampler.sample() for _ in range(5)]
+    assert sent == [4, 4, 4, 4, 4]
+    assert [command.command for command in client.query.sent].count("clientlist") == 3
+    assert len(sampler) == 7 and 99 not in sampler
+    assert all(clients.counters[clid] >= 2000 for clid in range(1, 8))
+    assert sampler.series(1).database_id == 101
+
+
+def test_top_users_are_answered_from_memory():
+    clients = FakeClients({1: 100, 2: 5000, 3: 800, 4: 20})
+    client = TS3Client()
+    client.query = FakeQuery(clients.responses())
+    sampler = ConnectionSampler(client, budget=10)
+    for _ in range(4):
+        sampler.sample()
+
+    sent = len(client.query.sent)
+    assert [series.clid for series in sampler.top(2)] == [2, 3]
+    assert [series.clid for series in sampler.top(4, by="packets_sent")][:2] == [2, 3]
+    assert len(client.query.sent) == sent
+
+    del clients.rates[2]
+    sampler.sample()
+    sampler.sample()
+    assert 2 not in sampler
+    assert [series.clid for series in sampler.top(1)] == [3]
@@ -0,0 +1,87 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+from plugins.plugins import Doodler
+from plugins.plugins.doodler import DoodleSchedule
+from plugins.runtime import PluginRuntime
+from ts3client import TS3Client
+
+from .utils import FakeQuery
+
+DOODLES = [
+    {"date": "14-02", "url": "valentine"},
+    {"startDate": "20-12", "endDate": "02-01", "url": "winter"},
+    {"startDate": "24-12-2025", "endDate": "26-12-2025", "url": "christmas"},
+    {"date": "29-02", "url": "leap"},
+]
+
+
+def test_banner_follows_the_schedule():
+    schedule = DoodleSchedule("default", DOODLES)
+    assert schedule.banner(datetime(2025, 2, 13, 23, 59)) == "default"
+    assert schedule.banner(datetime(2025, 2, 14)) == "valentine"
+    assert schedule.banner(datetime(2027, 2, 14, 12)) == "valentine"
+    # Yearly ranges wrap around the new year, the first configured doodle wins where doodles overlap.
+    assert schedule.banner(datetime(2026, 1, 2, 23)) == "winter"
+    assert schedule.banner(datetime(2025, 12, 25)) == "winter"
+    assert schedule.banner(datetime(2028, 2, 29)) == "leap"
+    assert schedule.banner(datetime(2025, 3, 1)) == "default"
+
+
+def test_next_transition_is_the_exact_boundary():
+    schedule = DoodleSchedule("default", DOODLES)
+    assert schedule.next_transition(datetime(2025, 2, 13, 18, 30)) == datetime(2025, 2, 14)
+    assert schedule.next_transition(datetime(2025, 2, 14)) == datetime(2025, 2, 15)
+    assert schedule.next_transition(datetime(2025, 12, 31, 8)) == datetime(2026, 1, 3)
+    assert schedule.next_transition(datetime(2026, 3, 1)) == datetime(2026, 12, 20)
+
+    fixed = DoodleSchedule("default", [{"date": "01-05-2025", "url": "may"}])
+    assert fixed.next_transition(datetime(2025, 5, 1, 12)) == datetime(2025, 5, 2)
+    assert fixed.next_transition(datetime(2025, 5, 2)) is None
+
+    with pytest.raises(ValueError):
+        DoodleSchedule("default", [{"startDate": "01-05", "endDate": "02-05-2025", "url": "mixed"}])
+
+
+@pytest.fixture
+def doodler():
+    client = TS3Client()
+    client.query = FakeQuery({"serverinfo": b"virtualserver_hostbanner_gfx_url=default"})
+    plugin = Doodler(client, threading.Event())
+    runtime = PluginRuntime(client)
+    runtime.start()
+    # Without doodles the banner stays the default one, whatever the date is.
+    runtime.add(plugin, {"default": "default"})
+    assert runtime.drain(plugin, 5)
+    plugin.cancel("tick")
+    yield client, plugin
+    runtime.stop(1)
+
+
+def test_banner_is_cached_between_transitions(doodler):
+    client, plugin = doodler
+    assert [command.command for command in client.query.sent] == ["servernotifyregister", "serverinfo"]
+
+    plugin.schedule = DoodleSchedule("default", DOODLES)
+    plugin.update(datetime(2025, 2, 13, 12))
+    plugin.update(datetime(2025, 2, 13, 18))
+    plugin.update(datetime(2025, 2, 14))
+    assert [command.command for command in client.query.sent][2:] == ["serveredit"]
+    assert client.query.sent[-1].kwargs["virtualserver_hostbanner_gfx_url"] == "valentine"
+
+    # Someone else changed the banner.
+    client.query.responses["version"] = b"notifyserveredited reasonid=10 virtualserver_hostbanner_gfx_url=other\n\r"
+    client.query.commands.version()
+    assert plugin.runtime.drain(plugin, 5)
+    plugin.update(datetime(2025, 2, 14, 1))
+    assert client.query.sent[-1].kwargs["virtualserver_hostbanner_gfx_url"] == "valentine"
+
+    # An edit that does not tell the banner makes the plugin read it again.
+    client.query.responses["version"] = b"notifyserveredited reasonid=10 virtualserver_name=renamed\n\r"
+    client.query.responses["serverinfo"] = b"virtualserver_hostbanner_gfx_url=valentine"
+    client.query.commands.version()
+    assert plugin.runtime.drain(plugin, 5)
+    plugin.update(datetime(2025, 2, 14, 2))
+    assert [command.command for command in client.query.sent][-2:] == ["version", "serverinfo"]
@@ -0,0 +1,94 @@
+import threading
+import time
+
+from ts3client import TS3Client
+from ts3client.errors import TS3Error
+from ts3client.virtual_server import FanOut, SessionPool
+
+from .utils import FakeQuery, make_response
+
+SERVERLIST = (
+    b"virtualserver_id=1 virtualserver_port=9987 virtualserver_status=online virtualserver_name=One|"
+    b"virtualserver_id=2 virtualserver_port=9988 virtualserver_status=online virtualserver_name=Two|"
+    b"virtualserver_id=3 virtualserver_port=9989 virtualserver_status=offline virtualserver_name=Three|"
+    b"virtualserver_id=4 virtualserver_port=9990 virtualserver_status=online virtualserver_name=Four|"
+    b"virtualserver_id=5 virtualserver_port=9991 virtualserver_status=online virtualserver_name=Five"
+)
+
+
+class FakeInstance:
+    """Creates sessions to a fake instance whose virtual servers each answer serverinfo after a delay."""
+
+    def __init__(self, delay: float = 0) -> None:
+        self.delay = delay
+        self.sessions: list[FakeQuery] = []
+        self.lock = threading.Lock()
+
+    def connect(self) -> TS3Client:
+        client = TS3Client()
+        client.query = FakeQuery({"serverlist": SERVERLIST})
+        selected = {}
+
+        def use(command):
+            if command.kwargs["sid"] == 5:
+                return make_response(b"", 1024, rb"invalid\sserverID")
+            selected["sid"] = command.kwargs["sid"]
+            return b""
+
+        def serverinfo(_):
+            time.sleep(self.delay)
+            return f"virtualserver_id={selected['sid']} virtualserver_clientsonline={selected['sid'] * 10}".encode()
+
+        client.query.responses.update({"use": use, "serverinfo": serverinfo, "sendtextmessage": b""})
+        with self.lock:
+            self.sessions.append(client.query)
+        return client
+
+    def commands(self, name: str) -> int:
+        return sum(command.command == name for session in self.sessions for command in session.sent)
+
+
+def clients_online(client: TS3Client, row: dict) -> int:
+    return client.query.commands.serverinfo().data[0]["virtualserver_clientsonline"]
+
+
+def test_fan_out_takes_as_long_as_the_slowest_server():
+    instance = FakeInstance(delay=0.3)
+    with SessionPool(size=8, factory=instance.connect) as pool:
+        start = time.monotonic()
+        result = FanOut(pool).run(clients_online)
+        elapsed = time.monotonic() - start
+
+    assert result.results == {1: 10, 2: 20, 4: 40}
+    assert list(result.errors) == [5]
+    assert isinstance(result.errors[5], TS3Error) and not result.ok
+    assert set(result.servers) == {1, 2, 4, 5}
+    assert elapsed < 0.3 * 2
+
+
+def test_sessions_are_reused_and_keep_their_server():
+    instance = FakeInstance()
+    pool = SessionPool(size=2, factory=instance.connect)
+    fan_out = FanOut(pool)
+
+    assert fan_out.run(clients_online, servers=[1, 2]).results == {1: 10, 2: 20}
+    assert fan_out.run(clients_online, servers=[1, 2]).results == {1: 10, 2: 20}
+    assert len(instance.sessions) == 2
+    assert instance.commands("use") == 2
+
+    assert fan_out.run(clients_online, servers=[1, 2, 4]).ok
+    assert len(instance.sessions) == 2 and pool.open == 2
+    pool.close()
+    assert pool.open == 0
+    assert isinstance(fan_out.run(clients_online, servers=[1]).errors[1], RuntimeError)
+
+
+def test_failed_sessions_are_replaced():
+    instance = FakeInstance()
+    with SessionPool(size=1, factory=instance.connect) as pool:
+        result = FanOut(pool).run(clients_online, servers=[5, 1])
+        assert list(result.errors) == [5] and result.results == {1: 10}
+        assert len(instance.sessions) == 2 and pool.open == 1
+
+        result = FanOut(pool).broadcast("Maintenance in 10 minutes")
+        assert set(result.results) == {1, 2, 4} and list(result.errors) == [5]
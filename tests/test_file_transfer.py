@@ -0,0 +1,66 @@
+import io
+import os
+
+import pytest
+
+from ts3client import TS3Client
+from ts3client.errors import FileTransferError
+
+from .utils import FakeFileTransferServer, FakeQuery
+
+
+@pytest.fixture
+def server():
+    server = FakeFileTransferServer()
+    yield server
+    server.close()
+
+
+def connect(server: FakeFileTransferServer) -> TS3Client:
+    client = TS3Client()
+    client.query = FakeQuery(server.responses())
+    client.query.host = "127.0.0.1"
+    return client
+
+
+def test_upload_and_download(server, tmp_path):
+    client = connect(server)
+    data = os.urandom(300_000)
+    path = tmp_path / "banner.png"
+    path.write_bytes(data)
+
+    reports = []
+    with open(path, "rb") as file:
+        sent = client.upload_file(
+            file,
+            "/banner.png",
+            progress=lambda done, total: reports.append((done, total)),
+        )
+    assert sent == len(data)
+    server.wait(1)
+    assert server.files["/banner.png"] == data
+    assert reports[-1] == (len(data), len(data))
+
+    target = io.BytesIO()
+    assert client.download_file(target, "/banner.png") == len(data)
+    assert target.getvalue() == data
+
+
+def test_resume_upload_and_download(server):
+    client = connect(server)
+    data = os.urandom(100_000)
+    server.files["/partial"] = data[:40_000]
+
+    assert client.upload_file(io.BytesIO(data), "/partial", resume=True) == 60_000
+    server.wait(1)
+    assert server.files["/partial"] == data
+
+    target = io.BytesIO(data[:70_000])
+    assert client.download_file(target, "/partial", resume=True) == 30_000
+    assert target.getvalue() == data
+
+
+def test_download_of_missing_file(server):
+    client = connect(server)
+    with pytest.raises(FileTransferError):
+        client.download_file(io.BytesIO(), "/missing")
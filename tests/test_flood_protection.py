@@ -0,0 +1,68 @@
+from ts3client.ts3query import TS3Query
+from ts3client.ts3query import ts3query as ts3query_module
+from ts3client.ts3query.ts3query_command import TS3QueryCommand
+
+from .utils import FakeClock, FakeQueryServer
+
+
+def connect(monkeypatch) -> tuple[TS3Query, FakeQueryServer, FakeClock, list[int]]:
+    server = FakeQueryServer()
+    query = TS3Query("127.0.0.1", server.port)
+    query.enable_flood_protection()
+    query.disable_cache()
+    # Every sleep records whether the query lock was held meanwhile.
+    clock = FakeClock(on_sleep=query._lock._is_owned)
+    monkeypatch.setattr(ts3query_module, "time", clock)
+
+    writes = []
+    write = query._telnet.write
+    monkeypatch.setattr(query._telnet, "write", lambda data: (writes.append(data.count(b"\n")), write(data))[1])
+    return query, server, clock, writes
+
+
+def test_batches_are_written_in_paced_windows(monkeypatch):
+    query, server, clock, writes = connect(monkeypatch)
+    query.flood_protection_window = 2
+
+    responses = query.send_batch([TS3QueryCommand("version") for _ in range(5)])
+
+    assert [response.error_id for response in responses] == [0] * 5
+    assert writes == [2, 2, 1]
+    # Every window waits for one slot per command of the previous window, never while holding the lock.
+    assert clock.sleeps == [(1.0, False), (1.0, False)]
+    assert len(server.received) == 5
+
+
+def test_slots_are_shared_by_single_commands_and_batches(monkeypatch):
+    query, _, clock, writes = connect(monkeypatch)
+    query.flood_protection_window = 5
+
+    query.send(TS3QueryCommand("version"))
+    query.send_batch([TS3QueryCommand("version") for _ in range(3)])
+    query.send_stream(TS3QueryCommand("serversnapshotdeploy"), [b"data"])
+    query.send(TS3QueryCommand("version"))
+
+    assert clock.sleeps == [(0.5, False), (1.5, False), (0.5, False)]
+    assert writes[:2] == [1, 3]
+
+
+def test_no_waiting_without_flood_protection(monkeypatch):
+    query, _, clock, writes = connect(monkeypatch)
+    query.disable_flood_protection()
+    query.flood_protection_window = 2
+
+    query.send_batch([TS3QueryCommand("version") for _ in range(5)])
+
+    assert writes == [5]
+    assert clock.sleeps == []
+
+
+def test_latency_excludes_the_flood_protection_wait(monkeypatch):
+    query, _, clock, _ = connect(monkeypatch)
+
+    query.send(TS3QueryCommand("version"))
+    responses = query.send_batch([TS3QueryCommand("version") for _ in range(2)])
+
+    # The batch waited half a second of the fake clock for its slots, the measured round trips are real.
+    assert clock.sleeps == [(0.5, False)]
+    assert all(0 <= response.latency < 0.5 for response in responses)
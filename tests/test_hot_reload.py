@@ -0,0 +1,135 @@
+import importlib
+import os
+import time
+
+from plugins import PluginManager, PluginWatcher
+from plugins.hot_reload import module_name, plugin_modules
+from plugins.plugins import afk_mover
+from ts3client import TS3Client
+
+from .utils import FakeQuery
+
+CONFIG = {"afk_channel_id": 9, "afk_time": 60, "check_interval": 60}
+
+
+def wait_for(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def start(plugins: dict) -> tuple[TS3Client, PluginManager]:
+    client = TS3Client()
+    client.query = FakeQuery({"clientlist": b"clid=1 cid=1 client_type=0 client_idle_time=0"})
+    manager = PluginManager(client, plugins, workers=2)
+    manager.run()
+    return client, manager
+
+
+def test_reload_restarts_plugin_against_the_same_client():
+    client, manager = start({"AFK_Mover": CONFIG})
+    try:
+        old = manager.instances["AFK_Mover"]
+        assert wait_for(lambda: hasattr(old, "afk_time"))
+
+        assert manager.reload("AFK_Mover", {**CONFIG, "afk_time": 120})
+        new = manager.instances["AFK_Mover"]
+        assert wait_for(lambda: getattr(new, "afk_time", None) == 120)
+
+        assert new is not old
+        assert new.client is client
+        assert old.event.is_set() and not new.event.is_set()
+        # The event handlers of the old instance were dropped when it was stopped.
+        client.query.responses["version"] = b"notifycliententerview ctid=1 reasonid=0 clid=7 client_type=0\n\rversion=3"
+        client.query.commands.version()
+        assert wait_for(lambda: 7 in new.channels)
+        assert 7 not in old.channels
+        assert manager.plugins["AFK_Mover"]["afk_time"] == 120
+    finally:
+        manager.stop(1)
+
+
+def test_failed_reload_keeps_the_running_instance():
+    _, manager = start({"AFK_Mover": CONFIG})
+    try:
+        old = manager.instances["AFK_Mover"]
+
+        assert not manager.reload("AFK_Mover", {**CONFIG, "afk_time": "soon"})
+
+        assert manager.instances["AFK_Mover"] is old
+        assert not old.event.is_set()
+        assert manager.plugins["AFK_Mover"] == CONFIG
+    finally:
+        manager.stop(1)
+
+
+def test_apply_config_stops_starts_and_reloads():
+    _, manager = start({"AFK_Mover": CONFIG})
+    try:
+        old = manager.instances["AFK_Mover"]
+        manager.apply_config({"AFK_Mover": CONFIG})
+        assert manager.instances["AFK_Mover"] is old
+
+        manager.apply_config({})
+        assert old.event.is_set()
+        assert manager.plugins == {} and manager.instances == {}
+
+        manager.apply_config({"AFK_Mover": CONFIG, "Missing": {}})
+        assert manager.instances["AFK_Mover"] is not old
+        assert "Missing" not in manager.instances
+    finally:
+        manager.stop(1)
+
+
+def test_watcher_applies_a_changed_configuration(tmp_path, monkeypatch):
+    path = tmp_path / "hot_reload_config.py"
+    path.write_text(f"PLUGINS_CONFIG = {{'AFK_Mover': {CONFIG!r}}}\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    config = importlib.import_module("hot_reload_config")
+
+    _, manager = start(config.PLUGINS_CONFIG)
+    try:
+        watcher = PluginWatcher(manager, config)
+        old = manager.instances["AFK_Mover"]
+        assert watcher.check() == []
+
+        path.write_text(f"PLUGINS_CONFIG = {{'AFK_Mover': {({**CONFIG, 'afk_time': 300})!r}}}\n")
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        changed = watcher.check()
+        assert changed == [str(path)]
+
+        watcher.apply(changed)
+        new = manager.instances["AFK_Mover"]
+        assert new is not old and old.event.is_set()
+        assert wait_for(lambda: getattr(new, "afk_time", None) == 300)
+    finally:
+        manager.stop(1)
+
+
+def test_watcher_reloads_a_plugin_once_when_its_config_and_source_change(tmp_path, monkeypatch):
+    path = tmp_path / "hot_reload_both_config.py"
+    path.write_text(f"PLUGINS_CONFIG = {{'AFK_Mover': {CONFIG!r}}}\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    config = importlib.import_module("hot_reload_both_config")
+
+    _, manager = start(config.PLUGINS_CONFIG)
+    try:
+        watcher = PluginWatcher(manager, config)
+        reloads = []
+        reload = manager.reload
+        monkeypatch.setattr(manager, "reload", lambda *args, **kwargs: reloads.append(args) or reload(*args, **kwargs))
+
+        path.write_text(f"PLUGINS_CONFIG = {{'AFK_Mover': {({**CONFIG, 'afk_time': 300})!r}}}\n")
+        watcher.apply([str(path), os.path.abspath(afk_mover.__file__)])
+        assert [args[0] for args in reloads] == ["AFK_Mover"]
+        assert wait_for(lambda: getattr(manager.instances["AFK_Mover"], "afk_time", None) == 300)
+    finally:
+        manager.stop(1)
+
+
+def test_changed_files_map_to_the_plugins_using_them():
+    assert module_name(os.path.abspath(afk_mover.__file__)) == "plugins.plugins.afk_mover"
+    assert "plugins.plugins.afk_mover" in plugin_modules("AFK_Mover")
+    assert "plugins.commands.help" in plugin_modules("CommandHandler")
+    assert "plugins.commands.help" not in plugin_modules("AFK_Mover")
@@ -0,0 +1,75 @@
+import os
+
+from ts3client import TS3Client
+from ts3client.file_transfer import IconCache
+
+from .utils import FakeFileTransferServer, FakeQuery
+
+
+def connect(server: FakeFileTransferServer) -> TS3Client:
+    client = TS3Client()
+    client.query = FakeQuery(server.responses())
+    client.query.host = "127.0.0.1"
+    return client
+
+
+def downloads(client: TS3Client) -> list[str]:
+    return [command.kwargs["name"] for command in client.query.sent if command.command == "ftinitdownload"]
+
+
+def test_icons_are_downloaded_once(tmp_path):
+    icon = os.urandom(2000)
+    server = FakeFileTransferServer({"/icon_3735928559": icon})
+    client = connect(server)
+    cache = IconCache(client, str(tmp_path))
+
+    # Older servers report the same icon ID as a signed integer.
+    with cache.get_icon(3735928559) as first, cache.get_icon(-559038737) as second:
+        assert first[:] == second[:] == icon
+
+    assert downloads(client) == ["/icon_3735928559"]
+    assert cache.get_icon(0) is None
+    assert cache.get_icon(300) is None
+    server.close()
+
+
+def test_avatars_are_keyed_by_hash(tmp_path):
+    server = FakeFileTransferServer({"/avatar_lcoaeijckf": b"old"})
+    client = connect(server)
+    cache = IconCache(client, str(tmp_path))
+
+    assert cache.get_avatar("lcoaeijckf", "1a2b")[:] == b"old"
+    server.files["/avatar_lcoaeijckf"] = b"new"
+    assert cache.get_avatar("lcoaeijckf", "1a2b")[:] == b"old"
+    assert cache.get_avatar("lcoaeijckf", "3c4d")[:] == b"new"
+    assert cache.get_avatar("lcoaeijckf", "") is None
+    assert len(downloads(client)) == 2
+    server.close()
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    server = FakeFileTransferServer({f"/icon_{id}": os.urandom(1000) for id in (1001, 1002, 1003)})
+    client = connect(server)
+    cache = IconCache(client, str(tmp_path), max_size=2500)
+
+    cache.get_icon(1001)
+    cache.get_icon(1002)
+    cache.get_icon(1001)
+    cache.get_icon(1003)
+
+    assert "icon_1001" in cache and "icon_1003" in cache
+    assert "icon_1002" not in cache
+    assert not os.path.exists(cache.path("icon_1002"))
+    assert cache.size == 2000
+    server.close()
+
+
+def test_cache_persists_across_instances(tmp_path):
+    server = FakeFileTransferServer({"/icon_1001": b"icon"})
+    cache = IconCache(connect(server), str(tmp_path))
+    cache.get_icon(1001)
+
+    client = connect(server)
+    assert IconCache(client, str(tmp_path)).get_icon(1001)[:] == b"icon"
+    assert downloads(client) == []
+    server.close()
@@ -0,0 +1,93 @@
+from ts3client import TS3Client
+from ts3client.ts3query.ts3query_command import TS3QueryCommand
+from ts3client.user import IdentityIndex
+
+from .utils import FakeQuery, make_response
+
+
+def connect(responses: dict) -> TS3Client:
+    client = TS3Client()
+    client.query = FakeQuery(responses)
+    client.query.add_response_hook(client.identities.feed)
+    return client
+
+
+def test_index_is_fed_from_clientlist_and_events():
+    index = IdentityIndex()
+    index.feed(
+        TS3QueryCommand("clientlist", args=(("uid", True),)),
+        make_response(
+            b"clid=5 cid=1 client_database_id=10 client_nickname=Alice client_type=0 client_unique_identifier=aaa=|"
+            b"clid=6 cid=1 client_database_id=11 client_nickname=Bob client_type=0 client_unique_identifier=bbb="
+        ),
+    )
+    assert index.by_client_id(5).unique_id == "aaa="
+    assert index.by_database_id(11).nickname == "Bob"
+
+    index.feed(
+        TS3QueryCommand("version"),
+        make_response(
+            b"notifyclientleftview cfid=1 ctid=0 reasonid=8 reasonmsg=bye clid=5\n\r"
+            b"notifycliententerview cfid=0 ctid=1 reasonid=0 clid=7 client_unique_identifier=ccc= "
+            b"client_nickname=Carol client_database_id=12 client_type=0\n\r"
+            b"version=3.13.7 build=1 platform=Linux"
+        ),
+    )
+    assert index.by_client_id(5) is None
+    assert index.by_unique_id("aaa=").database_id == 10
+    assert index.by_client_id(7).nickname == "Carol"
+
+
+def test_index_evicts_least_recently_used():
+    index = IdentityIndex(max_entries=2)
+    index.update("a", database_id=1)
+    index.update("b", database_id=2)
+    index.by_unique_id("a")
+    index.update("c", database_id=3)
+    assert "b" not in index
+    assert index.by_database_id(2) is None
+    assert index.by_database_id(1).unique_id == "a"
+
+
+def test_repeated_lookups_do_not_query_the_server():
+    client = connect({"clientgetdbidfromuid": b"cluid=aaa= cldbid=10"})
+    assert client.get_database_id_by_uid("aaa=") == 10
+    assert client.get_database_id_by_uid("aaa=") == 10
+    assert len(client.query.sent) == 1
+
+
+def test_unknown_unique_ids_are_cached():
+    client = connect({"clientgetnamefromuid": make_response(b"", 1281, rb"database\sempty\sresult\sset")})
+    assert client.get_name_by_uid("nobody=") is None
+    assert client.get_name_by_uid("nobody=") is None
+    assert len(client.query.sent) == 1
+
+
+def test_index_is_cleared_when_the_context_changes():
+    client = connect({"clientgetdbidfromuid": b"cluid=aaa= cldbid=10"})
+    assert client.get_database_id_by_uid("aaa=") == 10
+    client.identities.update("bbb=", database_id=11, client_id=5, nickname="Bob")
+
+    client.query.commands.use(sid=2)
+    assert len(client.identities) == 0
+    assert client.get_uid_by_client_id(5) is None
+    assert client.get_database_id_by_uid("aaa=") == 10
+    assert [command.command for command in client.query.sent].count("clientgetdbidfromuid") == 2
+
+
+def test_offline_clients_are_cached_until_they_enter():
+    client = connect({"clientgetids": make_response(b"", 1281, rb"database\sempty\sresult\sset")})
+    assert client.get_client_ids_by_uid("aaa=") == []
+    assert client.get_client_ids_by_uid("aaa=") == []
+    assert len(client.query.sent) == 1
+
+    client.identities.feed(
+        TS3QueryCommand("version"),
+        make_response(
+            b"notifycliententerview cfid=0 ctid=1 reasonid=0 clid=7 client_unique_identifier=aaa= "
+            b"client_nickname=Alice client_database_id=10 client_type=0\n\rversion=3.13.7"
+        ),
+    )
+    assert client.get_client_ids_by_uid("aaa=") == [7]
+    assert len(client.query.sent) == 1
+    assert not client.identities.is_offline("aaa=")
@@ -0,0 +1,100 @@
+import multiprocessing
+import os
+import threading
+import time
+
+from plugins.isolation import PluginProcess, QueryProxy, encode_response
+from plugins.plugin import Plugin
+from ts3client import TS3Client
+from ts3client.event import ClientEnterViewEvent
+from ts3client.ts3query.ts3query_command import TS3QueryCommand
+
+from .utils import FakeQuery, make_response
+
+
+class Greeter(Plugin):
+    """Runs in the worker process of the tests."""
+
+    scheduled = True
+
+    def run(self, message: str = "hi"):
+        self.message = message
+        self.client.query.send_batch([TS3QueryCommand("clientinfo", kwargs={"clid": clid}) for clid in (1, 2, 3)])
+        self.on(ClientEnterViewEvent, self.entered)
+
+    def entered(self, event: ClientEnterViewEvent):
+        name = self.client.query.commands.clientinfo(clid=event.clid).data[0]["client_nickname"]
+        self.client.send_private_message(event.clid, f"{self.message} {name}")
+
+
+class Inspector(Plugin):
+    """Uses the members of the query that are not commands."""
+
+    def run(self):
+        unread = len(self.client.get_unread_events())
+        self.client.query.stop_polling()
+        self.client.send_private_message(1, f"{self.client.query.host} {unread}")
+
+
+def wait_for(condition, timeout: float = 20) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return condition()
+
+
+def test_plugin_runs_in_a_worker_process():
+    client = TS3Client()
+    client.query = FakeQuery(
+        {
+            "clientinfo": lambda command: f"client_nickname=client{command.kwargs['clid']}".encode(),
+            "version": b"notifycliententerview cfid=0 ctid=1 reasonid=0 clid=7 client_type=0\n\rversion=3",
+        }
+    )
+    process = PluginProcess(client, Greeter, {"message": "hello"})
+    process.start()
+    try:
+        # The batch of the plugin reaches the parent's query as a single batch.
+        assert wait_for(lambda: any(len(batch) == 3 for batch in client.query.batches))
+
+        client.query.commands.version()
+        assert wait_for(lambda: any(command.command == "sendtextmessage" for command in client.query.sent))
+        message = next(command for command in client.query.sent if command.command == "sendtextmessage")
+        assert message.kwargs == {"targetmode": 1, "target": 7, "msg": "hello client7"}
+        assert process.process.pid != os.getpid()
+    finally:
+        process.stop()
+    assert not process.process.is_alive()
+    assert process.process.exitcode == 0
+    assert not client.query.hooks
+
+
+def test_proxy_feeds_the_client_of_the_plugin():
+    parent, child = multiprocessing.Pipe()
+    client = TS3Client()
+    client.attach(QueryProxy(child, threading.Event()))
+    try:
+        response = make_response(
+            b"cid=1 pid=0 channel_order=0 channel_name=Lobby|cid=2 pid=0 channel_order=1 channel_name=Gaming"
+        )
+        parent.send(("responses", [(TS3QueryCommand("channellist"), encode_response(response))]))
+        assert wait_for(lambda: client.channel_tree.loaded)
+        assert client.channel_tree.find_by_path("Gaming").cid == 2
+    finally:
+        parent.close()
+
+
+def test_proxy_forwards_the_other_members_of_the_query():
+    client = TS3Client()
+    client.query = FakeQuery({})
+    client.query.host = "ts.example.com"
+    client.query.stop_polling = lambda: client.query.sent.append(TS3QueryCommand("stop_polling"))
+    process = PluginProcess(client, Inspector, {})
+    process.start()
+    try:
+        assert wait_for(lambda: any(command.command == "sendtextmessage" for command in client.query.sent))
+        assert [command.command for command in client.query.sent] == ["stop_polling", "sendtextmessage"]
+        assert client.query.sent[-1].kwargs["msg"] == "ts.example.com 0"
+    finally:
+        process.stop()
+    assert process.process.exitcode == 0
@@ -0,0 +1,92 @@
+from datetime import datetime
+
+from ts3client import TS3Client
+from ts3client.server_log import LogArchive, parse_log_line
+
+from .utils import FakeQuery, FakeServerLog
+
+LINES = [
+    "2024-01-08 10:00:00.000000|INFO    |VirtualServerBase|1  |client connected 'Alice'(id:12) from 10.0.0.2:51234",
+    "2024-01-08 10:05:00.000000|INFO    |VirtualServerBase|1  |client disconnected 'Alice'(id:12) reason "
+    "'invokerid=3 invokername=Admin invokeruid=QWRtaW4= reasonmsg=spam'",
+    "2024-01-09 09:00:00.000000|INFO    |VirtualServerBase|1  |client 'Bob'(id:13) was added to servergroup "
+    "'VIP'(id:9) by client 'Admin'(id:2)",
+    "2024-01-10 18:30:00.000000|INFO    |VirtualServerBase|1  |client disconnected 'Bob'(id:13) reason "
+    "'reasonmsg=leaving'",
+    "2024-01-11 12:00:00.000000|INFO    |VirtualServerBase|1  |channel 'Lobby'(id:5) created by 'Admin'(id:2)",
+]
+
+
+def connect(log: FakeServerLog) -> TS3Client:
+    client = TS3Client()
+    client.query = FakeQuery({"logview": log})
+    return client
+
+
+def test_entries_are_classified(tmp_path):
+    archive = LogArchive(str(tmp_path / "archive.sqlite"))
+    archive.ingest(parse_log_line(line, i) for i, line in enumerate(LINES))
+
+    kicks = archive.query(kind="kick", client_name="alice")
+    assert len(kicks) == 1
+    assert (kicks[0].client_id, kicks[0].invoker_id, kicks[0].invoker_uid) == (12, 3, "QWRtaW4=")
+
+    assert [entry.kind for entry in archive.query(client_id=13)] == ["disconnect", "servergroup"]
+    assert archive.query(kind="channel")[0].invoker_id == 2
+    assert [entry.position for entry in archive.query(since=datetime(2024, 1, 9), until=datetime(2024, 1, 11))] == [
+        3,
+        2,
+    ]
+    assert len(archive.query(text="reasonmsg")) == 2
+    archive.close()
+
+
+def test_sync_is_incremental(tmp_path):
+    log = FakeServerLog(LINES[:2])
+    client = connect(log)
+    path = str(tmp_path / "archive.sqlite")
+
+    archive = LogArchive(path)
+    assert archive.sync(client) == 2
+    assert archive.sync(client) == 0
+    archive.close()
+
+    log.lines += LINES[2:]
+    archive = LogArchive(path)
+    assert archive.sync(client) == 3
+    assert archive.count() == 5
+    assert archive.position() == sum(len(line.encode()) + 1 for line in LINES)
+
+    # Entries that were already archived are skipped.
+    assert archive.ingest([parse_log_line(LINES[0], 0)]) == 0
+    assert archive.ingest([parse_log_line(LINES[0], 0)], source="instance") == 1
+    archive.close()
+
+
+def test_entries_without_a_position_are_not_duplicated(tmp_path):
+    archive = LogArchive(str(tmp_path / "archive.sqlite"))
+    assert archive.ingest(parse_log_line(line) for line in LINES[:2]) == 2
+    assert archive.ingest(parse_log_line(line) for line in LINES[:3]) == 1
+    assert archive.ingest([parse_log_line("not a log line"), parse_log_line("not a log line")]) == 1
+    assert archive.count() == 4
+    archive.close()
+
+
+def test_queries_use_indexes(tmp_path):
+    archive = LogArchive(str(tmp_path / "archive.sqlite"))
+    for column in ("kind", "client_id", "invoker_uid"):
+        plan = archive._connection.execute(
+            f"EXPLAIN QUERY PLAN SELECT * FROM entries WHERE {column} = ? ORDER BY timestamp DESC", ("x",)
+        ).fetchall()
+        assert "USING INDEX" in " ".join(row["detail"] for row in plan)
+    archive.close()
+
+
+def test_compact_removes_old_entries(tmp_path):
+    archive = LogArchive(str(tmp_path / "archive.sqlite"))
+    archive.ingest(parse_log_line(line, i) for i, line in enumerate(LINES))
+
+    assert archive.compact(datetime(2024, 1, 10), kinds=["connect"]) == 1
+    assert archive.compact(datetime(2024, 1, 10)) == 2
+    assert archive.count() == 2
+    archive.close()
@@ -0,0 +1,88 @@
+import threading
+from datetime import datetime
+from itertools import islice
+
+from ts3client import TS3Client
+from ts3client.server_log import parse_log_line
+
+from .utils import FakeQuery, FakeServerLog
+
+
+def line(i: int) -> str:
+    return f"2024-01-15 12:00:{i % 60:02d}.000000|INFO    |VirtualServerBase|1  |client connected 'User {i}'(id:{i})"
+
+
+def connect(log: FakeServerLog) -> TS3Client:
+    client = TS3Client()
+    client.query = FakeQuery({"logview": log})
+    return client
+
+
+class StopAfter(threading.Event):
+    """Records the poll intervals and stops the tailer after a number of polls."""
+
+    def __init__(self, polls: int) -> None:
+        super().__init__()
+        self.polls = polls
+        self.intervals = []
+
+    def wait(self, timeout: float = None) -> bool:
+        self.intervals.append(timeout)
+        if len(self.intervals) >= self.polls:
+            self.set()
+        return self.is_set()
+
+
+def test_parse_log_line():
+    entry = parse_log_line("2024-01-15 12:34:56.123456|WARNING |ServerMain    |   |Server  is running", 10)
+    assert entry.timestamp == datetime(2024, 1, 15, 12, 34, 56, 123456)
+    assert (entry.level, entry.channel, entry.server_id) == ("WARNING", "ServerMain", None)
+    assert entry.message == "Server  is running"
+    assert entry.position == 10
+
+    assert parse_log_line(line(5)).server_id == 1
+    assert parse_log_line("not a log line").message == "not a log line"
+
+
+def test_poll_fetches_only_new_lines():
+    log = FakeServerLog([line(i) for i in range(5)])
+    tailer = connect(log).tail_log()
+
+    assert tailer.poll() == []
+    assert tailer.poll() == []
+
+    log.lines += [line(i) for i in range(5, 8)]
+    entries = tailer.poll()
+    assert [entry.message for entry in entries] == [f"client connected 'User {i}'(id:{i})" for i in range(5, 8)]
+    assert entries[0].position == sum(len(line(i)) + 1 for i in range(5))
+
+    log.lines += [line(i) for i in range(8, 258)]
+    log.calls = 0
+    assert [entry.message for entry in tailer.poll()] == [parse_log_line(line(i)).message for i in range(8, 258)]
+    assert log.calls == 3
+
+
+def test_rotated_log_is_read_from_start():
+    log = FakeServerLog([line(i) for i in range(10)])
+    tailer = connect(log).tail_log()
+    tailer.poll()
+
+    log.lines = [line(i) for i in range(2)]
+    assert len(tailer.poll()) == 2
+
+
+def test_interval_backs_off_while_idle():
+    log = FakeServerLog([line(0)])
+    stop = StopAfter(5)
+    tailer = connect(log).tail_log(interval=1, max_interval=4, position=0, stop=stop)
+
+    assert len(list(tailer)) == 1
+    assert stop.intervals == [1, 2, 4, 4, 4]
+
+
+def test_tail_log_starts_at_position():
+    log = FakeServerLog([line(i) for i in range(3)])
+    tailer = connect(log).tail_log(position=0, stop=StopAfter(1))
+
+    assert len(list(islice(tailer, 2))) == 2
+    assert tailer.position == sum(len(line(i)) + 1 for i in range(3))
@@ -0,0 +1,82 @@
+import threading
+import time
+import urllib.request
+
+from plugins.plugins import Metrics
+from plugins.plugins.metrics import MetricsRegistry
+from plugins.runtime import PluginRuntime
+from ts3client import TS3Client
+
+from .utils import FakeQuery, make_response
+
+
+def timed(body, latency: float = 0.004):
+    """Answers like TS3Query, which measures the latency of every response it receives."""
+
+    def respond(command):
+        response = make_response(body(command) if callable(body) else body)
+        response.latency = latency
+        return response
+
+    return respond
+
+
+def connect() -> TS3Client:
+    clients = iter(range(1, 1000))
+    client = TS3Client()
+    client.query = FakeQuery(
+        {
+            "serverinfo": timed(
+                lambda _: f"virtualserver_clientsonline={next(clients)} virtualserver_channelsonline=12 "
+                "virtualserver_total_packetloss_total=0.0125 virtualserver_total_ping=23.5000".encode()
+            ),
+            "serverrequestconnectioninfo": timed(
+                b"connection_bandwidth_sent_last_second_total=2048 connection_bandwidth_received_last_second_total=1024"
+            ),
+            "hostinfo": timed(b"virtualservers_running_total=2 virtualservers_total_clients_online=9"),
+        }
+    )
+    return client
+
+
+def test_samples_are_kept_in_ring_buffers():
+    client = connect()
+    registry = MetricsRegistry(history=3)
+    for _ in range(5):
+        registry.sample(client)
+
+    assert [value for _, value in registry.samples["ts3_clients_online"]] == [3, 4, 5]
+    assert len(registry.latencies["serverinfo"]) == 3
+
+    text = registry.exposition.decode()
+    assert "# TYPE ts3_clients_online gauge\nts3_clients_online 5 " in text
+    assert "\nts3_channels 12 " in text
+    assert "\nts3_packet_loss_ratio 0.0125 " in text
+    assert "\nts3_bandwidth_sent_bytes_per_second 2048 " in text
+    assert "\nts3_instance_clients_online 9 " in text
+    assert 'ts3_query_latency_seconds_count{command="hostinfo"} 3' in text
+    assert 'ts3_query_latency_seconds{command="hostinfo",quantile="0.5"} 0.004' in text
+
+
+def test_scrapes_never_reach_the_query():
+    client = connect()
+    runtime = PluginRuntime(client)
+    runtime.start()
+    plugin = Metrics(client, threading.Event())
+    runtime.add(plugin, {"port": 0, "interval": 60})
+    while not client.query.sent:
+        time.sleep(0.01)
+    while not plugin.registry.exposition:
+        time.sleep(0.01)
+
+    url = f"http://127.0.0.1:{plugin.server.server_address[1]}/metrics"
+    sent = len(client.query.sent)
+    for _ in range(20):
+        with urllib.request.urlopen(url) as response:
+            body = response.read().decode()
+    assert "ts3_clients_online 1 " in body
+    assert len(client.query.sent) == sent
+
+    runtime.stop()
+    assert plugin.event.is_set()
+    assert plugin.server.socket.fileno() == -1
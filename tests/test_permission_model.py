@@ -0,0 +1,142 @@
+from ts3client import TS3Client
+from ts3client.ts3query.ts3query_command import TS3QueryCommand
+
+from .utils import FakeQuery, make_response
+
+EMPTY = make_response(b"", 1281, rb"database\sempty\sresult\sset")
+
+SERVER_GROUP_PERMS = {
+    6: b"sgid=6 permsid=i_client_talk_power permvalue=50 permnegated=0 permskip=0|"
+    b"permsid=b_client_kick_from_server permvalue=1 permnegated=0 permskip=1",
+    7: b"sgid=7 permsid=i_client_talk_power permvalue=75 permnegated=0 permskip=0",
+    8: b"sgid=8 permsid=i_client_talk_power permvalue=10 permnegated=1 permskip=0",
+}
+
+
+def responses() -> dict:
+    return {
+        "permissionlist": b"permid=1 permname=i_client_talk_power permdesc=x",
+        "servergrouplist": b"sgid=6 name=Admin|sgid=7 name=Mod|sgid=8 name=Muted",
+        "servergrouppermlist": lambda command: SERVER_GROUP_PERMS[command.kwargs["sgid"]],
+        "channelgrouplist": b"cgid=5 name=Channel\\sAdmin",
+        "channelgrouppermlist": b"cgid=5 permsid=b_client_kick_from_server permvalue=0 permnegated=0 permskip=0|"
+        b"permsid=i_client_talk_power permvalue=20 permnegated=0 permskip=0",
+        "serverinfo": b"virtualserver_default_channel_group=5",
+        "clientinfo": b"cid=2 client_database_id=10 client_servergroups=6,7 client_channel_group_id=5",
+        "channellist": b"cid=1 pid=0 channel_name=Lobby|cid=2 pid=0 channel_name=Gaming",
+        "clientlist": b"clid=3 cid=2 client_database_id=10 client_type=0 client_servergroups=6,7 "
+        b"client_channel_group_id=5|clid=1 cid=1 client_database_id=1 client_type=1 client_servergroups=2 "
+        b"client_channel_group_id=5",
+        "clientpermlist": EMPTY,
+        "channelpermlist": EMPTY,
+        "channelclientpermlist": EMPTY,
+        "channelgroupclientlist": EMPTY,
+    }
+
+
+def connect() -> TS3Client:
+    client = TS3Client()
+    client.query = FakeQuery(responses())
+    client.query.add_response_hook(client.permissions.feed)
+    client.permissions.load()
+    return client
+
+
+def test_effective_permissions():
+    client = connect()
+    model = client.permissions
+    assert model.get_permission("i_client_talk_power", 10, server_groups={6, 7}) == 75
+    assert model.get_permission("i_client_talk_power", 10, server_groups={6, 7, 8}) == 10
+    assert model.get_permission(1, 10, server_groups={6}) == 50
+    assert model.get_permission("i_client_talk_power", 10, 2, server_groups={6, 7}) == 20
+    # The skip flag keeps the channel group from revoking the server group permission.
+    assert model.get_permission("b_client_kick_from_server", 10, 2, server_groups={6}) == 1
+    assert model.get_permission("b_client_kick_from_server", 10, 2, server_groups={7}) == 0
+
+
+def test_load_fetches_all_grants_in_one_batch():
+    client = connect()
+    [batch] = client.query.batches
+    assert sorted(command.command for command in batch) == [
+        "channelclientpermlist",
+        "channelgrouppermlist",
+        "channelpermlist",
+        "channelpermlist",
+        "clientpermlist",
+        "servergrouppermlist",
+        "servergrouppermlist",
+        "servergrouppermlist",
+    ]
+
+
+def test_repeated_checks_do_not_query_the_server():
+    client = connect()
+    sent = len(client.query.sent)
+    for _ in range(3):
+        assert client.has_permission(3, "b_client_kick_from_server")
+        assert not client.has_permission(3, "i_client_talk_power", 50)
+    assert len(client.query.sent) == sent
+
+
+def test_permission_changes_are_invalidated_incrementally():
+    client = connect()
+    model = client.permissions
+    assert model.get_permission("i_client_talk_power", 10, server_groups={6}) == 50
+
+    SERVER_GROUP_PERMS[6] = b"sgid=6 permsid=i_client_talk_power permvalue=60 permnegated=0 permskip=0"
+    try:
+        client.query.commands.servergroupaddperm(sgid=6, permsid="i_client_talk_power", permvalue=60)
+        sent = len(client.query.sent)
+        assert model.get_permission("i_client_talk_power", 10, server_groups={6}) == 60
+        assert model.get_permission("i_client_talk_power", 10, server_groups={7}) == 75
+        assert [command.command for command in client.query.sent[sent:]] == ["servergrouppermlist"]
+    finally:
+        SERVER_GROUP_PERMS[6] = (
+            b"sgid=6 permsid=i_client_talk_power permvalue=50 permnegated=0 permskip=0|"
+            b"permsid=b_client_kick_from_server permvalue=1 permnegated=0 permskip=1"
+        )
+
+
+def test_membership_updates_from_commands():
+    client = connect()
+    model = client.permissions
+    model.feed(
+        TS3QueryCommand("version"),
+        make_response(
+            b"notifycliententerview cfid=0 ctid=2 reasonid=0 clid=4 client_database_id=11 client_nickname=Bob "
+            b"client_servergroups=7 client_channel_group_id=5 client_type=0\n\rversion=3.13.7"
+        ),
+    )
+    assert client.permissions.get_client_permission(4, "i_client_talk_power") == 20
+    client.query.commands.servergroupaddclient(sgid=8, cldbid=11)
+    assert model.get_permission("i_client_talk_power", 11) == 10
+
+
+def test_clients_entering_are_prefetched_in_one_batch():
+    client = connect()
+    model = client.permissions
+    model.feed(
+        TS3QueryCommand("version"),
+        make_response(
+            b"notifycliententerview cfid=0 ctid=1 reasonid=0 clid=4 client_database_id=11 client_nickname=Bob "
+            b"client_servergroups=7 client_channel_group_id=5 client_type=0\n\r"
+            b"notifyclientmoved ctid=1 reasonid=0 clid=3\n\r"
+            b"notifychannelcreated cid=9 cpid=0 channel_name=New channel_order=2\n\rversion=3.13.7"
+        ),
+    )
+    assert model.prefetch() == 5
+    assert sorted(command.command for command in client.query.batches[-1]) == [
+        "channelclientpermlist",
+        "channelclientpermlist",
+        "channelgroupclientlist",
+        "channelpermlist",
+        "clientpermlist",
+    ]
+
+    client.query.sent.clear()
+    assert client.has_permission(4, "i_client_talk_power", 20)
+    assert client.has_permission(3, "b_client_kick_from_server")
+    # No skip flag: the channel group of client 3 in its new channel was fetched by prefetch(), it is the default one.
+    assert model.get_client_permission(3, "i_client_talk_power") == 20
+    assert client.query.sent == []
+    assert model.prefetch() == 0
@@ -0,0 +1,116 @@
+import threading
+import time
+
+from plugins.plugin import Plugin
+from plugins.runtime import PluginRuntime
+from ts3client import TS3Client
+from ts3client.event import ClientEnterViewEvent
+
+from .utils import FakeQuery
+
+
+class Counter(Plugin):
+    scheduled = True
+
+    def run(self, interval: float = 0.1):
+        self.ticks = 0
+        self.entered: list[int] = []
+        self.running = 0
+        self.overlapped = False
+        self.cleaned = False
+        self.every(interval, self.tick)
+        self.on(ClientEnterViewEvent, self.enter)
+
+    def tick(self):
+        self.running += 1
+        self.overlapped |= self.running > 1
+        time.sleep(0.01)
+        self.ticks += 1
+        self.running -= 1
+
+    def enter(self, event):
+        self.running += 1
+        self.overlapped |= self.running > 1
+        self.entered.append(event.clid)
+        self.running -= 1
+
+    def cleanup(self):
+        self.cleaned = True
+
+
+def wait_for(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_many_plugins_share_a_few_threads():
+    client = TS3Client()
+    client.query = FakeQuery(
+        {"version": b"notifycliententerview cfid=0 ctid=1 reasonid=0 clid=7 client_type=0\n\rversion=3"}
+    )
+    runtime = PluginRuntime(client, workers=4)
+    threads = threading.active_count()
+    runtime.start()
+    plugins = [Counter(client, threading.Event()) for _ in range(50)]
+    for plugin in plugins:
+        runtime.add(plugin, {"interval": 0.1})
+
+    assert wait_for(lambda: all(getattr(plugin, "ticks", 0) >= 3 for plugin in plugins))
+    client.query.commands.version()
+    assert wait_for(lambda: all(plugin.entered == [7] for plugin in plugins))
+    # The scheduler, the workers and the watchdog of the pool at most.
+    assert threading.active_count() - threads <= 6
+
+    runtime.stop()
+    assert all(plugin.cleaned and plugin.event.is_set() for plugin in plugins)
+    assert not any(plugin.overlapped for plugin in plugins)
+    assert not client.query.hooks
+    ticks = [plugin.ticks for plugin in plugins]
+    time.sleep(0.3)
+    assert [plugin.ticks for plugin in plugins] == ticks
+
+
+def test_jobs_can_be_replaced_and_cancelled():
+    client = TS3Client()
+    client.query = FakeQuery()
+    runtime = PluginRuntime(client)
+    runtime.start()
+    plugin = Counter(client, threading.Event())
+    runtime.add(plugin, {"interval": 60})
+    calls = []
+
+    plugin.after(0.2, calls.append, "late", name="once")
+    plugin.after(0, calls.append, "replaced", name="once")
+    plugin.after(0.1, calls.append, "cancelled", name="other")
+    assert plugin.cancel("other")
+    assert wait_for(lambda: calls == ["replaced"])
+    time.sleep(0.3)
+    assert calls == ["replaced"]
+
+    runtime.remove(plugin)
+    assert wait_for(lambda: plugin.cleaned)
+    assert not plugin.cancel("tick")
+    runtime.stop()
+
+
+def test_jobs_cancelled_while_queued_do_not_run():
+    client = TS3Client()
+    client.query = FakeQuery()
+    runtime = PluginRuntime(client)
+    runtime.start()
+    plugin = Counter(client, threading.Event())
+    runtime.add(plugin, {"interval": 60})
+    busy = threading.Event()
+    calls = []
+
+    # The job becomes due while the plugin is busy, so it waits for the worker until after it is cancelled.
+    runtime.submit(plugin, busy.wait, 5)
+    plugin.after(0, calls.append, "cancelled", name="queued")
+    time.sleep(0.3)
+    assert plugin.cancel("queued")
+    busy.set()
+    assert runtime.drain(plugin, 5)
+    assert calls == []
+    runtime.stop()
@@ -0,0 +1,130 @@
+import json
+import sqlite3
+import time
+
+import pytest
+
+from ts3client import TS3Client
+from ts3client.permission import ServerGroupSync, load_roster
+from ts3client.ts3query.ts3query_command import TS3QueryCommand
+
+from .utils import FakeQuery, make_response
+
+EMPTY = make_response(b"", 1281, rb"database\sempty\sresult\sset")
+
+
+class FakeGroups:
+    """Answers servergroupclientlist, servergroupaddclient and servergroupdelclient from a dict of members."""
+
+    def __init__(self, members: dict[int, set[int]]) -> None:
+        self.members = members
+
+    def responses(self) -> dict:
+        return {
+            "servergrouplist": b"sgid=6 name=Admin|sgid=7 name=Mod|sgid=8 name=Muted",
+            "servergroupclientlist": self.client_list,
+            "servergroupaddclient": self.add,
+            "servergroupdelclient": self.delete,
+        }
+
+    def client_list(self, command: TS3QueryCommand):
+        members = self.members.get(command.kwargs["sgid"])
+        if not members:
+            return EMPTY
+        return "|".join(f"cldbid={cldbid}" for cldbid in sorted(members)).encode()
+
+    def add(self, command: TS3QueryCommand):
+        if command.kwargs["sgid"] == 99:
+            return make_response(b"", 2568, rb"insufficient\sclient\spermissions")
+        self.members.setdefault(command.kwargs["sgid"], set()).update(command.kwargs["cldbid"])
+        return b""
+
+    def delete(self, command: TS3QueryCommand):
+        self.members[command.kwargs["sgid"]].difference_update(command.kwargs["cldbid"])
+        return b""
+
+
+def connect(groups: FakeGroups) -> TS3Client:
+    client = TS3Client()
+    client.query = FakeQuery(groups.responses())
+    return client
+
+
+def test_multiple_values_are_joined_with_pipes():
+    command = TS3QueryCommand("servergroupaddclient", kwargs={"sgid": 6, "cldbid": [1, 2, 3]})
+    assert command.encoded == b"servergroupaddclient sgid=6 cldbid=1|cldbid=2|cldbid=3\n"
+
+
+def test_sync_applies_differences_in_chunks():
+    groups = FakeGroups({6: {1, 2, 3}, 7: set(range(10, 20))})
+    client = connect(groups)
+
+    report = ServerGroupSync(client, chunk_size=4).sync({6: {1, 2, 4}, "Mod": set(range(10, 30))})
+
+    assert report.groups[6].added == [4] and report.groups[6].removed == [3]
+    assert report.groups[7].added == list(range(20, 30)) and report.groups[7].removed == []
+    assert (report.added, report.removed) == (11, 1)
+    assert groups.members == {6: {1, 2, 4}, 7: set(range(10, 30))}
+    # One batch to read the members, one to apply the changes.
+    assert [[command.command for command in batch] for batch in client.query.batches] == [
+        ["servergroupclientlist"] * 2,
+        ["servergroupaddclient", "servergroupdelclient"] + ["servergroupaddclient"] * 3,
+    ]
+
+
+def test_unchanged_groups_are_only_read():
+    groups = FakeGroups({6: {1, 2}})
+    client = connect(groups)
+    report = ServerGroupSync(client).sync({6: [1, 2], 7: []})
+    assert report.empty
+    assert [command.command for command in client.query.sent] == ["servergroupclientlist"] * 2
+
+
+def test_dry_run_and_keeping_members():
+    groups = FakeGroups({6: {1, 2}})
+    client = connect(groups)
+    report = ServerGroupSync(client).sync({6: [3]}, remove=False, dry_run=True)
+    assert report.groups[6].added == [3] and report.groups[6].removed == []
+    assert groups.members == {6: {1, 2}}
+
+
+def test_errors_are_reported_per_group():
+    groups = FakeGroups({6: set()})
+    client = connect(groups)
+    report = ServerGroupSync(client).sync({6: [1], 99: [1]})
+    assert groups.members[6] == {1}
+    assert list(report.errors) == [99]
+    assert report.errors[99].id == 2568
+
+    with pytest.raises(KeyError):
+        ServerGroupSync(client).plan({"Nonexistent": [1]})
+
+
+def test_rosters_are_loaded_from_files(tmp_path):
+    expected = {6: {1, 2}, "Mod": {3}}
+
+    (tmp_path / "roster.json").write_text(json.dumps({"6": [1, 2], "Mod": [3]}))
+    (tmp_path / "roster.csv").write_text("sgid,cldbid\n6,1\n6,2\nMod,3\n")
+    connection = sqlite3.connect(tmp_path / "roster.db")
+    with connection:
+        connection.execute("CREATE TABLE roster (sgid, cldbid)")
+        connection.executemany("INSERT INTO roster VALUES (?, ?)", [(6, 1), (6, 2), ("Mod", 3)])
+    connection.close()
+
+    for name in ("roster.json", "roster.csv", "roster.db"):
+        assert load_roster(str(tmp_path / name)) == expected
+
+
+def test_sync_of_many_groups_is_fast():
+    groups = FakeGroups({sgid: set(range(sgid * 1000, sgid * 1000 + 10_000)) for sgid in range(1, 51)})
+    roster = {sgid: set(range(sgid * 1000 + 500, sgid * 1000 + 10_500)) for sgid in range(1, 51)}
+    client = connect(groups)
+
+    start = time.perf_counter()
+    report = ServerGroupSync(client).sync(roster)
+    elapsed = time.perf_counter() - start
+
+    assert (report.added, report.removed) == (25_000, 25_000)
+    assert groups.members == roster
+    assert len(client.query.batches) == 2
+    assert elapsed < 10
@@ -0,0 +1,119 @@
+import base64
+import os
+import zlib
+
+import pytest
+
+from ts3client import TS3Client
+from ts3client.errors import SnapshotFormatError
+from ts3client.snapshot import SnapshotStore, parse_snapshot, snapshot_store
+from ts3client.snapshot.snapshot import ZSTD_MAGIC
+
+from .utils import FakeQuery, make_response
+
+SNAPSHOT = (
+    b"hash=bnTd2E1kNITHjJYRCFjgbKKO5P8= begin_virtualserver virtualserver_name=My\\sServer|end_virtualserver"
+    b"|begin_channels channel_id=1 channel_pid=0 channel_name=Lobby|channel_id=2 channel_pid=0 channel_name=Games"
+    b"|end_channels|begin_permissions server_groups id=6 name=Admin|id=7 name=Guest|channel_groups id=5 name=Op"
+    b"|end_permissions"
+)
+
+
+def test_parse_snapshot():
+    sections = parse_snapshot(SNAPSHOT)
+
+    assert sections["snapshot"] == [{"hash": "bnTd2E1kNITHjJYRCFjgbKKO5P8="}]
+    assert sections["virtualserver"] == [{"virtualserver_name": "My Server"}]
+    assert [channel["channel_name"] for channel in sections["channels"]] == ["Lobby", "Games"]
+    assert [group["name"] for group in sections["permissions/server_groups"]] == ["Admin", "Guest"]
+    assert sections["permissions/channel_groups"] == [{"id": 5, "name": "Op"}]
+
+
+def versioned(payload: bytes, extra: bytes = b"") -> bytes:
+    return b"version=3 " + extra + b"data=" + base64.b64encode(payload).replace(b"/", b"\\/")
+
+
+def test_parse_versioned_snapshot():
+    assert parse_snapshot(versioned(zlib.compress(SNAPSHOT))) == parse_snapshot(SNAPSHOT)
+    assert parse_snapshot(versioned(SNAPSHOT)) == parse_snapshot(SNAPSHOT)
+
+
+def test_unreadable_versioned_snapshots_are_rejected():
+    with pytest.raises(SnapshotFormatError, match="password"):
+        parse_snapshot(versioned(zlib.compress(SNAPSHOT), b"salt=c2FsdA== "))
+    with pytest.raises(SnapshotFormatError, match="unknown format"):
+        parse_snapshot(versioned(b"\x00\x01 not a snapshot" * 4))
+    with pytest.raises(SnapshotFormatError, match="base64"):
+        parse_snapshot(b"version=3 data=not*base64")
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        with pytest.raises(SnapshotFormatError, match="zstandard"):
+            parse_snapshot(versioned(ZSTD_MAGIC + os.urandom(16)))
+
+
+def test_identical_snapshots_are_stored_once(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    first = store.add(SNAPSHOT)
+    assert store.add(SNAPSHOT) == first
+
+    changed = SNAPSHOT.replace(b"Games", b"Music")
+    second = store.add(changed)
+    third = store.add(SNAPSHOT)
+
+    assert [generation.generation for generation in store.generations] == [1, 2, 3]
+    assert third.hash == first.hash
+    assert len(os.listdir(tmp_path / "objects")) == 2
+    assert store.read(2) == changed
+    assert os.path.getsize(tmp_path / "objects" / f"{first.hash}.zz") < len(SNAPSHOT)
+
+    # Generations survive restarts.
+    assert SnapshotStore(str(tmp_path)).get().generation == 3
+
+
+def test_old_generations_are_pruned(tmp_path):
+    store = SnapshotStore(str(tmp_path), keep=2)
+    for name in (b"One", b"Two", b"Three"):
+        store.add(SNAPSHOT.replace(b"Games", name))
+
+    assert [generation.generation for generation in store.generations] == [2, 3]
+    assert len(os.listdir(tmp_path / "objects")) == 2
+
+
+def test_diff_between_generations(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.add(SNAPSHOT)
+    store.add(
+        SNAPSHOT.replace(b"channel_name=Games", b"channel_name=Music")
+        .replace(b"|id=7 name=Guest", b"")
+        .replace(b"|end_channels", b"|channel_id=3 channel_pid=1 channel_name=AFK|end_channels")
+    )
+
+    diff = store.diff(1, 2)
+
+    assert diff.changed["channels"] == [
+        (
+            {"channel_id": 2, "channel_pid": 0, "channel_name": "Games"},
+            {"channel_id": 2, "channel_pid": 0, "channel_name": "Music"},
+        )
+    ]
+    assert diff.added["channels"] == [{"channel_id": 3, "channel_pid": 1, "channel_name": "AFK"}]
+    assert diff.removed["permissions/server_groups"] == [{"id": 7, "name": "Guest"}]
+    assert "virtualserver" not in diff.changed
+    assert store.diff(1, 1).empty
+
+
+def test_create_and_deploy_stream_the_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_store, "CHUNK_SIZE", 64)
+    client = TS3Client()
+    client.query = FakeQuery({"serversnapshotcreate": make_response(b"notifyserveredited reasonid=10\n\r" + SNAPSHOT)})
+    store = SnapshotStore(str(tmp_path))
+
+    generation = store.create(client)
+    assert store.read(generation.generation) == SNAPSHOT
+
+    store.deploy(client, mapping=True)
+    command, body = client.query.streamed[0]
+    assert command.encoded == b"serversnapshotdeploy -mapping\n"
+    assert len(body) > 1
+    assert b"".join(body) == SNAPSHOT
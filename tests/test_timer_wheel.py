@@ -0,0 +1,41 @@
+import random
+
+from plugins.timer_wheel import TimerWheel
+
+
+def test_deadlines_expire_in_order():
+    wheel = TimerWheel(resolution=1, slots=4, levels=3)
+    deadlines = {key: random.uniform(0, 200) for key in range(300)}
+    for key, deadline in deadlines.items():
+        wheel.schedule(key, deadline)
+
+    expired = {}
+    for now in range(0, 201):
+        for key in wheel.advance(now):
+            expired[key] = now
+    assert len(wheel) == 0
+    # Keys expire in the first tick at or after their deadline.
+    assert all(deadlines[key] <= now < deadlines[key] + 1 for key, now in expired.items())
+    assert len(expired) == 300
+
+
+def test_cancel_and_reschedule():
+    wheel = TimerWheel(resolution=1, slots=8, levels=2)
+    wheel.schedule("a", 5)
+    wheel.schedule("b", 5)
+    wheel.schedule("c", 1000)
+    assert wheel.cancel("b") and not wheel.cancel("b")
+    wheel.schedule("a", 20)
+
+    assert wheel.advance(10) == []
+    assert wheel.deadline("a") == 20
+    assert wheel.advance(20) == ["a"]
+    assert wheel.advance(999) == []
+    assert wheel.advance(1000) == ["c"]
+
+
+def test_past_deadlines_expire_with_the_next_tick():
+    wheel = TimerWheel(start=100)
+    wheel.schedule("late", 50)
+    assert wheel.advance(100.5) == []
+    assert wheel.advance(101) == ["late"]
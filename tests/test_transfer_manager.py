@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+
+import pytest
+
+from ts3client import TS3Client
+from ts3client.file_transfer import TransferManager, TransferStatus, bandwidth_limiter
+
+from .utils import FakeClock, FakeFileTransferServer, FakeQuery
+
+
+def connect(server: FakeFileTransferServer) -> TS3Client:
+    client = TS3Client()
+    client.query = FakeQuery(server.responses())
+    client.query.host = "127.0.0.1"
+    return client
+
+
+def write_files(directory, count: int, size: int) -> dict[str, bytes]:
+    files = {}
+    for i in range(count):
+        files[f"/file{i}"] = os.urandom(size)
+        (directory / f"file{i}").write_bytes(files[f"/file{i}"])
+    return files
+
+
+def upload_all(server: FakeFileTransferServer, directory, max_connections: int, **kwargs) -> TransferManager:
+    manager = TransferManager(connect(server), max_connections=max_connections, **kwargs)
+    for path in sorted(directory.iterdir()):
+        manager.add_upload(str(path), f"/{path.name}")
+    manager.run()
+    return manager
+
+
+def download_all(server: FakeFileTransferServer, directory, max_connections: int, **kwargs) -> TransferManager:
+    manager = TransferManager(connect(server), max_connections=max_connections, **kwargs)
+    for name in sorted(server.files):
+        manager.add_download(str(directory / name.lstrip("/")), name)
+    manager.run()
+    return manager
+
+
+def test_uploads_are_pipelined(tmp_path):
+    server = FakeFileTransferServer()
+    files = write_files(tmp_path, 8, 10_000)
+
+    manager = upload_all(server, tmp_path, max_connections=4)
+    server.wait(8)
+
+    assert all(transfer.status is TransferStatus.DONE for transfer in manager.transfers)
+    assert server.files == files
+    assert len(manager.client.query.batches[0]) == 4
+    server.close()
+
+
+def test_downloads_are_limited_to_max_connections(tmp_path):
+    server = FakeFileTransferServer({f"/file{i}": os.urandom(10_000) for i in range(8)}, latency=0.05)
+
+    manager = download_all(server, tmp_path, max_connections=3)
+
+    assert all(transfer.status is TransferStatus.DONE for transfer in manager.transfers)
+    assert all((tmp_path / name.lstrip("/")).read_bytes() == data for name, data in server.files.items())
+    assert server.max_active == 3
+    server.close()
+
+
+def test_interrupted_download_is_resumed(tmp_path):
+    data = os.urandom(200_000)
+    server = FakeFileTransferServer({"/banner.png": data}, interrupt={"/banner.png": 50_000})
+    manager = TransferManager(connect(server))
+    transfer = manager.add_download(str(tmp_path / "banner.png"), "/banner.png")
+
+    manager.run()
+
+    assert transfer.status is TransferStatus.DONE
+    assert transfer.attempts == 2
+    assert transfer.transferred == len(data)
+    assert (tmp_path / "banner.png").read_bytes() == data
+    downloads = [command for command in manager.client.query.sent if command.command == "ftinitdownload"]
+    assert [command.kwargs["seekpos"] for command in downloads] == [0, 50_000]
+    server.close()
+
+
+def test_refused_transfer_is_not_retried(tmp_path):
+    server = FakeFileTransferServer()
+    manager = TransferManager(connect(server))
+    transfer = manager.add_download(str(tmp_path / "missing"), "/missing")
+
+    manager.run()
+
+    assert transfer.status is TransferStatus.FAILED
+    assert len(manager.client.query.sent) == 1
+    server.close()
+
+
+def test_bandwidth_cap_is_shared_by_all_connections(tmp_path, monkeypatch):
+    server = FakeFileTransferServer({f"/file{i}": os.urandom(64 * 1024) for i in range(4)})
+    # The clock stands still, so every wait covers everything consumed beyond the burst so far.
+    clock = FakeClock(advance=False)
+    monkeypatch.setattr(bandwidth_limiter, "time", clock)
+
+    manager = download_all(server, tmp_path, max_connections=4, bandwidth=512 * 1024)
+
+    assert manager.transferred == 256 * 1024
+    # 256 KiB at 512 KiB/s, minus the 64 KiB the bucket holds initially.
+    assert max(clock.sleeps) == pytest.approx(192 / 512)
+    server.close()
+
+
+def test_running_transfer_is_listed_and_cancelled(tmp_path):
+    # The transfer only finishes on its own after the latency, long after the cancelled transfer has to stop.
+    server = FakeFileTransferServer({"/large": os.urandom(1000)}, latency=30)
+    manager = TransferManager(connect(server))
+    transfer = manager.add_download(str(tmp_path / "large"), "/large")
+    runner = threading.Thread(target=manager.run)
+    runner.start()
+
+    deadline = time.monotonic() + 5
+    while not manager.active() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [row["name"] for row in manager.active()] == ["/large"]
+
+    manager.cancel(transfer)
+    runner.join(10)
+
+    assert not runner.is_alive()
+    assert transfer.status is TransferStatus.CANCELLED
+    assert manager.client.query.sent[-1].command == "ftstop"
+    server.close()
+
+
+@pytest.mark.parametrize("max_connections", [1, 4])
+def test_every_connection_is_used_and_large_downloads_arrive_intact(tmp_path, max_connections):
+    server = FakeFileTransferServer({f"/file{i}": os.urandom(256 * 1024) for i in range(16)}, latency=0.05)
+
+    manager = download_all(server, tmp_path, max_connections=max_connections)
+
+    # Every transfer waits for the server's latency, long enough for the other connections to be opened meanwhile.
+    assert server.max_active == max_connections
+    assert manager.transferred == 16 * 256 * 1024
+    assert all((tmp_path / name.lstrip("/")).read_bytes() == data for name, data in server.files.items())
+    server.close()
@@ -0,0 +1,80 @@
+from ts3client.ts3query.ts3query_cache import TS3QueryCache
+from ts3client.ts3query.ts3query_command import TS3QueryCommand
+
+from .utils import make_response
+
+
+def test_cache_hit_and_miss():
+    cache = TS3QueryCache()
+    command = TS3QueryCommand("servergrouplist")
+    assert cache.get(command) is None
+
+    response = make_response(b"sgid=1 name=Admin")
+    cache.put(command, response)
+
+    assert cache.get(command) is response
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_cache_ignores_uncacheable_and_failed_commands():
+    cache = TS3QueryCache()
+    cache.put(TS3QueryCommand("clientlist"), make_response(b"clid=1"))
+    cache.put(TS3QueryCommand("servergrouplist"), make_response(b"", error_id=2568))
+    assert len(cache) == 0
+
+
+def test_cache_expires_entries():
+    cache = TS3QueryCache(ttls={"version": 0})
+    command = TS3QueryCommand("version")
+    cache.put(command, make_response(b"version=3.13.7"))
+    assert cache.get(command) is None
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TS3QueryCache(max_entries=2)
+    first = TS3QueryCommand("servergrouplist")
+    second = TS3QueryCommand("channelgrouplist")
+    third = TS3QueryCommand("permissionlist")
+    for command in (first, second):
+        cache.put(command, make_response(b"x=1"))
+
+    cache.get(first)
+    cache.put(third, make_response(b"x=1"))
+
+    assert cache.get(first) is not None
+    assert cache.get(second) is None
+    assert cache.get(third) is not None
+
+
+def test_cache_invalidation_on_mutating_commands():
+    cache = TS3QueryCache()
+    groups = TS3QueryCommand("servergrouplist")
+    version = TS3QueryCommand("version")
+    cache.put(groups, make_response(b"sgid=1"))
+    cache.put(version, make_response(b"version=3.13.7"))
+
+    cache.invalidate(TS3QueryCommand("servergrouprename", kwargs={"sgid": 1, "name": "Mods"}))
+    assert cache.get(groups) is None
+    assert cache.get(version) is not None
+
+    cache.invalidate(TS3QueryCommand("use", kwargs={"sid": 2}))
+    assert len(cache) == 0
+
+
+def test_cache_invalidation_on_group_permission_changes():
+    cache = TS3QueryCache()
+    server_groups = TS3QueryCommand("servergrouplist")
+    channel_groups = TS3QueryCommand("channelgrouplist")
+
+    for command, cached in (
+        ("servergroupaddperm", server_groups),
+        ("servergroupdelperm", server_groups),
+        ("channelgroupaddperm", channel_groups),
+        ("channelgroupdelperm", channel_groups),
+    ):
+        cache.put(server_groups, make_response(b"sgid=1 iconid=0"))
+        cache.put(channel_groups, make_response(b"cgid=1 iconid=0"))
+        cache.invalidate(TS3QueryCommand(command, kwargs={"permsid": "i_icon_id", "permvalue": 5}))
+        assert cache.get(cached) is None
+        assert len(cache) == 1
@@ -0,0 +1,158 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.parse
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from plugins.commands import Weather, weather
+from plugins.commands.weather import WeatherAPI
+from ts3client import TS3Client
+from ts3client.message import Message
+
+from .utils import FakeClock, FakeQuery
+
+
+class WeatherStub(ThreadingHTTPServer):
+    """A local stand-in for the current weather endpoint of WeatherAPI.com that answers after a delay."""
+
+    daemon_threads = True
+
+    def __init__(self, delay: float = 0) -> None:
+        super().__init__(("127.0.0.1", 0), WeatherStubHandler)
+        self.delay = delay
+        self.requests: list[str] = []
+        self.connections: set[int] = set()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class WeatherStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        self.server.requests.append(query["q"][0])
+        self.server.connections.add(self.client_address[1])
+        time.sleep(self.server.delay)
+
+        if query["q"][0] == "atlantis":
+            status, body = 400, {"error": {"code": 1006, "message": "No matching location found."}}
+        else:
+            status, body = 200, {
+                "location": {"name": query["q"][0].title()},
+                "current": {
+                    "condition": {"text": "Sunny"},
+                    "temp_c": 21.0,
+                    "feelslike_c": 20.5,
+                    "humidity": 40,
+                    "wind_kph": 9.4,
+                    "wind_dir": "NW",
+                },
+            }
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = WeatherStub(delay=0.2)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_concurrent_requests_are_coalesced(stub):
+    api = WeatherAPI("key", stub.url)
+    futures = [api.fetch(location) for location in ["Berlin", " berlin", "BERLIN  ", "Paris"] * 5]
+    results = [future.result(5) for future in futures]
+
+    assert sorted(stub.requests) == ["berlin", "paris"]
+    assert results[0]["location"]["name"] == "Berlin" and results[3]["location"]["name"] == "Paris"
+    assert api.fetch("berlin").done()
+    assert len(stub.requests) == 2
+    api.close()
+
+
+def test_cache_expires_and_connections_are_reused(stub):
+    api = WeatherAPI("key", stub.url, ttl=0.1, workers=1)
+    stub.delay = 0
+    api.get("Berlin")
+    time.sleep(0.2)
+    api.get("Berlin")
+    api.get("Paris")
+
+    assert stub.requests == ["berlin", "berlin", "paris"]
+    assert len(stub.connections) == 1
+    with pytest.raises(urllib.error.HTTPError) as error:
+        api.get("Atlantis")
+    assert error.value.code == 400
+    api.close()
+
+
+def test_command_does_not_block_the_handler(stub):
+    client = TS3Client()
+    client.query = FakeQuery()
+    command = Weather(client, "weather", "key", api_url=stub.url)
+
+    def message(content: str) -> Message:
+        return Message(
+            targetmode=1, msg=content.replace(" ", r"\s"), target=1, invokerid=5, invokername="user", invokeruid="uid="
+        )
+
+    started = time.monotonic()
+    command.run(message("!weather berlin"))
+    command.run(message("!weather atlantis"))
+    assert time.monotonic() - started < 0.1
+    assert not client.query.sent
+
+    while len(client.query.sent) < 2:
+        time.sleep(0.01)
+    replies = sorted(command.kwargs["msg"] for command in client.query.sent)
+    assert replies[0].startswith("Current weather for Berlin: Sunny, 21.0°C")
+    assert replies[1] == "Location not found."
+    command.cleanup()
+    with pytest.raises(RuntimeError):
+        command.api.fetch("paris")
+
+
+def test_cache_is_pruned_on_insert(stub, monkeypatch):
+    clock = FakeClock(advance=False)
+    monkeypatch.setattr(weather, "time", clock)
+    stub.delay = 0
+    api = WeatherAPI("key", stub.url, ttl=60, workers=1, max_entries=2)
+    api.get("Berlin")
+    api.get("Paris")
+    api.get("London")
+    assert list(api._cache) == ["paris", "london"]
+
+    clock.now += 60
+    api.get("Rome")
+    assert list(api._cache) == ["rome"]
+    api.close()
+
+
+def test_cancelled_requests_are_not_answered():
+    client = TS3Client()
+    client.query = FakeQuery()
+    command = Weather(client, "weather", "key")
+    future: Future = Future()
+    future.cancel()
+    command.reply(
+        Message(targetmode=1, msg="!weather", target=1, invokerid=5, invokername="user", invokeruid="uid="), future
+    )
+    assert not client.query.sent
+    command.cleanup()
@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+
+from plugins import send_queue
+from plugins.plugins import Welcomer
+from plugins.plugins.welcomer import SeenStore
+from plugins.runtime import PluginRuntime
+from ts3client import TS3Client
+
+from .utils import FakeClock, FakeQuery
+
+
+def enter(clid: int, uid: str, client_type: int = 0) -> bytes:
+    return (
+        f"notifycliententerview cfid=0 ctid=1 reasonid=0 clid={clid} client_unique_identifier={uid} "
+        f"client_nickname=client{clid} client_type={client_type}\n\r"
+    ).encode()
+
+
+def greetings(client: TS3Client) -> dict[int, str]:
+    return {
+        command.kwargs["target"]: command.kwargs["msg"]
+        for command in client.query.sent
+        if command.command == "sendtextmessage"
+    }
+
+
+@pytest.fixture
+def connect(monkeypatch):
+    monkeypatch.setattr(send_queue, "time", FakeClock(now=0, advance=False))
+    runtimes = []
+
+    def start(path: str) -> tuple[TS3Client, Welcomer]:
+        client = TS3Client()
+        client.query = FakeQuery()
+        plugin = Welcomer(client, threading.Event())
+        runtime = PluginRuntime(client)
+        runtimes.append(runtime)
+        runtime.start()
+        runtime.add(
+            plugin,
+            {
+                "messages": ["back"],
+                "first_time_messages": ["new"],
+                "database": path,
+                "rate": 2,
+                "burst": 3,
+                "max_age": 10,
+            },
+        )
+        assert runtime.drain(plugin, 5)
+        # The greetings are flushed by the tests.
+        plugin.cancel("tick")
+        return client, plugin
+
+    yield start
+    for runtime in runtimes:
+        runtime.stop(1)
+
+
+def test_seen_clients_persist(tmp_path):
+    store = SeenStore(str(tmp_path / "seen.sqlite"))
+    assert store.add("a=") and store.add("b=")
+    assert not store.add("a=")
+    assert store.flush() == 2 and store.flush() == 0
+    store.close()
+
+    store = SeenStore(str(tmp_path / "seen.sqlite"))
+    assert "a=" in store and "b=" in store and len(store) == 2
+    store.close()
+
+
+def test_first_time_and_returning_clients(tmp_path, connect):
+    store = SeenStore(str(tmp_path / "seen.sqlite"))
+    store.add("old=")
+    store.close()
+
+    client, plugin = connect(str(tmp_path / "seen.sqlite"))
+    client.query.responses["version"] = enter(1, "old=") + enter(2, "fresh=") + enter(3, "query=", 1) + b"version=3"
+    client.query.commands.version()
+    assert plugin.runtime.drain(plugin, 5)
+    plugin.queue.flush(now=0)
+
+    assert greetings(client) == {1: "back", 2: "new"}
+    assert "fresh=" in plugin.seen and "query=" not in plugin.seen
+
+
+def test_reconnect_storm_is_paced(tmp_path, connect):
+    client, plugin = connect(str(tmp_path / "seen.sqlite"))
+    client.query.responses["version"] = b"".join(enter(clid, f"uid{clid}=") for clid in range(1, 301)) + (
+        b"notifyclientleftview cfid=1 ctid=0 reasonid=8 clid=2\n\rversion=3"
+    )
+    client.query.commands.version()
+    assert plugin.runtime.drain(plugin, 5)
+    assert len(plugin.queue) == 299
+
+    # The bucket starts full and refills at two greetings per second; each flush is a single batch of at most two,
+    # even when the bucket holds three.
+    assert plugin.queue.flush(now=0) == 2
+    assert plugin.queue.flush(now=0.2) == 1
+    assert plugin.queue.flush(now=0.4) == 0
+    assert plugin.queue.flush(now=1) == 2
+    assert plugin.queue.flush(now=5) == 2
+    assert [len(batch) for batch in client.query.batches] == [2, 1, 2, 2]
+    assert sorted(greetings(client)) == [1, 3, 4, 5, 6, 7, 8]
+
+    # Greetings that waited longer than max_age are dropped instead of being sent late.
+    assert plugin.queue.flush(now=20) == 0
+    assert len(plugin.queue) == 0 and plugin.queue.dropped == 292
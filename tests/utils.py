@@ -0,0 +1,268 @@
+import itertools
+import socket
+import threading
+import time
+
+from ts3client.ts3query.ts3query_command import CommandsWrapper, TS3QueryCommand
+from ts3client.ts3query.ts3query_response import TS3QueryResponse
+from ts3client.utils import patterns
+from ts3client.utils.formatters import string_to_query
+
+
+def make_response(body: bytes, error_id: int = 0, msg: bytes = b"ok") -> TS3QueryResponse:
+    """Builds a query response as it would be parsed from the raw bytes sent by the server."""
+    raw = body + b"\n\rerror id=" + str(error_id).encode() + b" msg=" + msg + b"\n\r"
+    return TS3QueryResponse(0, patterns.RESPONSE_END_BYTES.search(raw), raw)
+
+
+class FakeClock:
+    """
+    Stands in for the time module of a module under test: monotonic() only moves when advance is True and sleep()
+    is called, and every sleep is recorded together with the result of on_sleep. perf_counter() is the real one.
+    """
+
+    perf_counter = staticmethod(time.perf_counter)
+
+    def __init__(self, now: float = 1000.0, advance: bool = True, on_sleep=None) -> None:
+        self.now = now
+        self.advance = advance
+        self.on_sleep = on_sleep
+        self.sleeps: list = []
+        self._lock = threading.Lock()
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        with self._lock:
+            self.sleeps.append(seconds if self.on_sleep is None else (seconds, self.on_sleep()))
+            if self.advance:
+                self.now += seconds
+
+
+class FakeQuery:
+    """Stands in for TS3Query, answering commands from a dict of command names to raw response bodies."""
+
+    def __init__(self, responses: dict[str, bytes | TS3QueryResponse] = None) -> None:
+        self.responses = responses or {}
+        self.sent: list[TS3QueryCommand] = []
+        self.batches: list[list[TS3QueryCommand]] = []
+        self.streamed: list[tuple[TS3QueryCommand, list[bytes]]] = []
+        self.hooks = []
+        self.commands = CommandsWrapper(self)
+
+    def send(self, command: TS3QueryCommand, use_cache: bool = True) -> TS3QueryResponse:
+        self.sent.append(command)
+        response = self.responses.get(command.command, b"")
+        if callable(response):
+            response = response(command)
+        if isinstance(response, bytes):
+            response = make_response(response)
+        for hook in self.hooks:
+            hook(command, response)
+        return response
+
+    def send_batch(self, commands: list[TS3QueryCommand]) -> list[TS3QueryResponse]:
+        self.batches.append(commands)
+        return [self.send(command) for command in commands]
+
+    def send_stream(self, command: TS3QueryCommand, body) -> TS3QueryResponse:
+        self.streamed.append((command, list(body)))
+        return self.send(command)
+
+    def start_polling(self, polling_rate: float = 1) -> None:
+        # Events arrive with the responses of send(), there is nothing to poll.
+        pass
+
+    def add_response_hook(self, hook) -> None:
+        self.hooks.append(hook)
+
+    def remove_response_hook(self, hook) -> None:
+        self.hooks.remove(hook)
+
+
+class FakeQueryServer:
+    """
+    A local stand-in for the ServerQuery interface that greets a single connection and answers every command line
+    with "error id=0 msg=ok". The lines are recorded in received.
+    """
+
+    GREETING = (
+        b'TS3\n\rWelcome to the TeamSpeak 3 ServerQuery interface, type "help" for a list of '
+        b'commands and "help <command>" for information on a specific command.\n\r'
+    )
+
+    def __init__(self) -> None:
+        self.received: list[bytes] = []
+        self._socket = socket.create_server(("127.0.0.1", 0))
+        self.port = self._socket.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self) -> None:
+        connection, _ = self._socket.accept()
+        with connection:
+            connection.sendall(self.GREETING)
+            buffer = b""
+            while chunk := connection.recv(65536):
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    self.received.append(line)
+                    connection.sendall(b"error id=0 msg=ok\n\r")
+                    if line.strip() == b"quit":
+                        return
+
+
+class FakeFileTransferServer:
+    """
+    A local stand-in for the file transfer interface of a server.
+    Its init_upload and init_download methods answer ftinitupload and ftinitdownload for a FakeQuery
+    and hand out keys that are then accepted on the data port.
+    Every transfer waits latency seconds before any data is moved, and downloads of the names in
+    interrupt are cut off once after the given number of bytes.
+    """
+
+    KEY_LENGTH = 16
+
+    def __init__(self, files: dict[str, bytes] = None, latency: float = 0, interrupt: dict[str, int] = None) -> None:
+        self.files = dict(files or {})
+        self.latency = latency
+        self.interrupt = dict(interrupt or {})
+        self.active = 0
+        self.max_active = 0
+        self.completed = 0
+        self._pending: dict[str, tuple[int, str, str, int, int]] = {}
+        self._connections: dict[int, tuple[socket.socket, str, int]] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Condition()
+        self._socket = socket.create_server(("127.0.0.1", 0))
+        self.port = self._socket.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def responses(self) -> dict:
+        return {
+            "ftinitupload": self.init_upload,
+            "ftinitdownload": self.init_download,
+            "ftlist": self.list,
+            "ftstop": self.stop,
+        }
+
+    def init_upload(self, command: TS3QueryCommand) -> TS3QueryResponse:
+        name, size = command.kwargs["name"], command.kwargs["size"]
+        seekpos = len(self.files.get(name, b"")) if command.kwargs.get("resume") else 0
+        return self._ticket(command, ("upload", name, size, seekpos), f"seekpos={seekpos}")
+
+    def init_download(self, command: TS3QueryCommand) -> TS3QueryResponse:
+        name = command.kwargs["name"]
+        if name not in self.files:
+            return make_response(b"clientftfid=1 status=2051 msg=invalid\\sfile\\sname size=0")
+        size = len(self.files[name])
+        return self._ticket(
+            command,
+            ("download", name, size, command.kwargs.get("seekpos") or 0),
+            f"size={size}",
+        )
+
+    def list(self, command: TS3QueryCommand) -> TS3QueryResponse:
+        with self._lock:
+            rows = [
+                f"serverftfid={serverftfid} name={name} size={size} sender=0 status=1 current_speed=0"
+                for serverftfid, (_, name, size) in self._connections.items()
+            ]
+        if not rows:
+            return make_response(b"", 1281, b"database\\sempty\\sresult\\sset")
+        return make_response("|".join(rows).encode())
+
+    def stop(self, command: TS3QueryCommand) -> TS3QueryResponse:
+        with self._lock:
+            connection = self._connections.get(command.kwargs["serverftfid"])
+        if connection is not None:
+            connection[0].shutdown(socket.SHUT_RDWR)
+        return make_response(b"")
+
+    def wait(self, completed: int, timeout: float = 5) -> None:
+        """Blocks until the given number of transfers has been processed by the server."""
+        with self._lock:
+            assert self._lock.wait_for(lambda: self.completed >= completed, timeout)
+
+    def close(self) -> None:
+        self._socket.close()
+
+    def _ticket(self, command: TS3QueryCommand, transfer: tuple, extra: str) -> TS3QueryResponse:
+        serverftfid = next(self._ids)
+        key = f"ftkey{serverftfid:0{self.KEY_LENGTH - 5}d}"
+        self._pending[key] = (serverftfid, *transfer)
+        return make_response(
+            f"clientftfid={command.kwargs['clientftfid']} serverftfid={serverftfid} ftkey={key} "
+            f"port={self.port} proto=0 {extra}".encode()
+        )
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                connection, _ = self._socket.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+    def _handle(self, connection: socket.socket) -> None:
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            with connection:
+                key = self._read(connection, self.KEY_LENGTH).decode()
+                serverftfid, mode, name, size, seekpos = self._pending.pop(key)
+                with self._lock:
+                    self._connections[serverftfid] = (connection, name, size)
+                time.sleep(self.latency)
+                if mode == "upload":
+                    data = self._read(connection, size - seekpos)
+                    self.files[name] = self.files.get(name, b"")[:seekpos] + data
+                else:
+                    data = self.files[name][seekpos:]
+                    connection.sendall(data[: self.interrupt.pop(name, len(data))])
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._connections = {k: v for k, v in self._connections.items() if v[0] is not connection}
+                self.active -= 1
+                self.completed += 1
+                self._lock.notify_all()
+
+    @staticmethod
+    def _read(connection: socket.socket, size: int) -> bytes:
+        chunks = []
+        while size > 0:
+            chunk = connection.recv(min(size, 65536))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+
+class FakeServerLog:
+    """
+    Answers logview like the server: up to lines entries are read backwards from begin_pos
+    (or the end of the file) and last_pos reports the offset of the first entry returned.
+    """
+
+    def __init__(self, lines: list[str] = None) -> None:
+        self.lines = list(lines or [])
+        self.calls = 0
+
+    def __call__(self, command: TS3QueryCommand) -> TS3QueryResponse:
+        self.calls += 1
+        offsets = [0]
+        for line in self.lines:
+            offsets.append(offsets[-1] + len(line.encode()) + 1)
+
+        end = command.kwargs.get("begin_pos")
+        end = offsets[-1] if end is None else end
+        last = offsets.index(end)
+        first = max(last - (command.kwargs.get("lines") or 100), 0)
+        rows = [f"l={string_to_query(line)}" for line in self.lines[first:last]] or ["l="]
+        rows[0] = f"last_pos={offsets[first]} file_size={offsets[-1]} {rows[0]}"
+        return make_response("|".join(rows).encode())
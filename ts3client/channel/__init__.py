@@ -1,2 +1,4 @@
 from .channel import Channel
 from .channel_info import ChannelInfo
+from .channel_reconciler import ChannelReconciler, ChannelRef, PlanStep, load_layout
+from .channel_tree import ChannelTree
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import bisect
+import json
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional
+
+from ..ts3client_response import TS3ClientResponse
+from ..ts3query.ts3query_command import TS3QueryCommand
+from ..utils import validators
+from ..utils.parsers import dataclass_kwargs
+from .channel import Channel
+from .channel_tree import ChannelTree
+
+if TYPE_CHECKING:
+    from ..ts3client import TS3Client
+
+# Properties reported by channellist -topic -flags -voice -limits -icon, only these can be compared without
+# reading every channel's info. Other properties, e.g. channel_description or channel_password, are only set
+# when a channel is created.
+LISTED_PROPERTIES = (
+    "channel_topic",
+    "channel_flag_default",
+    "channel_flag_password",
+    "channel_flag_permanent",
+    "channel_flag_semi_permanent",
+    "channel_codec",
+    "channel_codec_quality",
+    "channel_needed_talk_power",
+    "channel_maxclients",
+    "channel_maxfamilyclients",
+    "channel_icon_id",
+)
+
+
+@dataclass(frozen=True)
+class ChannelRef:
+    """Stands in for the ID of a channel that is created by an earlier step of the same plan."""
+
+    path: str
+
+    def __str__(self) -> str:
+        return f"<{self.path}>"
+
+
+@dataclass
+class PlanStep:
+    command: str
+    kwargs: dict = field(default_factory=dict)
+    path: str = ""
+    creates: Optional[ChannelRef] = None
+
+    def references(self) -> set[ChannelRef]:
+        return {value for value in self.kwargs.values() if isinstance(value, ChannelRef)}
+
+    def resolve(self, ids: dict[ChannelRef, int]) -> TS3QueryCommand:
+        kwargs = {key: ids[value] if isinstance(value, ChannelRef) else value for key, value in self.kwargs.items()}
+        return TS3QueryCommand(self.command, kwargs=kwargs)
+
+    def __str__(self) -> str:
+        return " ".join([self.command, *(f"{key}={value}" for key, value in self.kwargs.items())])
+
+
+def load_layout(path: str) -> list[dict]:
+    """
+    Loads a channel layout from a JSON or YAML file. YAML requires PyYAML to be installed.
+
+    :param path: The path of the file.
+    :type path: str
+    :return: The layout.
+    :rtype: list[dict]
+    """
+    with open(path) as file:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+
+            return yaml.safe_load(file)
+        return json.load(file)
+
+
+class ChannelReconciler:
+    """
+    Brings the channels of a virtual server in line with a declarative layout.
+    A layout is a list of channels, each a dict with a name, any channel properties and a list of children, e.g.
+    [{"name": "Games", "flag_permanent": 1, "children": [{"name": "CS2", "maxclients": 10}]}].
+    Property names may omit the channel_ prefix.
+
+    Channels are matched by their name among the children of their parent. The plan only contains the commands
+    that are needed: channelcreate for missing channels, channeledit for changed properties and channelmove for
+    the fewest channels whose order has to change. Channels that are not part of the layout are deleted only
+    if prune is set. Reconciling a server that already matches its layout costs a single channellist.
+
+    :param client: The client to reconcile the channels of.
+    :type client: TS3Client
+    """
+
+    def __init__(self, client: TS3Client) -> None:
+        self.client = client
+
+    def plan(self, layout: list[dict], prune: bool = False) -> list[PlanStep]:
+        """
+        Computes the commands that turn the current channels into the layout.
+
+        :param layout: The desired channels.
+        :type layout: list[dict]
+        :param prune: Whether to delete channels that are not part of the layout, defaults to False.
+        :type prune: bool, optional
+        :raises ValueError: If a channel has no name or an invalid property.
+        :return: The ordered steps of the plan.
+        :rtype: list[PlanStep]
+        """
+        response = TS3ClientResponse(
+            self.client.query.commands.channellist(topic=True, flags=True, voice=True, limits=True, icon=True)
+        )
+        rows = {row["cid"]: row for row in response if "cid" in row}
+        tree = ChannelTree([Channel(**dataclass_kwargs(Channel, row)) for row in rows.values()])
+
+        steps: list[PlanStep] = []
+        self._plan_children(layout, 0, 0, "", tree, rows, prune, steps)
+        return steps
+
+    def apply(self, layout: list[dict], prune: bool = False, dry_run: bool = False) -> list[PlanStep]:
+        """
+        Plans and executes the commands that turn the current channels into the layout.
+        Steps are pipelined, a new batch is only started when a step needs the ID of a channel created in the
+        current one.
+
+        :param layout: The desired channels.
+        :type layout: list[dict]
+        :param prune: Whether to delete channels that are not part of the layout, defaults to False.
+        :type prune: bool, optional
+        :param dry_run: Whether to only return the plan without executing it, defaults to False.
+        :type dry_run: bool, optional
+        :raises TS3Error: If the server rejects a step, later steps are not executed.
+        :return: The steps of the plan.
+        :rtype: list[PlanStep]
+        """
+        steps = self.plan(layout, prune)
+        if not dry_run:
+            self.execute(steps)
+        return steps
+
+    def execute(self, steps: list[PlanStep]) -> dict[ChannelRef, int]:
+        """
+        Executes a plan.
+
+        :param steps: The steps of the plan.
+        :type steps: list[PlanStep]
+        :raises TS3Error: If the server rejects a step, later steps are not executed.
+        :return: The IDs of the created channels.
+        :rtype: dict[ChannelRef, int]
+        """
+        ids: dict[ChannelRef, int] = {}
+        batch: list[PlanStep] = []
+        for step in steps:
+            if any(ref not in ids for ref in step.references()):
+                self._send(batch, ids)
+                batch = []
+            batch.append(step)
+        self._send(batch, ids)
+        return ids
+
+    def _send(self, batch: list[PlanStep], ids: dict[ChannelRef, int]) -> None:
+        if not batch:
+            return
+
+        responses = self.client.query.send_batch([step.resolve(ids) for step in batch])
+        for step, response in zip(batch, responses):
+            response = TS3ClientResponse(response)
+            if step.creates is not None:
+                ids[step.creates] = response[0]["cid"]
+
+    def _plan_children(
+        self,
+        specs: list[dict],
+        parent: int | ChannelRef,
+        live_parent: int | None,
+        path: str,
+        tree: ChannelTree,
+        rows: dict[int, dict],
+        prune: bool,
+        steps: list[PlanStep],
+    ) -> None:
+        specs = [self._normalize(spec, path) for spec in specs]
+        names = [spec["channel_name"] for spec in specs]
+        live = tree.children(live_parent) if live_parent is not None else []
+        by_name: dict[str, Channel] = {}
+        for channel in live:
+            by_name.setdefault(channel.channel_name, channel)
+
+        if prune:
+            matched = {by_name[name].cid for name in names if name in by_name}
+            for channel in live:
+                if channel.cid not in matched:
+                    steps.append(
+                        PlanStep("channeldelete", {"cid": channel.cid, "force": True}, self._join(path, channel))
+                    )
+
+        existing = [by_name[name] for name in names if name in by_name]
+        in_order = self._longest_ordered([live.index(channel) for channel in existing])
+        in_order = {existing[i].cid for i in in_order}
+
+        previous: int | ChannelRef = 0
+        for spec in specs:
+            name = spec["channel_name"]
+            children = spec.pop("children", None) or []
+            channel_path = f"{path}/{name}"
+            channel = by_name.get(name)
+
+            if channel is None:
+                ref = ChannelRef(channel_path)
+                kwargs = {**spec, "cpid": parent, "channel_order": previous}
+                steps.append(PlanStep("channelcreate", kwargs, channel_path, ref))
+                self._plan_children(children, ref, None, channel_path, tree, rows, prune, steps)
+                previous = ref
+                continue
+
+            changes = {
+                key: value
+                for key, value in spec.items()
+                if key in LISTED_PROPERTIES and not self._equal(value, rows[channel.cid].get(key))
+            }
+            if changes:
+                steps.append(PlanStep("channeledit", {"cid": channel.cid, **changes}, channel_path))
+            if channel.cid not in in_order:
+                steps.append(
+                    PlanStep("channelmove", {"cid": channel.cid, "cpid": parent, "order": previous}, channel_path)
+                )
+            self._plan_children(children, channel.cid, channel.cid, channel_path, tree, rows, prune, steps)
+            previous = channel.cid
+
+    @staticmethod
+    def _normalize(spec: dict, path: str) -> dict:
+        normalized = {}
+        for key, value in spec.items():
+            key = key.lower()
+            if key == "children":
+                normalized[key] = value
+                continue
+            if not key.startswith("channel_"):
+                key = f"channel_{key}"
+            normalized[key] = int(value) if isinstance(value, bool) else value
+
+        if not normalized.get("channel_name"):
+            raise ValueError(f"A channel below '{path or '/'}' has no name.")
+        validators._validate_channel_kwargs({k: v for k, v in normalized.items() if k != "children"})
+        return normalized
+
+    @staticmethod
+    def _equal(desired, live) -> bool:
+        return live is not None and str(desired) == str(live)
+
+    @staticmethod
+    def _join(path: str, channel: Channel) -> str:
+        return f"{path}/{channel.channel_name}"
+
+    @staticmethod
+    def _longest_ordered(positions: list[int]) -> list[int]:
+        """Returns the indices of a longest increasing subsequence, these channels do not have to be moved."""
+        tails: list[int] = []
+        tail_indices: list[int] = []
+        previous = [-1] * len(positions)
+        for i, position in enumerate(positions):
+            j = bisect.bisect_left(tails, position)
+            if j == len(tails):
+                tails.append(position)
+                tail_indices.append(i)
+            else:
+                tails[j] = position
+                tail_indices[j] = i
+            previous[i] = tail_indices[j - 1] if j > 0 else -1
+
+        indices = []
+        i = tail_indices[-1] if tail_indices else -1
+        while i != -1:
+            indices.append(i)
+            i = previous[i]
+        return indices[::-1]
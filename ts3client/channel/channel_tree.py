@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, Iterator
+
+from ..event import (
+    ChannelCreatedEvent,
+    ChannelDeletedEvent,
+    ChannelEditedEvent,
+    ChannelMovedEvent,
+)
+from ..ts3query.ts3query_cache import CONTEXT_COMMANDS
+from ..utils.parsers import dataclass_kwargs
+from .channel import Channel
+
+if TYPE_CHECKING:
+    from ..ts3query.ts3query_command import TS3QueryCommand
+    from ..ts3query.ts3query_response import TS3QueryResponse
+
+
+class ChannelTree:
+    """
+    An in-memory index of the channel hierarchy of a virtual server.
+    Parents, children and channels by path are looked up without querying the server.
+    Siblings are kept in the order given by channel_order, which is the ID of the channel
+    sorted right above (0 for the first channel below its parent).
+
+    :param channels: The channels to build the tree from, defaults to None.
+    :type channels: list[Channel], optional
+    """
+
+    def __init__(self, channels: list[Channel] = None) -> None:
+        self.loaded = False
+        self._channels: dict[int, Channel] = {}
+        self._children: dict[int, list[int]] = {0: []}
+        self._by_name: dict[tuple[int, str], int] = {}
+        self._lock = threading.RLock()
+        if channels is not None:
+            self.load(channels)
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def __contains__(self, cid: int) -> bool:
+        return cid in self._channels
+
+    def __iter__(self) -> Iterator[Channel]:
+        return self.walk()
+
+    def load(self, channels: list[Channel]) -> None:
+        """
+        Replaces the whole tree with the given channels.
+
+        :param channels: The channels as returned by channellist.
+        :type channels: list[Channel]
+        """
+        with self._lock:
+            self.loaded = True
+            self._channels = {channel.cid: channel for channel in channels}
+            self._children = {0: []}
+            self._by_name = {}
+
+            followers: dict[int, dict[int, int]] = {}
+            for channel in channels:
+                self._children.setdefault(channel.cid, [])
+                followers.setdefault(channel.pid or 0, {})[channel.channel_order or 0] = channel.cid
+                self._by_name[(channel.pid or 0, channel.channel_name)] = channel.cid
+
+            for pid, following in followers.items():
+                ordered = self._children.setdefault(pid, [])
+                cid = following.get(0)
+                while cid is not None and len(ordered) < len(following):
+                    ordered.append(cid)
+                    cid = following.get(cid)
+                # Channels with an inconsistent order are appended rather than lost.
+                ordered.extend(cid for cid in following.values() if cid not in ordered)
+
+    def clear(self) -> None:
+        """Empties the tree and marks it as not loaded."""
+        with self._lock:
+            self.loaded = False
+            self._channels = {}
+            self._children = {0: []}
+            self._by_name = {}
+
+    def get(self, cid: int) -> Channel | None:
+        return self._channels.get(cid)
+
+    def parent(self, cid: int) -> Channel | None:
+        channel = self._channels.get(cid)
+        return self._channels.get(channel.pid) if channel else None
+
+    def children(self, cid: int = 0) -> list[Channel]:
+        """
+        Returns the direct subchannels of a channel in their display order.
+
+        :param cid: Channel ID, defaults to 0 for the top level channels.
+        :type cid: int, optional
+        :return: The subchannels.
+        :rtype: list[Channel]
+        """
+        with self._lock:
+            return [self._channels[child] for child in self._children.get(cid, [])]
+
+    def walk(self, cid: int = 0) -> Iterator[Channel]:
+        """
+        Iterates over all channels below a channel, depth first and in display order.
+
+        :param cid: Channel ID, defaults to 0 for the whole tree.
+        :type cid: int, optional
+        :return: An iterator over the channels.
+        :rtype: Iterator[Channel]
+        """
+        with self._lock:
+            stack = list(reversed(self._children.get(cid, [])))
+            subtree = []
+            while stack:
+                child = stack.pop()
+                subtree.append(self._channels[child])
+                stack.extend(reversed(self._children.get(child, [])))
+        return iter(subtree)
+
+    def ancestors(self, cid: int) -> list[Channel]:
+        """Returns the parents of a channel, starting with its direct parent."""
+        with self._lock:
+            result = []
+            parent = self.parent(cid)
+            while parent is not None:
+                result.append(parent)
+                parent = self.parent(parent.cid)
+            return result
+
+    def find_by_path(self, path: str, separator: str = "/") -> Channel | None:
+        """
+        Looks up a channel by the names of the channels leading to it, e.g. "Gaming/CS2/Team A".
+
+        :param path: The channel names separated by separator.
+        :type path: str
+        :param separator: The separator between the channel names, defaults to "/".
+        :type separator: str, optional
+        :return: The channel or None if no channel has this path.
+        :rtype: Channel | None
+        """
+        with self._lock:
+            cid = 0
+            for name in path.strip(separator).split(separator):
+                cid = self._by_name.get((cid, name))
+                if cid is None:
+                    return None
+            return self._channels.get(cid)
+
+    def path_of(self, cid: int, separator: str = "/") -> str | None:
+        """Returns the path of a channel, the inverse of find_by_path."""
+        with self._lock:
+            channel = self._channels.get(cid)
+            if channel is None:
+                return None
+            names = [parent.channel_name for parent in reversed(self.ancestors(cid))]
+            return separator.join([*names, channel.channel_name])
+
+    def add(self, channel: Channel) -> None:
+        """Adds a channel below its parent, right under the channel given by channel_order."""
+        with self._lock:
+            if channel.cid in self._channels:
+                self.remove(channel.cid, recursive=False)
+            self._channels[channel.cid] = channel
+            self._children.setdefault(channel.cid, [])
+            self._by_name[(channel.pid or 0, channel.channel_name)] = channel.cid
+            self._insert(channel)
+
+    def remove(self, cid: int, recursive: bool = True) -> None:
+        """Removes a channel and, unless recursive is False, all of its subchannels."""
+        with self._lock:
+            channel = self._channels.get(cid)
+            if channel is None:
+                return
+            if recursive:
+                for child in list(self._children.get(cid, [])):
+                    self.remove(child)
+                self._children.pop(cid, None)
+            self._detach(channel)
+            del self._channels[cid]
+            if self._by_name.get((channel.pid or 0, channel.channel_name)) == cid:
+                del self._by_name[(channel.pid or 0, channel.channel_name)]
+
+    def move(self, cid: int, pid: int, order: int | None = None) -> None:
+        """Moves a channel below a new parent, right under the channel given by order."""
+        with self._lock:
+            channel = self._channels.get(cid)
+            if channel is None:
+                return
+            self._detach(channel)
+            if self._by_name.get((channel.pid or 0, channel.channel_name)) == cid:
+                del self._by_name[(channel.pid or 0, channel.channel_name)]
+            channel.pid = pid
+            channel.channel_order = order or 0
+            self._by_name[(pid, channel.channel_name)] = cid
+            self._insert(channel)
+
+    def rename(self, cid: int, name: str) -> None:
+        with self._lock:
+            channel = self._channels.get(cid)
+            if channel is None:
+                return
+            if self._by_name.get((channel.pid or 0, channel.channel_name)) == cid:
+                del self._by_name[(channel.pid or 0, channel.channel_name)]
+            channel.channel_name = name
+            self._by_name[(channel.pid or 0, name)] = cid
+
+    def feed(self, command: TS3QueryCommand, response: TS3QueryResponse) -> None:
+        """
+        Keeps the tree up to date with channel events and channellist replies.
+        The tree is cleared when the query switches to another virtual server or logs in or out.
+        Meant to be registered as a response hook.
+
+        :param command: The command that was sent.
+        :type command: TS3QueryCommand
+        :param response: The response from the server.
+        :type response: TS3QueryResponse
+        """
+        if command.command in CONTEXT_COMMANDS and response.error_id == 0:
+            self.clear()
+        elif command.command == "channellist" and response.error_id == 0:
+            self.load([Channel(**dataclass_kwargs(Channel, row)) for row in response.data.values() if "cid" in row])
+
+        for event in response.events:
+            if isinstance(event, ChannelCreatedEvent):
+                self.add(Channel(event.cid, event.cpid or 0, event.channel_order or 0, event.channel_name))
+            elif isinstance(event, ChannelDeletedEvent):
+                self.remove(event.cid)
+            elif isinstance(event, ChannelMovedEvent):
+                self.move(event.cid, event.cpid or 0, event.order)
+            elif isinstance(event, ChannelEditedEvent):
+                if event.channel_name is not None:
+                    self.rename(event.cid, event.channel_name)
+                if event.channel_order is not None and event.cid in self._channels:
+                    self.move(event.cid, self._channels[event.cid].pid or 0, event.channel_order)
+
+    def _insert(self, channel: Channel) -> None:
+        siblings = self._children.setdefault(channel.pid or 0, [])
+        order = channel.channel_order or 0
+        index = siblings.index(order) + 1 if order in siblings else 0
+        if order not in siblings:
+            channel.channel_order = 0
+        siblings.insert(index, channel.cid)
+        if index + 1 < len(siblings):
+            self._channels[siblings[index + 1]].channel_order = channel.cid
+
+    def _detach(self, channel: Channel) -> None:
+        siblings = self._children.get(channel.pid or 0, [])
+        if channel.cid not in siblings:
+            return
+        index = siblings.index(channel.cid)
+        if index + 1 < len(siblings):
+            self._channels[siblings[index + 1]].channel_order = siblings[index - 1] if index > 0 else 0
+        siblings.pop(index)
@@ -5,3 +5,26 @@ class TS3Error(Exception):
 
     def __str__(self):
         return f"Error {self.id}: {self.msg}"
+
+
+class FileTransferError(Exception):
+    def __init__(self, name: str, message: str):
+        self.name = name
+        self.msg = message
+
+    def __str__(self):
+        return f"File transfer '{self.name}': {self.msg}"
+
+
+class SnapshotFormatError(Exception):
+    def __init__(self, version: int, message: str):
+        self.version = version
+        self.msg = message
+
+    def __str__(self):
+        return f"Snapshot version {self.version}: {self.msg}"
+
+
+# Error IDs returned by the server that callers commonly need to tell apart.
+INVALID_CLIENT_ID = 512
+DATABASE_EMPTY_RESULT_SET = 1281
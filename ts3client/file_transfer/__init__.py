@@ -0,0 +1,5 @@
+from .bandwidth_limiter import BandwidthLimiter
+from .file_transfer import FileTransfer, FileTransferTicket
+from .icon_cache import IconCache
+from .transfer import Transfer, TransferDirection, TransferStatus
+from .transfer_manager import TransferManager
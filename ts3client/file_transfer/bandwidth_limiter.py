@@ -0,0 +1,42 @@
+import threading
+import time
+
+
+class BandwidthLimiter:
+    """
+    A token bucket shared by any number of transfers to cap their combined bandwidth.
+    Each chunk reserves its bytes before it is moved and waits until the bucket has refilled enough to cover them,
+    so concurrent transfers split the available rate between them.
+
+    :param rate: The maximum number of bytes per second.
+    :type rate: float
+    :param burst: The number of bytes that may be moved at once after an idle period, defaults to 64 KiB.
+    :type burst: int, optional
+    """
+
+    def __init__(self, rate: float, burst: int = 64 * 1024) -> None:
+        if rate <= 0:
+            raise ValueError("The rate must be positive.")
+
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: int) -> None:
+        """
+        Reserves bandwidth for the given number of bytes, blocking until it is available.
+
+        :param amount: The number of bytes about to be moved.
+        :type amount: int
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            delay = -self._tokens / self.rate
+
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import itertools
+import os
+import socket
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, BinaryIO, Callable, Optional
+
+from ..errors import FileTransferError
+from ..ts3client_response import TS3ClientResponse
+from ..ts3query.ts3query_command import TS3QueryCommand
+from ..ts3query.ts3query_response import TS3QueryResponse
+from .bandwidth_limiter import BandwidthLimiter
+
+if TYPE_CHECKING:
+    from ..ts3client import TS3Client
+
+DEFAULT_PORT = 30033
+
+ProgressCallback = Callable[[int, int], None]
+
+
+@dataclass
+class FileTransferTicket:
+    """The reply of ftinitupload or ftinitdownload that authorizes one transfer on the data channel."""
+
+    clientftfid: int
+    serverftfid: int
+    ftkey: str
+    port: int = DEFAULT_PORT
+    size: int = 0
+    seekpos: int = 0
+    proto: Optional[int] = None
+    ip: Optional[str] = None
+
+
+class FileTransfer:
+    """
+    Moves files over the file transfer interface of the server (TCP port 30033 by default).
+    A transfer is initialized through the query with ftinitupload or ftinitdownload and the
+    returned ftkey is then sent over a separate data connection, followed by the file contents.
+    Uploads use socket.sendfile, downloads are read into a preallocated buffer.
+
+    :param client: The client to initialize transfers with.
+    :type client: TS3Client
+    :param chunk_size: The number of bytes to move between progress reports, defaults to 64 KiB.
+    :type chunk_size: int, optional
+    :param timeout: The timeout of the data connection in seconds, defaults to 10.
+    :type timeout: float, optional
+    """
+
+    def __init__(self, client: TS3Client, chunk_size: int = 64 * 1024, timeout: float = 10) -> None:
+        self.client = client
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+
+    def upload_command(
+        self,
+        name: str,
+        size: int,
+        cid: int = 0,
+        cpw: str = "",
+        overwrite: bool = True,
+        resume: bool = False,
+    ) -> TS3QueryCommand:
+        """
+        Builds the ftinitupload command for an upload, e.g. to send several of them with TS3Query.send_batch.
+
+        :param name: Path of the file in the channel's file repository, e.g. "/banner.png".
+        :type name: str
+        :param size: Total size of the file in bytes.
+        :type size: int
+        :param cid: Channel ID, defaults to 0 for server wide files such as icons and avatars.
+        :type cid: int, optional
+        :param cpw: Channel password, defaults to "".
+        :type cpw: str, optional
+        :param overwrite: Whether to overwrite an existing file, defaults to True.
+        :type overwrite: bool, optional
+        :param resume: Whether to resume a previously interrupted upload, defaults to False.
+        :type resume: bool, optional
+        :return: The command to send.
+        :rtype: TS3QueryCommand
+        """
+        return TS3QueryCommand(
+            "ftinitupload",
+            kwargs={
+                "clientftfid": next(self._ids),
+                "name": name,
+                "cid": cid,
+                "cpw": cpw,
+                "size": size,
+                "overwrite": overwrite and not resume,
+                "resume": resume,
+            },
+        )
+
+    def download_command(self, name: str, cid: int = 0, cpw: str = "", seekpos: int = 0) -> TS3QueryCommand:
+        """
+        Builds the ftinitdownload command for a download, e.g. to send several of them with TS3Query.send_batch.
+
+        :param name: Path of the file in the channel's file repository, e.g. "/banner.png".
+        :type name: str
+        :param cid: Channel ID, defaults to 0 for server wide files such as icons and avatars.
+        :type cid: int, optional
+        :param cpw: Channel password, defaults to "".
+        :type cpw: str, optional
+        :param seekpos: The offset to start downloading at, defaults to 0.
+        :type seekpos: int, optional
+        :return: The command to send.
+        :rtype: TS3QueryCommand
+        """
+        return TS3QueryCommand(
+            "ftinitdownload",
+            kwargs={"clientftfid": next(self._ids), "name": name, "cid": cid, "cpw": cpw, "seekpos": seekpos},
+        )
+
+    def init_upload(
+        self,
+        name: str,
+        size: int,
+        cid: int = 0,
+        cpw: str = "",
+        overwrite: bool = True,
+        resume: bool = False,
+    ) -> FileTransferTicket:
+        """
+        Initializes an upload through the query. See upload_command for the parameters.
+
+        :return: The ticket for the data connection.
+        :rtype: FileTransferTicket
+        """
+        command = self.upload_command(name, size, cid, cpw, overwrite, resume)
+        return self.ticket(command, self.client.query.send(command))
+
+    def init_download(self, name: str, cid: int = 0, cpw: str = "", seekpos: int = 0) -> FileTransferTicket:
+        """
+        Initializes a download through the query. See download_command for the parameters.
+
+        :return: The ticket for the data connection.
+        :rtype: FileTransferTicket
+        """
+        command = self.download_command(name, cid, cpw, seekpos)
+        return self.ticket(command, self.client.query.send(command))
+
+    def upload(
+        self,
+        file: BinaryIO,
+        name: str,
+        cid: int = 0,
+        cpw: str = "",
+        overwrite: bool = True,
+        resume: bool = False,
+        progress: ProgressCallback = None,
+    ) -> int:
+        """
+        Uploads a file object from its current position to its end.
+
+        :param file: A file object opened in binary mode.
+        :type file: BinaryIO
+        :param name: Path of the file in the channel's file repository, e.g. "/banner.png".
+        :type name: str
+        :param cid: Channel ID, defaults to 0.
+        :type cid: int, optional
+        :param cpw: Channel password, defaults to "".
+        :type cpw: str, optional
+        :param overwrite: Whether to overwrite an existing file, defaults to True.
+        :type overwrite: bool, optional
+        :param resume: Whether to continue an interrupted upload where the server stopped receiving, defaults to False.
+        :type resume: bool, optional
+        :param progress: Called with the transferred and total number of bytes after each chunk, defaults to None.
+        :type progress: Callable[[int, int], None], optional
+        :return: The number of bytes sent.
+        :rtype: int
+        """
+        start = file.tell()
+        size = file.seek(0, os.SEEK_END) - start
+        file.seek(start)
+        ticket = self.init_upload(name, size, cid, cpw, overwrite, resume)
+        return self.send(ticket, file, start, size, progress)
+
+    def download(
+        self,
+        file: BinaryIO,
+        name: str,
+        cid: int = 0,
+        cpw: str = "",
+        resume: bool = False,
+        progress: ProgressCallback = None,
+    ) -> int:
+        """
+        Downloads a file into a file object.
+
+        :param file: A file object opened in binary mode for writing.
+        :type file: BinaryIO
+        :param name: Path of the file in the channel's file repository, e.g. "/banner.png".
+        :type name: str
+        :param cid: Channel ID, defaults to 0.
+        :type cid: int, optional
+        :param cpw: Channel password, defaults to "".
+        :type cpw: str, optional
+        :param resume: Whether to append to the bytes already in file instead of starting over, defaults to False.
+        :type resume: bool, optional
+        :param progress: Called with the transferred and total number of bytes after each chunk, defaults to None.
+        :type progress: Callable[[int, int], None], optional
+        :return: The number of bytes received.
+        :rtype: int
+        """
+        seekpos = file.seek(0, os.SEEK_END) if resume else 0
+        file.seek(seekpos)
+        ticket = self.init_download(name, cid, cpw, seekpos)
+        return self.receive(ticket, file, progress)
+
+    def send(
+        self,
+        ticket: FileTransferTicket,
+        file: BinaryIO,
+        start: int,
+        size: int,
+        progress: ProgressCallback = None,
+        limiter: BandwidthLimiter = None,
+    ) -> int:
+        """
+        Streams a file over the data connection of an initialized upload.
+        The bytes the server already has (ticket.seekpos) are skipped.
+        If a limiter is given, every chunk waits for its share of the bandwidth before it is sent.
+
+        :return: The number of bytes sent.
+        :rtype: int
+        """
+        offset = start + ticket.seekpos
+        remaining = size - ticket.seekpos
+        sent = 0
+
+        with self._connect(ticket) as sock:
+            while remaining > 0:
+                count = min(self.chunk_size, remaining)
+                if limiter is not None:
+                    limiter.consume(count)
+                count = sock.sendfile(file, offset, count)
+                if count == 0:
+                    raise FileTransferError(ticket.ftkey, f"Data connection closed after {sent} bytes.")
+                offset += count
+                remaining -= count
+                sent += count
+                if progress is not None:
+                    progress(ticket.seekpos + sent, size)
+
+        return sent
+
+    def receive(
+        self,
+        ticket: FileTransferTicket,
+        file: BinaryIO,
+        progress: ProgressCallback = None,
+        limiter: BandwidthLimiter = None,
+    ) -> int:
+        """
+        Writes the data of an initialized download to a file object.
+        If a limiter is given, every chunk waits for its share of the bandwidth before it is read.
+
+        :return: The number of bytes received.
+        :rtype: int
+        """
+        remaining = ticket.size - ticket.seekpos
+        buffer = memoryview(bytearray(self.chunk_size))
+        received = 0
+
+        with self._connect(ticket) as sock:
+            while remaining > 0:
+                count = min(self.chunk_size, remaining)
+                if limiter is not None:
+                    limiter.consume(count)
+                count = sock.recv_into(buffer, count)
+                if count == 0:
+                    raise FileTransferError(ticket.ftkey, f"Data connection closed after {received} bytes.")
+                file.write(buffer[:count])
+                remaining -= count
+                received += count
+                if progress is not None:
+                    progress(ticket.seekpos + received, ticket.size)
+
+        return received
+
+    def _connect(self, ticket: FileTransferTicket) -> socket.socket:
+        host = self.client.query.host
+        if ticket.ip:
+            # The server lists the addresses to use if the query address does not reach the file transfer interface.
+            addresses = [ip for ip in ticket.ip.split(",") if ip and ip not in ("0.0.0.0", "::")]
+            host = addresses[0] if addresses else host
+
+        sock = socket.create_connection((host, ticket.port), self.timeout)
+        sock.sendall(ticket.ftkey.encode())
+        return sock
+
+    @staticmethod
+    def ticket(command: TS3QueryCommand, response: TS3QueryResponse) -> FileTransferTicket:
+        """
+        Reads the ticket from the response to an ftinitupload or ftinitdownload command.
+
+        :param command: The command that was sent.
+        :type command: TS3QueryCommand
+        :param response: The response of the server.
+        :type response: TS3QueryResponse
+        :raises TS3Error: If the server rejected the command.
+        :raises FileTransferError: If the server refused the transfer.
+        :return: The ticket for the data connection.
+        :rtype: FileTransferTicket
+        """
+        name = command.kwargs["name"]
+        data = TS3ClientResponse(response)[0]
+        if "status" in data and data["status"] != 0:
+            raise FileTransferError(name, data.get("msg", f"Status {data['status']}"))
+        if "ftkey" not in data:
+            raise FileTransferError(name, "The server did not return a file transfer key.")
+
+        return FileTransferTicket(
+            clientftfid=data.get("clientftfid"),
+            serverftfid=data.get("serverftfid"),
+            ftkey=str(data["ftkey"]),
+            port=data.get("port", DEFAULT_PORT),
+            size=data.get("size", 0),
+            seekpos=data.get("seekpos", command.kwargs.get("seekpos", 0)),
+            proto=data.get("proto"),
+            ip=str(data["ip"]) if data.get("ip") else None,
+        )
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from ..ts3client import TS3Client
+
+# Icon IDs below this are the built-in group icons that are shipped with the client and cannot be downloaded.
+MIN_ICON_ID = 1000
+
+
+class IconCache:
+    """
+    A size-bounded on-disk cache for icons and avatars.
+    Icons are stored by their icon ID and avatars by their hash (client_flag_avatar), both of which change
+    whenever the image changes, so cached files never have to be revalidated with the server.
+    Files are evicted in least recently used order once max_size is exceeded, the order survives restarts
+    through the modification times of the files. Cached files are read through memory maps.
+
+    :param client: The client to download missing files with.
+    :type client: TS3Client
+    :param directory: The directory to store the files in, defaults to "cache/icons".
+    :type directory: str, optional
+    :param max_size: The maximum combined size of all files in bytes, defaults to 32 MiB.
+    :type max_size: int, optional
+    """
+
+    def __init__(self, client: TS3Client, directory: str = "cache/icons", max_size: int = 32 * 1024 * 1024) -> None:
+        self.client = client
+        self.directory = directory
+        self.max_size = max_size
+        self.size = 0
+        self._files: OrderedDict[str, int] | None = None
+        self._lock = threading.RLock()
+
+    def get_icon(self, icon_id: int) -> Optional[mmap.mmap]:
+        """
+        Gets an icon by its ID, e.g. the value of channel_icon_id, client_icon_id or virtualserver_icon_id.
+        Older servers report icon IDs as signed integers, these are converted to their unsigned value.
+
+        :param icon_id: The icon ID.
+        :type icon_id: int
+        :raises FileTransferError: If the server does not have the icon.
+        :return: A read-only memory map of the icon, or None for no icon and built-in icons.
+        :rtype: mmap.mmap, optional
+        """
+        icon_id &= 0xFFFFFFFF
+        if icon_id < MIN_ICON_ID:
+            return None
+
+        return self._get(f"icon_{icon_id}", f"/icon_{icon_id}")
+
+    def get_avatar(self, client_base64_hash: str, avatar_hash: str) -> Optional[mmap.mmap]:
+        """
+        Gets the avatar of a client.
+
+        :param client_base64_hash: The client_base64HashClientUID of the client, which names the avatar file.
+        :type client_base64_hash: str
+        :param avatar_hash: The client_flag_avatar of the client, which identifies the current avatar.
+        :type avatar_hash: str
+        :raises FileTransferError: If the server does not have the avatar.
+        :return: A read-only memory map of the avatar, or None if the client has no avatar.
+        :rtype: mmap.mmap, optional
+        """
+        if not avatar_hash:
+            return None
+
+        return self._get(f"avatar_{avatar_hash}", f"/avatar_{client_base64_hash}")
+
+    def path(self, key: str) -> str:
+        """
+        Returns the path of a cached file, e.g. to serve it with sendfile.
+
+        :param key: The cache key, "icon_<id>" or "avatar_<hash>".
+        :type key: str
+        :return: The path of the file.
+        :rtype: str
+        """
+        return os.path.join(self.directory, key)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._index()
+
+    def clear(self) -> None:
+        """Removes all cached files."""
+        with self._lock:
+            for key in list(self._index()):
+                self._remove(key)
+
+    def _get(self, key: str, name: str) -> Optional[mmap.mmap]:
+        with self._lock:
+            if key in self._index():
+                self._files.move_to_end(key)
+                os.utime(self.path(key))
+                return self._map(key)
+
+        # Downloads run outside the lock, a concurrent miss for the same key only costs a second download.
+        os.makedirs(self.directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self.directory, prefix=".download_", delete=False) as file:
+            try:
+                self.client.file_transfer.download(file, name)
+            except BaseException:
+                file.close()
+                os.remove(file.name)
+                raise
+
+        size = os.path.getsize(file.name)
+        if size == 0:
+            os.remove(file.name)
+            return None
+
+        with self._lock:
+            if key in self._index():
+                self.size -= self._files.pop(key)
+            os.replace(file.name, self.path(key))
+            self._files[key] = size
+            self.size += size
+            self._evict(keep=key)
+            return self._map(key)
+
+    def _map(self, key: str) -> mmap.mmap:
+        with open(self.path(key), "rb") as file:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _index(self) -> OrderedDict[str, int]:
+        if self._files is None:
+            self._files = OrderedDict()
+            if os.path.isdir(self.directory):
+                entries = [entry for entry in os.scandir(self.directory) if entry.is_file()]
+                for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+                    if entry.name.startswith(".download_"):
+                        os.remove(entry.path)
+                        continue
+                    self._files[entry.name] = entry.stat().st_size
+                    self.size += entry.stat().st_size
+            self._evict()
+        return self._files
+
+    def _evict(self, keep: str = None) -> None:
+        while self.size > self.max_size and self._files:
+            key = next(iter(self._files))
+            if key == keep:
+                break
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        self.size -= self._files.pop(key)
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
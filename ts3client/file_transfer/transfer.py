@@ -0,0 +1,33 @@
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional
+
+from .file_transfer import FileTransferTicket
+
+
+class TransferDirection(Enum):
+    UPLOAD = "upload"
+    DOWNLOAD = "download"
+
+
+class TransferStatus(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+@dataclass
+class Transfer:
+    direction: TransferDirection
+    path: str
+    name: str
+    cid: int = 0
+    cpw: str = ""
+    size: int = 0
+    transferred: int = 0
+    attempts: int = 0
+    status: TransferStatus = TransferStatus.QUEUED
+    error: Optional[Exception] = None
+    ticket: Optional[FileTransferTicket] = None
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Callable, Iterator
+
+from ..errors import DATABASE_EMPTY_RESULT_SET, FileTransferError, TS3Error
+from ..ts3client_response import TS3ClientResponse
+from .bandwidth_limiter import BandwidthLimiter
+from .file_transfer import FileTransferTicket
+from .transfer import Transfer, TransferDirection, TransferStatus
+
+if TYPE_CHECKING:
+    from ..ts3client import TS3Client
+
+
+class TransferManager:
+    """
+    Runs many file transfers concurrently over the client's file transfer connection.
+    Whenever data connections are free, the ftinit* commands for the next transfers are pipelined
+    with TS3Query.send_batch, so a batch costs a single round trip instead of one per file.
+    Transfers that fail on the data connection are retried and resume where they stopped,
+    transfers that the server refuses are not.
+
+    :param client: The client to transfer files with.
+    :type client: TS3Client
+    :param max_connections: The number of data connections to run at once, defaults to 4.
+    :type max_connections: int, optional
+    :param bandwidth: The combined bandwidth of all transfers in bytes per second, defaults to None (unlimited).
+    :type bandwidth: float, optional
+    :param retries: How often an interrupted transfer is retried, defaults to 2.
+    :type retries: int, optional
+    """
+
+    def __init__(
+        self,
+        client: TS3Client,
+        max_connections: int = 4,
+        bandwidth: float = None,
+        retries: int = 2,
+    ) -> None:
+        if max_connections < 1:
+            raise ValueError("At least one connection is required.")
+
+        self.client = client
+        self.max_connections = max_connections
+        self.limiter = BandwidthLimiter(bandwidth) if bandwidth else None
+        self.retries = retries
+        self.transfers: list[Transfer] = []
+        self._running: dict[int, Transfer] = {}
+        self._lock = threading.Lock()
+
+    def add_upload(self, path: str, name: str, cid: int = 0, cpw: str = "") -> Transfer:
+        """
+        Queues the upload of a local file.
+
+        :param path: Path of the local file.
+        :type path: str
+        :param name: Path of the file in the channel's file repository, e.g. "/banner.png".
+        :type name: str
+        :param cid: Channel ID, defaults to 0.
+        :type cid: int, optional
+        :param cpw: Channel password, defaults to "".
+        :type cpw: str, optional
+        :return: The queued transfer.
+        :rtype: Transfer
+        """
+        transfer = Transfer(TransferDirection.UPLOAD, path, name, cid, cpw)
+        self.transfers.append(transfer)
+        return transfer
+
+    def add_download(self, path: str, name: str, cid: int = 0, cpw: str = "") -> Transfer:
+        """
+        Queues the download of a file to a local path.
+
+        :param path: Path of the local file to write.
+        :type path: str
+        :param name: Path of the file in the channel's file repository, e.g. "/banner.png".
+        :type name: str
+        :param cid: Channel ID, defaults to 0.
+        :type cid: int, optional
+        :param cpw: Channel password, defaults to "".
+        :type cpw: str, optional
+        :return: The queued transfer.
+        :rtype: Transfer
+        """
+        transfer = Transfer(TransferDirection.DOWNLOAD, path, name, cid, cpw)
+        self.transfers.append(transfer)
+        return transfer
+
+    def run(self, progress: Callable[[Transfer], None] = None) -> list[Transfer]:
+        """
+        Runs all queued transfers and blocks until they are done, failed or cancelled.
+        Failed transfers of a previous run are retried as well.
+
+        :param progress: Called with a transfer after each of its chunks, defaults to None.
+        :type progress: Callable[[Transfer], None], optional
+        :return: All transfers of the manager.
+        :rtype: list[Transfer]
+        """
+        queue = deque(
+            transfer for transfer in self.transfers if transfer.status in (TransferStatus.QUEUED, TransferStatus.FAILED)
+        )
+        running: dict[Future, Transfer] = {}
+
+        with ThreadPoolExecutor(self.max_connections, thread_name_prefix="TransferManager") as executor:
+            while queue or running:
+                batch = []
+                while queue and len(running) + len(batch) < self.max_connections:
+                    transfer = queue.popleft()
+                    if transfer.status is not TransferStatus.CANCELLED:
+                        batch.append(transfer)
+
+                for transfer, ticket in self._init(batch):
+                    running[executor.submit(self._transfer, transfer, ticket, progress)] = transfer
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    transfer = running.pop(future)
+                    if transfer.status is TransferStatus.FAILED and transfer.attempts <= self.retries:
+                        queue.append(transfer)
+
+        return self.transfers
+
+    def active(self) -> list[dict]:
+        """
+        Lists the transfers of this manager that the server is currently running, as reported by ftlist.
+
+        :return: The ftlist entries, including the current transfer rate of each transfer.
+        :rtype: list[dict]
+        """
+        with self._lock:
+            if not self._running:
+                return []
+            ids = set(self._running)
+
+        try:
+            response = TS3ClientResponse(self.client.query.commands.ftlist())
+        except TS3Error as e:
+            if e.id == DATABASE_EMPTY_RESULT_SET:
+                return []
+            raise
+
+        return [row for row in response if row.get("serverftfid") in ids]
+
+    def cancel(self, transfer: Transfer, delete: bool = False) -> None:
+        """
+        Cancels a queued or running transfer. Running transfers are stopped on the server with ftstop.
+
+        :param transfer: The transfer to cancel.
+        :type transfer: Transfer
+        :param delete: Whether the server should delete the partially uploaded file, defaults to False.
+        :type delete: bool, optional
+        """
+        if transfer.status in (TransferStatus.DONE, TransferStatus.CANCELLED):
+            return
+
+        with self._lock:
+            running = transfer.ticket is not None and transfer.ticket.serverftfid in self._running
+            transfer.status = TransferStatus.CANCELLED
+
+        if running:
+            self.client.query.commands.ftstop(transfer.ticket.serverftfid, delete=delete)
+
+    def cancel_all(self, delete: bool = False) -> None:
+        """
+        Cancels all queued and running transfers.
+
+        :param delete: Whether the server should delete partially uploaded files, defaults to False.
+        :type delete: bool, optional
+        """
+        for transfer in self.transfers:
+            self.cancel(transfer, delete)
+
+    @property
+    def transferred(self) -> int:
+        """The number of bytes moved by all transfers."""
+        return sum(transfer.transferred for transfer in self.transfers)
+
+    def _init(self, batch: list[Transfer]) -> Iterator[tuple[Transfer, FileTransferTicket]]:
+        file_transfer = self.client.file_transfer
+        commands = []
+        for transfer in batch:
+            transfer.attempts += 1
+            resume = transfer.attempts > 1
+            if transfer.direction is TransferDirection.UPLOAD:
+                transfer.size = os.path.getsize(transfer.path)
+                command = file_transfer.upload_command(
+                    transfer.name, transfer.size, transfer.cid, transfer.cpw, resume=resume
+                )
+            else:
+                seekpos = os.path.getsize(transfer.path) if resume and os.path.exists(transfer.path) else 0
+                command = file_transfer.download_command(transfer.name, transfer.cid, transfer.cpw, seekpos)
+            commands.append(command)
+
+        for transfer, command, response in zip(batch, commands, self.client.query.send_batch(commands)):
+            try:
+                ticket = file_transfer.ticket(command, response)
+            except (TS3Error, FileTransferError) as e:
+                # The server refused the transfer, retrying would not change its mind.
+                transfer.status = TransferStatus.FAILED
+                transfer.error = e
+                transfer.attempts = self.retries + 1
+                continue
+
+            with self._lock:
+                if transfer.status is TransferStatus.CANCELLED:
+                    continue
+                transfer.ticket = ticket
+                transfer.status = TransferStatus.RUNNING
+                self._running[ticket.serverftfid] = transfer
+
+            if transfer.direction is TransferDirection.DOWNLOAD:
+                transfer.size = ticket.size
+            yield transfer, ticket
+
+    def _transfer(
+        self,
+        transfer: Transfer,
+        ticket: FileTransferTicket,
+        progress: Callable[[Transfer], None] = None,
+    ) -> None:
+        def report(transferred: int, size: int) -> None:
+            transfer.transferred = transferred
+            if progress is not None:
+                progress(transfer)
+
+        file_transfer = self.client.file_transfer
+        try:
+            if transfer.direction is TransferDirection.UPLOAD:
+                with open(transfer.path, "rb") as file:
+                    file_transfer.send(ticket, file, 0, transfer.size, report, self.limiter)
+            else:
+                with open(transfer.path, "ab" if ticket.seekpos else "wb") as file:
+                    file_transfer.receive(ticket, file, report, self.limiter)
+            transfer.status = TransferStatus.DONE
+            transfer.error = None
+        except (OSError, FileTransferError) as e:
+            if transfer.status is not TransferStatus.CANCELLED:
+                transfer.status = TransferStatus.FAILED
+                transfer.error = e
+        finally:
+            with self._lock:
+                self._running.pop(ticket.serverftfid, None)
@@ -0,0 +1,3 @@
+from .permission import PermissionGrant
+from .permission_model import PermissionModel
+from .server_group_sync import GroupChanges, ServerGroupSync, SyncReport, load_roster
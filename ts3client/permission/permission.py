@@ -0,0 +1,8 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class PermissionGrant:
+    value: int
+    negated: bool = False
+    skip: bool = False
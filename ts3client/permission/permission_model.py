@@ -0,0 +1,503 @@
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, Callable, Hashable
+
+from ..errors import DATABASE_EMPTY_RESULT_SET, TS3Error
+from ..event import (
+    ChannelCreatedEvent,
+    ClientEnterViewEvent,
+    ClientLeftViewEvent,
+    ClientMovedEvent,
+)
+from ..ts3client_response import TS3ClientResponse
+from ..ts3query.ts3query_command import TS3QueryCommand
+from .permission import PermissionGrant
+
+if TYPE_CHECKING:
+    from ..ts3client import TS3Client
+    from ..ts3query.ts3query_response import TS3QueryResponse
+
+# Lists that are loaded per key, and the command that lists them: the grants of a key, or for "channel_group_member"
+# the channel group of a client in a channel.
+GRANT_COMMANDS: dict[str, Callable[[Hashable], TS3QueryCommand]] = {
+    "server_group": lambda sgid: TS3QueryCommand(
+        "servergrouppermlist", args=(("permsid", True),), kwargs={"sgid": sgid}
+    ),
+    "channel_group": lambda cgid: TS3QueryCommand(
+        "channelgrouppermlist", args=(("permsid", True),), kwargs={"cgid": cgid}
+    ),
+    "channel": lambda cid: TS3QueryCommand("channelpermlist", args=(("permsid", True),), kwargs={"cid": cid}),
+    "client": lambda cldbid: TS3QueryCommand("clientpermlist", args=(("permsid", True),), kwargs={"cldbid": cldbid}),
+    "channel_client": lambda key: TS3QueryCommand(
+        "channelclientpermlist", args=(("permsid", True),), kwargs={"cid": key[0], "cldbid": key[1]}
+    ),
+    "channel_group_member": lambda key: TS3QueryCommand(
+        "channelgroupclientlist", kwargs={"cid": key[0], "cldbid": key[1]}
+    ),
+}
+
+
+def parse_ids(value: int | str | None) -> set[int]:
+    """Parses a comma separated list of IDs, e.g. client_servergroups, which is parsed as int if it has one item."""
+    if value is None or value == "":
+        return set()
+    if isinstance(value, int):
+        return {value}
+    return {int(id) for id in str(value).split(",") if id}
+
+
+class PermissionModel:
+    """
+    A local copy of the permission system of a virtual server that computes effective
+    permissions without querying the server.
+    load() fetches the group, channel and client permissions of everything that is online in one pipelined batch.
+    Clients that enter or move later and channels that are created later are queued by the response hook and
+    fetched in one batch by prefetch(), so checking a permission does not query the server. Anything else, such as
+    the permissions of an offline client, is loaded on first use.
+    Responses to commands that change permissions or memberships invalidate or update
+    only the affected entries, so the model has to be registered as a response hook.
+
+    Effective permissions are computed like the server does:
+
+    - Server groups: the highest value wins, unless a grant is negated, then the lowest negated value wins.
+    - Client permissions override server groups.
+    - Channel permissions and channel group permissions override both, unless a server group
+      or client grant has the skip flag set.
+    - Channel client permissions override everything.
+
+    :param client: The client used to load permissions.
+    :type client: TS3Client
+    """
+
+    def __init__(self, client: TS3Client) -> None:
+        self.client = client
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._permission_names: dict[int, str] = {}
+        self._default_channel_group: int | None = None
+        self._server_group_grants: dict[int, dict[str, PermissionGrant]] = {}
+        self._channel_group_grants: dict[int, dict[str, PermissionGrant]] = {}
+        self._channel_grants: dict[int, dict[str, PermissionGrant]] = {}
+        self._client_grants: dict[int, dict[str, PermissionGrant]] = {}
+        self._channel_client_grants: dict[tuple[int, int], dict[str, PermissionGrant]] = {}
+        self._server_groups: dict[int, set[int]] = {}
+        self._channel_groups: dict[tuple[int, int], int] = {}
+        self._clients: dict[int, tuple[int, int]] = {}
+        self._stores: dict[str, dict] = {
+            "server_group": self._server_group_grants,
+            "channel_group": self._channel_group_grants,
+            "channel": self._channel_grants,
+            "client": self._client_grants,
+            "channel_client": self._channel_client_grants,
+            "channel_group_member": self._channel_groups,
+        }
+        self._pending: set[tuple[str, Hashable]] = set()
+
+    def load(self) -> None:
+        """
+        Loads the permission names, the permissions of all server groups, channel groups and channels, and the
+        permissions and memberships of all online clients. The grant lists are fetched in a single pipelined batch.
+        """
+        commands = self.client.query.commands
+        names = {row["permid"]: row["permname"] for row in self._request(commands.permissionlist) if "permid" in row}
+        server_info = self._request(commands.serverinfo)
+        default_channel_group = server_info[0].get("virtualserver_default_channel_group") if server_info else None
+
+        entries = [("server_group", row["sgid"]) for row in self._request(commands.servergrouplist) if "sgid" in row]
+        entries += [("channel_group", row["cgid"]) for row in self._request(commands.channelgrouplist) if "cgid" in row]
+        entries += [("channel", row["cid"]) for row in self._request(commands.channellist) if "cid" in row]
+        for row in self._request(lambda: commands.clientlist(groups=True)):
+            # Query clients have no permissions worth prefetching.
+            if "client_database_id" not in row or row.get("client_type") == 1:
+                continue
+            self._track_client(
+                row.get("clid"),
+                row["client_database_id"],
+                row.get("cid"),
+                row.get("client_servergroups"),
+                row.get("client_channel_group_id"),
+            )
+            entries.append(("client", row["client_database_id"]))
+            entries.append(("channel_client", (row.get("cid"), row["client_database_id"])))
+
+        with self._lock:
+            self._permission_names = names
+            self._default_channel_group = default_channel_group
+        self._fetch(entries)
+        with self._lock:
+            self.loaded = True
+
+    def prefetch(self) -> int:
+        """
+        Fetches the grants of the clients that entered or moved and the channels that were created since the last
+        call in a single pipelined batch. Meant to be called before permissions are checked, e.g. on every poll.
+
+        :return: The number of grant lists that were fetched.
+        :rtype: int
+        """
+        with self._lock:
+            entries = [(kind, key) for kind, key in self._pending if key not in self._stores[kind]]
+            self._pending.clear()
+        return self._fetch(entries)
+
+    def clear(self) -> None:
+        """Drops all loaded permissions and memberships."""
+        with self._lock:
+            self._generation += 1
+            self.loaded = False
+            self._pending.clear()
+            for store in (
+                self._server_group_grants,
+                self._channel_group_grants,
+                self._channel_grants,
+                self._client_grants,
+                self._channel_client_grants,
+                self._server_groups,
+                self._channel_groups,
+                self._clients,
+            ):
+                store.clear()
+
+    def get_permission(
+        self,
+        permission: str | int,
+        cldbid: int,
+        cid: int | None = None,
+        server_groups: set[int] | None = None,
+        channel_group: int | None = None,
+    ) -> int | None:
+        """
+        Computes the effective value of a permission for a client in a channel.
+
+        :param permission: The name or ID of the permission, e.g. "b_client_kick_from_server".
+        :type permission: str | int
+        :param cldbid: The database ID of the client.
+        :type cldbid: int
+        :param cid: The ID of the channel, defaults to None to only consider server wide permissions.
+        :type cid: int, optional
+        :param server_groups: The server groups of the client, defaults to None to look them up.
+        :type server_groups: set[int], optional
+        :param channel_group: The channel group of the client in the channel, defaults to None to look it up.
+        :type channel_group: int, optional
+        :return: The effective value or None if the permission is not granted at all.
+        :rtype: int | None
+        """
+        name = self._permission_name(permission)
+        if server_groups is None:
+            server_groups = self._client_server_groups(cldbid)
+
+        grants = [self._server_group(sgid).get(name) for sgid in server_groups]
+        grants = [grant for grant in grants if grant is not None]
+        negated = [grant for grant in grants if grant.negated]
+        value = None
+        if negated:
+            value = min(grant.value for grant in negated)
+        elif grants:
+            value = max(grant.value for grant in grants)
+        skip = any(grant.skip for grant in grants)
+
+        client_grant = self._client(cldbid).get(name)
+        if client_grant is not None:
+            value = client_grant.value
+            skip = skip or client_grant.skip
+
+        if cid is None:
+            return value
+
+        if not skip:
+            channel_grant = self._channel(cid).get(name)
+            if channel_grant is not None:
+                value = channel_grant.value
+
+            if channel_group is None:
+                channel_group = self._client_channel_group(cid, cldbid)
+            channel_group_grant = self._channel_group(channel_group).get(name) if channel_group else None
+            if channel_group_grant is not None:
+                value = channel_group_grant.value
+
+        channel_client_grant = self._channel_client(cid, cldbid).get(name)
+        if channel_client_grant is not None:
+            value = channel_client_grant.value
+
+        return value
+
+    def get_client_permission(self, clid: int, permission: str | int) -> int | None:
+        """
+        Computes the effective value of a permission for a connected client in its current channel.
+
+        :param clid: The ID of the client.
+        :type clid: int
+        :param permission: The name or ID of the permission.
+        :type permission: str | int
+        :return: The effective value or None if the permission is not granted at all.
+        :rtype: int | None
+        """
+        context = self._client_context(clid)
+        if context is None:
+            return None
+        cldbid, cid = context
+        return self.get_permission(permission, cldbid, cid)
+
+    def has_permission(self, clid: int, permission: str | int, required: int = 1) -> bool:
+        """
+        Checks whether a connected client has a permission with at least the required value.
+
+        :param clid: The ID of the client.
+        :type clid: int
+        :param permission: The name or ID of the permission.
+        :type permission: str | int
+        :param required: The minimum value, defaults to 1 which works for boolean permissions.
+        :type required: int, optional
+        :return: Whether the client has the permission.
+        :rtype: bool
+        """
+        value = self.get_client_permission(clid, permission)
+        return value is not None and value >= required
+
+    def feed(self, command: TS3QueryCommand, response: TS3QueryResponse) -> None:
+        """
+        Invalidates or updates the entries affected by a command and tracks clients from events.
+        Meant to be registered as a response hook.
+
+        :param command: The command that was sent.
+        :type command: TS3QueryCommand
+        :param response: The response from the server.
+        :type response: TS3QueryResponse
+        """
+        for event in response.events:
+            if isinstance(event, ClientEnterViewEvent):
+                self._track_client(
+                    event.clid,
+                    event.client_database_id,
+                    event.ctid,
+                    event.client_servergroups,
+                    event.client_channel_group_id,
+                )
+                if event.client_database_id is not None and event.client_type != 1:
+                    with self._lock:
+                        self._pending.add(("client", event.client_database_id))
+                        self._pending.add(("channel_client", (event.ctid, event.client_database_id)))
+            elif isinstance(event, ClientMovedEvent):
+                with self._lock:
+                    if event.clid in self._clients:
+                        cldbid = self._clients[event.clid][0]
+                        self._clients[event.clid] = (cldbid, event.ctid)
+                        self._pending.add(("channel_client", (event.ctid, cldbid)))
+                        # The event does not carry the channel group of the client in the new channel.
+                        self._pending.add(("channel_group_member", (event.ctid, cldbid)))
+            elif isinstance(event, ChannelCreatedEvent):
+                with self._lock:
+                    self._pending.add(("channel", event.cid))
+            elif isinstance(event, ClientLeftViewEvent):
+                with self._lock:
+                    self._clients.pop(event.clid, None)
+
+        if response.error_id != 0:
+            return
+
+        kwargs = command.kwargs
+        with self._lock:
+            match command.command:
+                case "use" | "login" | "logout" | "permreset" | "serversnapshotdeploy":
+                    self.clear()
+                case "servergroupautoaddperm" | "servergroupautodelperm":
+                    self._invalidate(self._server_group_grants)
+                case "servergroupaddperm" | "servergroupdelperm":
+                    self._invalidate(self._server_group_grants, kwargs.get("sgid"))
+                case "servergroupdel":
+                    self._invalidate(self._server_group_grants, kwargs.get("sgid"))
+                    for groups in self._server_groups.values():
+                        groups.discard(kwargs.get("sgid"))
+                case "servergroupaddclient":
+                    for cldbid in self._ids(kwargs.get("cldbid")):
+                        if cldbid in self._server_groups:
+                            self._server_groups[cldbid].add(kwargs.get("sgid"))
+                case "servergroupdelclient":
+                    for cldbid in self._ids(kwargs.get("cldbid")):
+                        if cldbid in self._server_groups:
+                            self._server_groups[cldbid].discard(kwargs.get("sgid"))
+                case "channelgroupaddperm" | "channelgroupdelperm" | "channelgroupdel":
+                    self._invalidate(self._channel_group_grants, kwargs.get("cgid"))
+                case "setclientchannelgroup":
+                    self._channel_groups[(kwargs.get("cid"), kwargs.get("cldbid"))] = kwargs.get("cgid")
+                case "channeladdperm" | "channeldelperm":
+                    self._invalidate(self._channel_grants, kwargs.get("cid"))
+                    self._pending.add(("channel", kwargs.get("cid")))
+                case "channeldelete":
+                    self._invalidate(self._channel_grants, kwargs.get("cid"))
+                case "clientaddperm" | "clientdelperm":
+                    self._invalidate(self._client_grants, kwargs.get("cldbid"))
+                    self._pending.add(("client", kwargs.get("cldbid")))
+                case "channelclientaddperm" | "channelclientdelperm":
+                    key = (kwargs.get("cid"), kwargs.get("cldbid"))
+                    self._invalidate(self._channel_client_grants, key)
+                    self._pending.add(("channel_client", key))
+                case "clientinfo":
+                    for row in response.data.values():
+                        self._track_client(
+                            kwargs.get("clid"),
+                            row.get("client_database_id"),
+                            row.get("cid"),
+                            row.get("client_servergroups"),
+                            row.get("client_channel_group_id"),
+                        )
+                case "clientlist":
+                    for row in response.data.values():
+                        self._track_client(
+                            row.get("clid"),
+                            row.get("client_database_id"),
+                            row.get("cid"),
+                            row.get("client_servergroups"),
+                            row.get("client_channel_group_id"),
+                        )
+
+    def _track_client(
+        self,
+        clid: int | None,
+        cldbid: int | None,
+        cid: int | None,
+        server_groups: int | str | None,
+        channel_group: int | None,
+    ) -> None:
+        if clid is None or cldbid is None:
+            return
+
+        with self._lock:
+            self._clients[clid] = (cldbid, cid)
+            if server_groups is not None:
+                self._server_groups[cldbid] = parse_ids(server_groups)
+            if channel_group is not None and cid is not None:
+                self._channel_groups[(cid, cldbid)] = channel_group
+
+    def _invalidate(self, store: dict, key: Hashable = None) -> None:
+        self._generation += 1
+        if key is None:
+            store.clear()
+        else:
+            store.pop(key, None)
+
+    def _permission_name(self, permission: str | int) -> str:
+        if isinstance(permission, str):
+            return permission
+        if not self._permission_names:
+            rows = self._request(self.client.query.commands.permissionlist)
+            with self._lock:
+                self._permission_names = {row["permid"]: row["permname"] for row in rows if "permid" in row}
+        return self._permission_names.get(permission, str(permission))
+
+    def _client_context(self, clid: int) -> tuple[int, int] | None:
+        with self._lock:
+            context = self._clients.get(clid)
+        if context is None:
+            # The clientinfo response is fed back into this model by its response hook.
+            self._request(lambda: self.client.query.commands.clientinfo(clid=clid))
+            with self._lock:
+                context = self._clients.get(clid)
+        return context
+
+    def _client_server_groups(self, cldbid: int) -> set[int]:
+        return self._cached(
+            self._server_groups,
+            cldbid,
+            lambda: self.client.query.commands.servergroupsbyclientid(cldbid=cldbid),
+            lambda rows: {row["sgid"] for row in rows if "sgid" in row},
+        )
+
+    def _client_channel_group(self, cid: int, cldbid: int) -> int | None:
+        key = (cid, cldbid)
+        return self._cached(
+            self._channel_groups,
+            key,
+            lambda: self.client.query.send(GRANT_COMMANDS["channel_group_member"](key)),
+            self._channel_group_of,
+        )
+
+    def _server_group(self, sgid: int) -> dict[str, PermissionGrant]:
+        return self._cached_grants("server_group", sgid)
+
+    def _channel_group(self, cgid: int) -> dict[str, PermissionGrant]:
+        return self._cached_grants("channel_group", cgid)
+
+    def _channel(self, cid: int) -> dict[str, PermissionGrant]:
+        return self._cached_grants("channel", cid)
+
+    def _client(self, cldbid: int) -> dict[str, PermissionGrant]:
+        return self._cached_grants("client", cldbid)
+
+    def _channel_client(self, cid: int, cldbid: int) -> dict[str, PermissionGrant]:
+        return self._cached_grants("channel_client", (cid, cldbid))
+
+    def _cached_grants(self, kind: str, key: Hashable) -> dict[str, PermissionGrant]:
+        return self._cached(
+            self._stores[kind], key, lambda: self.client.query.send(GRANT_COMMANDS[kind](key)), self._grants
+        )
+
+    def _fetch(self, entries: list[tuple[str, Hashable]]) -> int:
+        if not entries:
+            return 0
+        with self._lock:
+            generation = self._generation
+
+        responses = self.client.query.send_batch([GRANT_COMMANDS[kind](key) for kind, key in entries])
+        values = [self._parse(kind, self._rows(response)) for (kind, _), response in zip(entries, responses)]
+
+        with self._lock:
+            if generation != self._generation:
+                # Something was invalidated meanwhile, so these lists might be outdated. Fetch them again later.
+                self._pending.update(entries)
+                return 0
+            for (kind, key), value in zip(entries, values):
+                self._stores[kind][key] = value
+        return len(entries)
+
+    def _cached(self, store: dict, key: Hashable, request: Callable, parse: Callable[[list[dict]], object]):
+        with self._lock:
+            if key in store:
+                return store[key]
+            generation = self._generation
+
+        value = parse(self._request(request))
+
+        with self._lock:
+            # Entries loaded while an invalidation came in might already be outdated.
+            if generation == self._generation:
+                store[key] = value
+        return value
+
+    def _request(self, request: Callable) -> list[dict]:
+        return self._rows(request())
+
+    @staticmethod
+    def _rows(response: TS3QueryResponse) -> list[dict]:
+        try:
+            return list(TS3ClientResponse(response))
+        except TS3Error as e:
+            if e.id == DATABASE_EMPTY_RESULT_SET:
+                return []
+            raise
+
+    def _parse(self, kind: str, rows: list[dict]):
+        return self._channel_group_of(rows) if kind == "channel_group_member" else self._grants(rows)
+
+    def _channel_group_of(self, rows: list[dict]) -> int | None:
+        # Clients without an explicit channel group are in the default one, which is cached as well.
+        groups = [row["cgid"] for row in rows if "cgid" in row]
+        return groups[0] if groups else self._default_channel_group
+
+    @staticmethod
+    def _ids(value: int | list[int] | None) -> list[int]:
+        return list(value) if isinstance(value, (list, tuple)) else [value]
+
+    @staticmethod
+    def _grants(rows: list[dict]) -> dict[str, PermissionGrant]:
+        return {
+            row["permsid"]: PermissionGrant(
+                row.get("permvalue", 0),
+                bool(row.get("permnegated", 0)),
+                bool(row.get("permskip", 0)),
+            )
+            for row in rows
+            if "permsid" in row
+        }
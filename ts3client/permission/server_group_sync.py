@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import csv
+import json
+import sqlite3
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Iterable
+
+from ..errors import DATABASE_EMPTY_RESULT_SET, TS3Error
+from ..ts3client_response import TS3ClientResponse
+from ..ts3query.ts3query_command import TS3QueryCommand
+
+if TYPE_CHECKING:
+    from ..ts3client import TS3Client
+    from ..ts3query.ts3query_response import TS3QueryResponse
+
+
+@dataclass
+class GroupChanges:
+    sgid: int
+    added: list[int] = field(default_factory=list)
+    removed: list[int] = field(default_factory=list)
+    error: TS3Error | None = None
+
+
+@dataclass
+class SyncReport:
+    groups: dict[int, GroupChanges] = field(default_factory=dict)
+
+    @property
+    def added(self) -> int:
+        return sum(len(changes.added) for changes in self.groups.values())
+
+    @property
+    def removed(self) -> int:
+        return sum(len(changes.removed) for changes in self.groups.values())
+
+    @property
+    def errors(self) -> dict[int, TS3Error]:
+        return {sgid: changes.error for sgid, changes in self.groups.items() if changes.error is not None}
+
+    @property
+    def empty(self) -> bool:
+        return not self.added and not self.removed
+
+
+def load_roster(path: str, table: str = "roster") -> dict[int | str, set[int]]:
+    """
+    Loads the desired server group members from a file.
+    JSON files map server group IDs or names to lists of client database IDs. CSV files and SQLite databases
+    (.db, .sqlite) have a row per membership with an sgid (or group) and a cldbid column.
+
+    :param path: The path of the file.
+    :type path: str
+    :param table: The table to read from SQLite databases, defaults to "roster".
+    :type table: str, optional
+    :return: The client database IDs per server group ID or name.
+    :rtype: dict[int | str, set[int]]
+    """
+    if path.endswith(".json"):
+        with open(path) as file:
+            return {_group_key(group): set(map(int, members)) for group, members in json.load(file).items()}
+
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        connection = sqlite3.connect(path)
+        connection.row_factory = sqlite3.Row
+        try:
+            rows = [dict(row) for row in connection.execute(f'SELECT * FROM "{table}"')]
+        finally:
+            connection.close()
+    else:
+        with open(path, newline="") as file:
+            rows = list(csv.DictReader(file))
+
+    roster: dict[int | str, set[int]] = {}
+    for row in rows:
+        group = row["sgid"] if "sgid" in row else row["group"]
+        roster.setdefault(_group_key(group), set()).add(int(row["cldbid"]))
+    return roster
+
+
+def _group_key(group: int | str) -> int | str:
+    return int(group) if str(group).isdigit() else group
+
+
+class ServerGroupSync:
+    """
+    Keeps server group memberships in line with an external roster.
+    The members of all managed groups are read with one pipelined batch of servergroupclientlist commands, the
+    differences are computed in memory and applied with servergroupaddclient and servergroupdelclient commands that
+    each carry up to chunk_size clients (cldbid=1|cldbid=2|...), again pipelined.
+
+    :param client: The client to sync the server groups with.
+    :type client: TS3Client
+    :param chunk_size: The maximum number of clients per command, defaults to 500.
+    :type chunk_size: int, optional
+    """
+
+    def __init__(self, client: TS3Client, chunk_size: int = 500) -> None:
+        if chunk_size < 1:
+            raise ValueError("Chunks must hold at least one client.")
+
+        self.client = client
+        self.chunk_size = chunk_size
+
+    def members(self, sgids: Iterable[int]) -> dict[int, set[int]]:
+        """
+        Reads the client database IDs of the members of server groups.
+
+        :param sgids: The server group IDs.
+        :type sgids: Iterable[int]
+        :raises TS3Error: If a group does not exist.
+        :return: The members per server group ID.
+        :rtype: dict[int, set[int]]
+        """
+        sgids = list(sgids)
+        commands = [TS3QueryCommand("servergroupclientlist", kwargs={"sgid": sgid}) for sgid in sgids]
+        responses = self.client.query.send_batch(commands) if commands else []
+        return {sgid: self._member_ids(response) for sgid, response in zip(sgids, responses)}
+
+    def plan(self, roster: dict[int | str, Iterable[int]], remove: bool = True) -> SyncReport:
+        """
+        Computes the changes that bring the server groups in the roster in line with it.
+        Groups that are not part of the roster are left alone.
+
+        :param roster: The desired client database IDs per server group ID or name.
+        :type roster: dict[int | str, Iterable[int]]
+        :param remove: Whether to remove members that are not in the roster, defaults to True.
+        :type remove: bool, optional
+        :raises KeyError: If a server group name does not exist.
+        :return: The clients to add and remove per server group.
+        :rtype: SyncReport
+        """
+        desired = self._resolve(roster)
+        current = self.members(desired)
+
+        report = SyncReport()
+        for sgid, members in desired.items():
+            added = sorted(members - current[sgid])
+            removed = sorted(current[sgid] - members) if remove else []
+            if added or removed:
+                report.groups[sgid] = GroupChanges(sgid, added, removed)
+        return report
+
+    def sync(self, roster: dict[int | str, Iterable[int]], remove: bool = True, dry_run: bool = False) -> SyncReport:
+        """
+        Brings the server groups in the roster in line with it.
+        A command that fails does not stop the others, its error is recorded for the group in the report.
+
+        :param roster: The desired client database IDs per server group ID or name.
+        :type roster: dict[int | str, Iterable[int]]
+        :param remove: Whether to remove members that are not in the roster, defaults to True.
+        :type remove: bool, optional
+        :param dry_run: Whether to only compute the changes without applying them, defaults to False.
+        :type dry_run: bool, optional
+        :return: The clients added and removed per server group.
+        :rtype: SyncReport
+        """
+        report = self.plan(roster, remove)
+        if dry_run or report.empty:
+            return report
+
+        commands = []
+        for changes in report.groups.values():
+            for name, cldbids in (("servergroupaddclient", changes.added), ("servergroupdelclient", changes.removed)):
+                for i in range(0, len(cldbids), self.chunk_size):
+                    chunk = cldbids[i : i + self.chunk_size]
+                    commands.append(TS3QueryCommand(name, kwargs={"sgid": changes.sgid, "cldbid": chunk}))
+
+        for command, response in zip(commands, self.client.query.send_batch(commands)):
+            if response.error_id != 0 and report.groups[command.kwargs["sgid"]].error is None:
+                report.groups[command.kwargs["sgid"]].error = TS3Error(response.error_id, response.msg)
+        return report
+
+    def _resolve(self, roster: dict[int | str, Iterable[int]]) -> dict[int, set[int]]:
+        names = {}
+        if any(isinstance(group, str) for group in roster):
+            names = {
+                row["name"]: row["sgid"] for row in TS3ClientResponse(self.client.query.commands.servergrouplist())
+            }
+
+        desired: dict[int, set[int]] = {}
+        for group, members in roster.items():
+            if isinstance(group, str) and group not in names:
+                raise KeyError(f"Server group '{group}' does not exist.")
+            desired.setdefault(names.get(group, group), set()).update(members)
+        return desired
+
+    @staticmethod
+    def _member_ids(response: TS3QueryResponse) -> set[int]:
+        if response.error_id == DATABASE_EMPTY_RESULT_SET:
+            return set()
+        return {row["cldbid"] for row in TS3ClientResponse(response) if "cldbid" in row}
@@ -0,0 +1,3 @@
+from .log_archive import ArchivedLogEntry, LogArchive, classify_log_entry
+from .log_entry import LogEntry, parse_log_line
+from .log_tailer import LogTailer
@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from ..utils import patterns
+from .log_entry import LogEntry
+from .log_tailer import LogTailer
+
+if TYPE_CHECKING:
+    from ..ts3client import TS3Client
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    position INTEGER,
+    timestamp TEXT,
+    level TEXT,
+    channel TEXT,
+    server_id INTEGER,
+    kind TEXT NOT NULL,
+    client_id INTEGER,
+    client_name TEXT,
+    invoker_id INTEGER,
+    invoker_uid TEXT,
+    message TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS entries_source_position ON entries (source, position, timestamp);
+-- NULLs are distinct in a unique index, entries without a position are unique by their timestamp and message.
+DELETE FROM entries WHERE position IS NULL AND id NOT IN (
+    SELECT MIN(id) FROM entries WHERE position IS NULL GROUP BY source, IFNULL(timestamp, ''), message
+);
+CREATE UNIQUE INDEX IF NOT EXISTS entries_source_message ON entries (source, IFNULL(timestamp, ''), message)
+    WHERE position IS NULL;
+CREATE INDEX IF NOT EXISTS entries_timestamp ON entries (timestamp);
+CREATE INDEX IF NOT EXISTS entries_kind ON entries (kind, timestamp);
+CREATE INDEX IF NOT EXISTS entries_client_id ON entries (client_id, timestamp);
+CREATE INDEX IF NOT EXISTS entries_client_name ON entries (client_name COLLATE NOCASE, timestamp);
+CREATE INDEX IF NOT EXISTS entries_invoker_uid ON entries (invoker_uid, timestamp);
+CREATE TABLE IF NOT EXISTS cursors (
+    source TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+"""
+
+COLUMNS = (
+    "source",
+    "position",
+    "timestamp",
+    "level",
+    "channel",
+    "server_id",
+    "kind",
+    "client_id",
+    "client_name",
+    "invoker_id",
+    "invoker_uid",
+    "message",
+)
+
+
+@dataclass
+class ArchivedLogEntry(LogEntry):
+    source: str = ""
+    kind: str = "other"
+    client_id: Optional[int] = None
+    client_name: Optional[str] = None
+    invoker_id: Optional[int] = None
+    invoker_uid: Optional[str] = None
+
+
+def classify_log_entry(entry: LogEntry) -> dict:
+    """
+    Determines the kind of a log entry and the clients it refers to.
+    Client IDs in the server log are database IDs.
+
+    :param entry: The log entry.
+    :type entry: LogEntry
+    :return: The kind, client_id, client_name, invoker_id and invoker_uid of the entry, if present.
+    :rtype: dict
+    """
+    for kind, pattern in patterns.LOG_KINDS.items():
+        match = pattern.match(entry.message)
+        if match is None:
+            continue
+
+        values = {key: value for key, value in match.groupdict().items() if value is not None}
+        if kind == "disconnect" and "invoker_uid" in values:
+            kind = "kick"
+        for key in ("client_id", "invoker_id"):
+            if key in values:
+                values[key] = int(values[key])
+        return {"kind": kind, **values}
+
+    return {"kind": "other"}
+
+
+class LogArchive:
+    """
+    A local archive of the server log in SQLite, indexed by time, kind, client and invoker.
+    Entries are classified when they are ingested (connect, disconnect, kick, ban, servergroup, channel, permission
+    or other), so questions like "who kicked X last week" are answered from the indexes instead of paging through
+    logview.
+    sync() ingests the lines written since the last sync, the position is stored per source in the archive itself.
+
+    :param path: The path of the database file, defaults to "logs/server_log.sqlite".
+    :type path: str, optional
+    """
+
+    def __init__(self, path: str = "logs/server_log.sqlite") -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Closes the database."""
+        with self._lock:
+            self._connection.close()
+
+    def ingest(self, entries: Iterable[LogEntry], source: str = "virtualserver") -> int:
+        """
+        Adds log entries to the archive. Entries that are already archived at the same position are skipped, and so
+        are entries without a position whose message is already archived with the same timestamp.
+
+        :param entries: The entries to add.
+        :type entries: Iterable[LogEntry]
+        :param source: The log the entries were read from, defaults to "virtualserver".
+        :type source: str, optional
+        :return: The number of entries added.
+        :rtype: int
+        """
+        rows = [self._row(entry, source) for entry in entries]
+        with self._lock, self._connection:
+            before = self._connection.total_changes
+            self._connection.executemany(
+                f"INSERT OR IGNORE INTO entries ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                rows,
+            )
+            return self._connection.total_changes - before
+
+    def sync(self, client: TS3Client, instance: bool = False) -> int:
+        """
+        Ingests the lines written to the server log since the last sync.
+        The first sync reads the whole log.
+
+        :param client: The client to read the log with.
+        :type client: TS3Client
+        :param instance: Whether to sync the instance log instead of the virtual server log, defaults to False.
+        :type instance: bool, optional
+        :return: The number of entries added.
+        :rtype: int
+        """
+        source = "instance" if instance else "virtualserver"
+        tailer = LogTailer(client, instance=instance, position=self.position(source))
+        added = self.ingest(tailer.poll(), source)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO cursors (source, position) VALUES (?, ?)", (source, tailer.position)
+            )
+        return added
+
+    def position(self, source: str = "virtualserver") -> int:
+        """
+        Returns the log file position the archive has been synced up to.
+
+        :param source: The log, defaults to "virtualserver".
+        :type source: str, optional
+        :return: The position, 0 if the log was never synced.
+        :rtype: int
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT position FROM cursors WHERE source = ?", (source,)).fetchone()
+        return row["position"] if row else 0
+
+    def query(
+        self,
+        since: datetime = None,
+        until: datetime = None,
+        kind: str = None,
+        client_id: int = None,
+        client_name: str = None,
+        invoker_uid: str = None,
+        text: str = None,
+        limit: int = 100,
+    ) -> list[ArchivedLogEntry]:
+        """
+        Finds archived entries, newest first.
+
+        :param since: Only entries at or after this time, defaults to None.
+        :type since: datetime, optional
+        :param until: Only entries before this time, defaults to None.
+        :type until: datetime, optional
+        :param kind: Only entries of this kind, e.g. "kick", defaults to None.
+        :type kind: str, optional
+        :param client_id: Only entries about the client with this database ID, defaults to None.
+        :type client_id: int, optional
+        :param client_name: Only entries about the client with this nickname (case insensitive), defaults to None.
+        :type client_name: str, optional
+        :param invoker_uid: Only entries caused by the client with this unique ID, defaults to None.
+        :type invoker_uid: str, optional
+        :param text: Only entries whose message contains this text, defaults to None.
+        :type text: str, optional
+        :param limit: The maximum number of entries, defaults to 100.
+        :type limit: int, optional
+        :return: The matching entries.
+        :rtype: list[ArchivedLogEntry]
+        """
+        conditions, parameters = [], []
+        for condition, value in (
+            ("timestamp >= ?", since.isoformat(" ", "microseconds") if since else None),
+            ("timestamp < ?", until.isoformat(" ", "microseconds") if until else None),
+            ("kind = ?", kind),
+            ("client_id = ?", client_id),
+            ("client_name = ? COLLATE NOCASE", client_name),
+            ("invoker_uid = ?", invoker_uid),
+            ("instr(message, ?) > 0", text),
+        ):
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(value)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT * FROM entries {where} ORDER BY timestamp DESC, id DESC LIMIT ?", (*parameters, limit)
+            ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def count(self) -> int:
+        """
+        Returns the number of archived entries.
+
+        :return: The number of entries.
+        :rtype: int
+        """
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def compact(self, before: datetime, kinds: Iterable[str] = None) -> int:
+        """
+        Removes old entries and reclaims their space.
+
+        :param before: Remove entries older than this time.
+        :type before: datetime
+        :param kinds: Only remove entries of these kinds, defaults to None (all kinds).
+        :type kinds: Iterable[str], optional
+        :return: The number of entries removed.
+        :rtype: int
+        """
+        query, parameters = "DELETE FROM entries WHERE timestamp < ?", [before.isoformat(" ", "microseconds")]
+        if kinds is not None:
+            kinds = list(kinds)
+            query += f" AND kind IN ({', '.join('?' * len(kinds))})"
+            parameters += kinds
+
+        with self._lock:
+            with self._connection:
+                removed = self._connection.execute(query, parameters).rowcount
+            self._connection.execute("VACUUM")
+            self._connection.execute("PRAGMA optimize")
+        return removed
+
+    @staticmethod
+    def _row(entry: LogEntry, source: str) -> tuple:
+        values = {
+            "source": source,
+            "position": entry.position,
+            "timestamp": entry.timestamp.isoformat(" ", "microseconds") if entry.timestamp else None,
+            "level": entry.level,
+            "channel": entry.channel,
+            "server_id": entry.server_id,
+            "message": entry.message,
+            **classify_log_entry(entry),
+        }
+        return tuple(values.get(column) for column in COLUMNS)
+
+    @staticmethod
+    def _entry(row: sqlite3.Row) -> ArchivedLogEntry:
+        values = {column: row[column] for column in COLUMNS}
+        values["timestamp"] = datetime.fromisoformat(row["timestamp"]) if row["timestamp"] else None
+        return ArchivedLogEntry(**values)
@@ -0,0 +1,42 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from ..utils import patterns
+
+
+@dataclass
+class LogEntry:
+    timestamp: Optional[datetime]
+    level: str
+    channel: str
+    server_id: Optional[int]
+    message: str
+    position: Optional[int] = None
+
+
+def parse_log_line(line: str, position: int = None) -> LogEntry:
+    """
+    Parses a line of the server log, e.g.
+    "2024-01-15 12:34:56.123456|INFO    |VirtualServerBase|1  |client connected 'Foo'(id:5)".
+    Lines that do not follow this format are returned with their full text as the message.
+
+    :param line: The log line.
+    :type line: str
+    :param position: The byte offset of the line in the log file, defaults to None.
+    :type position: int, optional
+    :return: The parsed entry.
+    :rtype: LogEntry
+    """
+    match = patterns.LOG_LINE.fullmatch(line)
+    if match is None:
+        return LogEntry(None, "", "", None, line, position)
+
+    return LogEntry(
+        timestamp=datetime.fromisoformat(match.group("timestamp")),
+        level=match.group("level"),
+        channel=match.group("channel"),
+        server_id=int(match.group("sid")) if match.group("sid") else None,
+        message=match.group("message"),
+        position=position,
+    )
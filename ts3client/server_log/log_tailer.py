@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, Iterator
+
+from ..ts3client_response import TS3ClientResponse
+from .log_entry import LogEntry, parse_log_line
+
+if TYPE_CHECKING:
+    from ..ts3client import TS3Client
+
+# The maximum number of lines the server returns per logview call.
+MAX_LINES = 100
+
+
+class LogTailer:
+    """
+    Follows the server log like tail -f.
+    The server reads logview pages backwards from begin_pos (or the end of the file) and reports where it stopped
+    in last_pos and the size of the file in file_size. The tailer remembers the file size it has read up to in
+    position and on every poll only pages back until it reaches it, so lines are neither fetched twice nor skipped.
+    The poll interval is reset to interval whenever new lines arrive and doubles up to max_interval while the log
+    is idle. If the file shrinks, e.g. because the server was restarted, it is read from its start.
+
+    :param client: The client to read the log with.
+    :type client: TS3Client
+    :param interval: The shortest time between two polls in seconds, defaults to 1.
+    :type interval: float, optional
+    :param max_interval: The longest time between two polls in seconds, defaults to 30.
+    :type max_interval: float, optional
+    :param instance: Whether to follow the instance log instead of the virtual server log, defaults to False.
+    :type instance: bool, optional
+    :param position: The file position to start at, defaults to None (the current end of the log).
+    :type position: int, optional
+    :param stop: An event that ends the iteration once it is set, defaults to None.
+    :type stop: threading.Event, optional
+    """
+
+    def __init__(
+        self,
+        client: TS3Client,
+        interval: float = 1,
+        max_interval: float = 30,
+        instance: bool = False,
+        position: int = None,
+        stop: threading.Event = None,
+    ) -> None:
+        self.client = client
+        self.interval = interval
+        self.max_interval = max_interval
+        self.instance = instance
+        self.position = position
+        self.stop = stop or threading.Event()
+
+    def __iter__(self) -> Iterator[LogEntry]:
+        if self.position is None:
+            self.poll()
+
+        interval = self.interval
+        while not self.stop.is_set():
+            entries = self.poll()
+            yield from entries
+            interval = self.interval if entries else min(interval * 2, self.max_interval)
+            self.stop.wait(interval)
+
+    def poll(self) -> list[LogEntry]:
+        """
+        Fetches the lines that were written since the last poll.
+        If no position is known yet, only the current end of the log is remembered.
+
+        :return: The new entries in the order they were written.
+        :rtype: list[LogEntry]
+        """
+        lines, file_size, last_pos = self._read_page(None)
+        if self.position is None:
+            self.position = file_size
+            return []
+        if file_size < self.position:
+            self.position = 0
+        if file_size == self.position:
+            return []
+
+        while last_pos > self.position:
+            page, _, last_pos = self._read_page(last_pos)
+            if not page:
+                break
+            lines = page + lines
+
+        # Lines are contiguous and end at file_size, so their offsets follow from their lengths.
+        entries = []
+        offset = file_size
+        for line in reversed(lines):
+            offset -= len(line.encode()) + 1
+            if offset < self.position:
+                break
+            entries.append(parse_log_line(line, offset))
+
+        self.position = file_size
+        entries.reverse()
+        return entries
+
+    def _read_page(self, begin_pos: int | None) -> tuple[list[str], int, int]:
+        response = TS3ClientResponse(
+            self.client.query.commands.logview(lines=MAX_LINES, instance=self.instance, begin_pos=begin_pos)
+        )
+        rows = list(response)
+        if not rows:
+            return [], 0, 0
+        lines = [str(row["l"]) for row in rows if "l" in row]
+        return lines, rows[0].get("file_size", 0), rows[0].get("last_pos", 0)
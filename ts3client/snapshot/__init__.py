@@ -0,0 +1,8 @@
+from .snapshot import (
+    SnapshotDiff,
+    SnapshotGeneration,
+    decode_snapshot,
+    diff_snapshots,
+    parse_snapshot,
+)
+from .snapshot_store import SnapshotStore
@@ -0,0 +1,168 @@
+import base64
+import binascii
+import zlib
+from dataclasses import dataclass, field
+
+from ..errors import SnapshotFormatError
+from ..utils.parsers import query_to_string, response_to_dict
+
+# Fields that identify an entry of a snapshot section, e.g. a channel, a group or a permission.
+ID_FIELDS = ("id", "id1", "id2", "channel_id", "cid", "cldbid", "client_id", "perm_id", "permid", "permsid")
+
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+@dataclass
+class SnapshotGeneration:
+    generation: int
+    hash: str
+    created: float
+    size: int
+
+
+@dataclass
+class SnapshotDiff:
+    added: dict[str, list[dict]] = field(default_factory=dict)
+    removed: dict[str, list[dict]] = field(default_factory=dict)
+    changed: dict[str, list[tuple[dict, dict]]] = field(default_factory=dict)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+
+def decode_snapshot(data: bytes) -> bytes:
+    """
+    Unwraps the versioned snapshot format of servers since 3.10, "version=<n> [salt=<salt>] data=<base64>", where the
+    data is the snapshot in the older begin_/end_ layout, usually compressed with zstd. Snapshots in the older layout
+    are returned as they are. zstd compressed snapshots need the optional zstandard package.
+
+    :param data: The snapshot as returned by serversnapshotcreate.
+    :type data: bytes
+    :return: The snapshot in the begin_/end_ layout.
+    :rtype: bytes
+    :raises SnapshotFormatError: If the snapshot is password protected or its data cannot be decoded.
+    """
+    if not data.lstrip().startswith(b"version="):
+        return data
+
+    header = {}
+    for token in data.split():
+        key, _, value = token.partition(b"=")
+        header[key.decode()] = value
+    version = int(header["version"]) if header["version"].isdigit() else header["version"].decode()
+
+    if header.get("salt"):
+        raise SnapshotFormatError(version, "The snapshot is protected with a password and cannot be read.")
+    if "data" not in header:
+        raise SnapshotFormatError(version, "The snapshot has no data.")
+
+    try:
+        payload = base64.b64decode(query_to_string(header["data"].decode()), validate=True)
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise SnapshotFormatError(version, f"The data is not valid base64: {e}")
+
+    if payload.startswith(ZSTD_MAGIC):
+        try:
+            import zstandard
+        except ImportError:
+            raise SnapshotFormatError(version, "The data is compressed with zstd, install zstandard to read it.")
+        try:
+            return zstandard.ZstdDecompressor().decompressobj().decompress(payload)
+        except zstandard.ZstdError as e:
+            raise SnapshotFormatError(version, f"The data cannot be decompressed: {e}")
+
+    try:
+        return zlib.decompress(payload)
+    except zlib.error:
+        pass
+    if b"begin_" in payload:
+        return payload
+    raise SnapshotFormatError(version, "The data is in an unknown format.")
+
+
+def parse_snapshot(data: bytes) -> dict[str, list[dict]]:
+    """
+    Splits a server snapshot into its sections, e.g. "virtualserver", "channels", "permissions/server_groups".
+    Sections are opened and closed by begin_<name> and end_<name> markers and may be divided further by bare
+    words such as server_groups. Entries outside of any section are collected under "snapshot".
+    Snapshots in the versioned format are unwrapped with decode_snapshot first.
+
+    :param data: The snapshot as returned by serversnapshotcreate.
+    :type data: bytes
+    :return: The entries of every section, as dicts of their properties.
+    :rtype: dict[str, list[dict]]
+    :raises SnapshotFormatError: If a versioned snapshot cannot be decoded.
+    """
+    data = decode_snapshot(data)
+    sections: dict[str, list[dict]] = {}
+    stack: list[str] = []
+    subsection = None
+
+    def flush(properties: list[str]) -> None:
+        if properties:
+            name = "/".join([*stack, subsection] if subsection else stack) or "snapshot"
+            sections.setdefault(name, []).append(response_to_dict(" ".join(properties)))
+            properties.clear()
+
+    for entry in data.decode().split("|"):
+        properties = []
+        for token in entry.split():
+            if "=" in token:
+                properties.append(token)
+                continue
+
+            # A marker ends the properties that belong to the section before it.
+            flush(properties)
+            if token.startswith("begin_"):
+                stack.append(token[len("begin_") :])
+                subsection = None
+            elif token.startswith("end_"):
+                if stack:
+                    stack.pop()
+                subsection = None
+            else:
+                subsection = token
+        flush(properties)
+
+    return sections
+
+
+def diff_snapshots(old: dict[str, list[dict]], new: dict[str, list[dict]]) -> SnapshotDiff:
+    """
+    Compares the sections of two parsed snapshots.
+    Entries are matched by their ID fields, entries without any are matched by all of their properties.
+
+    :param old: The older snapshot, see parse_snapshot.
+    :type old: dict[str, list[dict]]
+    :param new: The newer snapshot, see parse_snapshot.
+    :type new: dict[str, list[dict]]
+    :return: The added, removed and changed entries per section.
+    :rtype: SnapshotDiff
+    """
+    diff = SnapshotDiff()
+    for section in sorted(old.keys() | new.keys()):
+        before = _by_key(old.get(section, []))
+        after = _by_key(new.get(section, []))
+
+        added = [after[key] for key in after.keys() - before.keys()]
+        removed = [before[key] for key in before.keys() - after.keys()]
+        changed = [(before[key], after[key]) for key in before.keys() & after.keys() if before[key] != after[key]]
+
+        if added:
+            diff.added[section] = added
+        if removed:
+            diff.removed[section] = removed
+        if changed:
+            diff.changed[section] = changed
+
+    return diff
+
+
+def _by_key(entries: list[dict]) -> dict[tuple, dict]:
+    keyed = {}
+    for entry in entries:
+        key = tuple((name, entry[name]) for name in ID_FIELDS if name in entry)
+        keyed[key or tuple(sorted(entry.items()))] = entry
+    return keyed
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Iterator
+
+from ..ts3client_response import TS3ClientResponse
+from ..ts3query.ts3query_command import TS3QueryCommand
+from ..ts3query.ts3query_response import TS3QueryResponse
+from .snapshot import SnapshotDiff, SnapshotGeneration, diff_snapshots, parse_snapshot
+
+if TYPE_CHECKING:
+    from ..ts3client import TS3Client
+
+CHUNK_SIZE = 64 * 1024
+
+
+class SnapshotStore:
+    """
+    Stores virtual server snapshots on disk, compressed with zlib.
+    Snapshots are content addressed by their SHA-256 hash, so identical snapshots are stored once, and the newest
+    keep generations are kept. Snapshots are compressed and decompressed in chunks, and deploy() streams a stored
+    snapshot to the server without building the serversnapshotdeploy command in memory.
+
+    :param directory: The directory to store the snapshots in, defaults to "snapshots".
+    :type directory: str, optional
+    :param keep: The number of generations to keep, defaults to 10.
+    :type keep: int, optional
+    :param level: The zlib compression level, defaults to 6.
+    :type level: int, optional
+    """
+
+    def __init__(self, directory: str = "snapshots", keep: int = 10, level: int = 6) -> None:
+        if keep < 1:
+            raise ValueError("At least one generation must be kept.")
+
+        self.directory = directory
+        self.keep = keep
+        self.level = level
+        self._lock = threading.Lock()
+        self._generations = self._load()
+
+    @property
+    def generations(self) -> list[SnapshotGeneration]:
+        """The stored generations, oldest first."""
+        return list(self._generations)
+
+    def get(self, generation: int = None) -> SnapshotGeneration:
+        """
+        Returns a stored generation.
+
+        :param generation: The generation number, defaults to None (the newest generation).
+        :type generation: int, optional
+        :raises KeyError: If the generation is not stored.
+        :return: The generation.
+        :rtype: SnapshotGeneration
+        """
+        with self._lock:
+            if generation is None and self._generations:
+                return self._generations[-1]
+            for stored in self._generations:
+                if stored.generation == generation:
+                    return stored
+        raise KeyError(f"Snapshot generation {generation} is not stored.")
+
+    def create(self, client: TS3Client) -> SnapshotGeneration:
+        """
+        Creates a snapshot of the selected virtual server with serversnapshotcreate and stores it.
+
+        :param client: The client to create the snapshot with.
+        :type client: TS3Client
+        :return: The stored generation.
+        :rtype: SnapshotGeneration
+        """
+        response = client.query.send(TS3QueryCommand("serversnapshotcreate"), use_cache=False)
+        TS3ClientResponse(response)
+        return self.add(self.snapshot_data(response))
+
+    def add(self, data: bytes) -> SnapshotGeneration:
+        """
+        Stores a snapshot as returned by serversnapshotcreate.
+        If it is identical to the newest generation, that generation is returned instead of adding a new one.
+
+        :param data: The snapshot.
+        :type data: bytes
+        :return: The stored generation.
+        :rtype: SnapshotGeneration
+        """
+        os.makedirs(self._objects, exist_ok=True)
+        digest = hashlib.sha256()
+        compressor = zlib.compressobj(self.level)
+        view = memoryview(data)
+        with tempfile.NamedTemporaryFile(dir=self._objects, prefix=".snapshot_", delete=False) as file:
+            for offset in range(0, len(view), CHUNK_SIZE):
+                chunk = view[offset : offset + CHUNK_SIZE]
+                digest.update(chunk)
+                file.write(compressor.compress(chunk))
+            file.write(compressor.flush())
+
+        hash = digest.hexdigest()
+        with self._lock:
+            if os.path.exists(self._object(hash)):
+                os.remove(file.name)
+            else:
+                os.replace(file.name, self._object(hash))
+
+            if self._generations and self._generations[-1].hash == hash:
+                return self._generations[-1]
+
+            number = self._generations[-1].generation + 1 if self._generations else 1
+            generation = SnapshotGeneration(number, hash, time.time(), len(data))
+            self._generations.append(generation)
+            self._prune()
+            self._save()
+            return generation
+
+    def open(self, generation: int = None) -> Iterator[bytes]:
+        """
+        Reads a stored snapshot in decompressed chunks.
+
+        :param generation: The generation number, defaults to None (the newest generation).
+        :type generation: int, optional
+        :return: The chunks of the snapshot.
+        :rtype: Iterator[bytes]
+        """
+        path = self._object(self.get(generation).hash)
+        decompressor = zlib.decompressobj()
+        with open(path, "rb") as file:
+            while chunk := file.read(CHUNK_SIZE):
+                yield decompressor.decompress(chunk)
+        yield decompressor.flush()
+
+    def read(self, generation: int = None) -> bytes:
+        """
+        Reads a stored snapshot.
+
+        :param generation: The generation number, defaults to None (the newest generation).
+        :type generation: int, optional
+        :return: The snapshot.
+        :rtype: bytes
+        """
+        return b"".join(self.open(generation))
+
+    def deploy(self, client: TS3Client, generation: int = None, mapping: bool = False) -> TS3ClientResponse:
+        """
+        Deploys a stored snapshot to the selected virtual server with serversnapshotdeploy.
+        The snapshot is streamed from disk.
+
+        :param client: The client to deploy the snapshot with.
+        :type client: TS3Client
+        :param generation: The generation number, defaults to None (the newest generation).
+        :type generation: int, optional
+        :param mapping: Whether the server should return the mapping of old to new channel IDs, defaults to False.
+        :type mapping: bool, optional
+        :return: The response of the server.
+        :rtype: TS3ClientResponse
+        """
+        command = TS3QueryCommand("serversnapshotdeploy", args=(("mapping", mapping),))
+        return TS3ClientResponse(client.query.send_stream(command, self.open(generation)))
+
+    def diff(self, old: int, new: int = None) -> SnapshotDiff:
+        """
+        Compares the channels, groups, permissions and other sections of two generations.
+
+        :param old: The older generation number.
+        :type old: int
+        :param new: The newer generation number, defaults to None (the newest generation).
+        :type new: int, optional
+        :return: The added, removed and changed entries per section.
+        :rtype: SnapshotDiff
+        """
+        return diff_snapshots(parse_snapshot(self.read(old)), parse_snapshot(self.read(new)))
+
+    @staticmethod
+    def snapshot_data(response: TS3QueryResponse) -> bytes:
+        """
+        Extracts the snapshot from the raw response to serversnapshotcreate, dropping the status line
+        and any notifications the server sent in between.
+
+        :param response: The response.
+        :type response: TS3QueryResponse
+        :return: The snapshot.
+        :rtype: bytes
+        """
+        body = response.response[: response.match.start()]
+        return b"\n\r".join(line for line in body.split(b"\n\r") if line and not line.startswith(b"notify"))
+
+    @property
+    def _objects(self) -> str:
+        return os.path.join(self.directory, "objects")
+
+    def _object(self, hash: str) -> str:
+        return os.path.join(self._objects, f"{hash}.zz")
+
+    def _load(self) -> list[SnapshotGeneration]:
+        path = os.path.join(self.directory, "generations.json")
+        if not os.path.exists(path):
+            return []
+        with open(path) as file:
+            return [SnapshotGeneration(**generation) for generation in json.load(file)]
+
+    def _save(self) -> None:
+        path = os.path.join(self.directory, "generations.json")
+        with open(f"{path}.tmp", "w") as file:
+            json.dump([asdict(generation) for generation in self._generations], file, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    def _prune(self) -> None:
+        del self._generations[: -self.keep]
+        referenced = {generation.hash for generation in self._generations}
+        for name in os.listdir(self._objects):
+            if name.endswith(".zz") and name[: -len(".zz")] not in referenced:
+                os.remove(os.path.join(self._objects, name))
@@ -1,13 +1,18 @@
 import logging
-from typing import Optional
+import threading
+from typing import BinaryIO, Callable, Optional
 
-from .channel import Channel, ChannelInfo
+from .channel import Channel, ChannelInfo, ChannelTree
 from .constants import NotifyRegisterType, ReasonIdentifier, TargetMode
+from .errors import DATABASE_EMPTY_RESULT_SET, INVALID_CLIENT_ID, TS3Error
 from .event import ClientEnterViewEvent, Event
+from .file_transfer import FileTransfer, IconCache
 from .message import Message
+from .permission import PermissionModel
+from .server_log import LogTailer
 from .ts3client_response import TS3ClientResponse
 from .ts3query import TS3Query
-from .user import User, UserInfo
+from .user import ClientDBIterator, Identity, IdentityIndex, User, UserInfo
 from .utils.logger import create_logger
 
 
@@ -43,6 +48,11 @@ class TS3Client:
         logger: logging.Logger = None,
     ) -> None:
         self.logger = logger or create_logger("TS3Client", "logs/main.log")
+        self.identities = IdentityIndex()
+        self.channel_tree = ChannelTree()
+        self.permissions = PermissionModel(self)
+        self.file_transfer = FileTransfer(self)
+        self.icons = IconCache(self)
         if not host or not port:
             self.logger.info("No host and/or port provided, not connecting to a server")
             return
@@ -115,9 +125,20 @@ class TS3Client:
         :type timeout: int, optional
         """
         self.logger.info(f"Connecting to {host}:{port}...")
-        self.query = TS3Query(host, port, timeout)
+        self.attach(TS3Query(host, port, timeout))
         self.logger.info("Connected")
 
+    def attach(self, query: TS3Query) -> None:
+        """Use a connected query and keep the identities, channel tree and permissions up to date with it.
+
+        :param query: The query, a TS3Query or an object that stands in for one.
+        :type query: TS3Query
+        """
+        self.query = query
+        self.query.add_response_hook(self.identities.feed)
+        self.query.add_response_hook(self.channel_tree.feed)
+        self.query.add_response_hook(self.permissions.feed)
+
     def disconnect(self) -> None:
         """Disconnect from the TeamSpeak 3 server."""
         self.logger.info("Disconnecting...")
@@ -222,6 +243,118 @@ class TS3Client:
         """
         return [User(**client) for client in TS3ClientResponse(self.query.commands.clientfind(pattern=name))]
 
+    def iter_client_db(self, page_size: int = 200, start: int = 0) -> ClientDBIterator:
+        """Iterate over all client identities in the server database.
+        The next page is fetched while the current one is processed. The returned iterator
+        tracks its offset and the total from clientdblist -count, and resumes from its offset
+        when iterated again, e.g. after a reconnect.
+
+        :param page_size: Number of identities to request per page, defaults to 200
+        :type page_size: int, optional
+        :param start: Offset to start at, defaults to 0
+        :type start: int, optional
+        :return: An iterator over the identities.
+        :rtype: ClientDBIterator
+        """
+        return ClientDBIterator(self, page_size, start)
+
+    def get_database_id_by_uid(self, unique_id: str) -> int | None:
+        """Get the database ID of a client by its unique ID.
+        Resolved identities are cached, so repeated lookups do not query the server.
+
+        :param unique_id: Unique ID of the client.
+        :type unique_id: str
+        :return: The database ID or None if the unique ID is unknown.
+        :rtype: int | None
+        """
+        identity = self.identities.by_unique_id(unique_id)
+        if identity is None or identity.database_id is None:
+            identity = self._resolve_unique_id(
+                unique_id, lambda: self.query.commands.clientgetdbidfromuid(cluid=unique_id)
+            )
+        return identity.database_id if identity else None
+
+    def get_name_by_uid(self, unique_id: str) -> str | None:
+        """Get the last known nickname of a client by its unique ID.
+
+        :param unique_id: Unique ID of the client.
+        :type unique_id: str
+        :return: The nickname or None if the unique ID is unknown.
+        :rtype: str | None
+        """
+        identity = self.identities.by_unique_id(unique_id)
+        if identity is None or identity.nickname is None:
+            identity = self._resolve_unique_id(
+                unique_id, lambda: self.query.commands.clientgetnamefromuid(cluid=unique_id)
+            )
+        return identity.nickname if identity else None
+
+    def get_client_ids_by_uid(self, unique_id: str) -> list[int]:
+        """Get the IDs of all connections of a client by its unique ID.
+        A client that is not connected is remembered, so repeated lookups do not query the server until it connects.
+
+        :param unique_id: Unique ID of the client.
+        :type unique_id: str
+        :return: The client IDs, empty if the client is not connected.
+        :rtype: list[int]
+        """
+        identity = self.identities.by_unique_id(unique_id)
+        if identity is None or not identity.client_ids:
+            if self.identities.is_offline(unique_id):
+                return []
+            if not self._try_resolve(lambda: self.query.commands.clientgetids(cluid=unique_id)):
+                self.identities.mark_offline(unique_id)
+                return []
+            identity = self.identities.by_unique_id(unique_id)
+        return sorted(identity.client_ids) if identity else []
+
+    def get_uid_by_client_id(self, id: int) -> str | None:
+        """Get the unique ID of a connected client.
+
+        :param id: User ID.
+        :type id: int
+        :return: The unique ID or None if no client is connected with this ID.
+        :rtype: str | None
+        """
+        identity = self.identities.by_client_id(id)
+        if identity is None and self._try_resolve(lambda: self.query.commands.clientgetuidfromclid(clid=id)):
+            identity = self.identities.by_client_id(id)
+        return identity.unique_id if identity else None
+
+    def get_name_by_database_id(self, database_id: int) -> str | None:
+        """Get the last known nickname of a client by its database ID.
+
+        :param database_id: Database ID of the client.
+        :type database_id: int
+        :return: The nickname or None if the database ID is unknown.
+        :rtype: str | None
+        """
+        identity = self.identities.by_database_id(database_id)
+        if identity is None or identity.nickname is None:
+            if self._try_resolve(lambda: self.query.commands.clientgetnamefromdbid(cldbid=database_id)):
+                identity = self.identities.by_database_id(database_id)
+        return identity.nickname if identity else None
+
+    def _resolve_unique_id(self, unique_id: str, request: Callable) -> Identity | None:
+        if self.identities.is_unknown(unique_id):
+            return None
+
+        if not self._try_resolve(request):
+            self.identities.mark_unknown(unique_id)
+            return None
+
+        return self.identities.by_unique_id(unique_id)
+
+    def _try_resolve(self, request: Callable) -> bool:
+        # The response is fed into the identity index by its response hook.
+        try:
+            TS3ClientResponse(request())
+        except TS3Error as e:
+            if e.id in (DATABASE_EMPTY_RESULT_SET, INVALID_CLIENT_ID):
+                return False
+            raise
+        return True
+
     def rename_user(self, id: int, name: str) -> TS3ClientResponse:
         """Rename a user.
 
@@ -313,10 +446,142 @@ class TS3Client:
 
         :param name: Name of the channel.
         :type name: str
-        :return: Response from the server.
-        :rtype: TS3ClientResponse
+        :return: All channels whose name matches.
+        :rtype: list[Channel]
+        """
+        try:
+            response = TS3ClientResponse(self.query.commands.channelfind(pattern=name))
+        except TS3Error as e:
+            if e.id == DATABASE_EMPTY_RESULT_SET:
+                return []
+            raise
+        return [Channel(**channel) for channel in response]
+
+    def get_channel_tree(self) -> ChannelTree:
+        """Get the channel hierarchy.
+        The tree is loaded once and then kept up to date by channel events,
+        see enable_channel_events().
+
+        :return: The channel tree.
+        :rtype: ChannelTree
+        """
+        if not self.channel_tree.loaded:
+            self.get_channels()
+        return self.channel_tree
+
+    def get_channel_by_path(self, path: str, separator: str = "/") -> Channel | None:
+        """Get a channel by the names of the channels leading to it, e.g. "Gaming/CS2/Team A".
+
+        :param path: Channel names separated by separator.
+        :type path: str
+        :param separator: Separator between the channel names, defaults to "/"
+        :type separator: str, optional
+        :return: The channel or None if no channel has this path.
+        :rtype: Channel | None
+        """
+        return self.get_channel_tree().find_by_path(path, separator)
+
+    def has_permission(self, id: int, permission: str | int, required: int = 1) -> bool:
+        """Check whether a user has a permission in their current channel.
+        Effective permissions are computed locally from the permission model,
+        so repeated checks do not query the server.
+
+        :param id: User ID.
+        :type id: int
+        :param permission: Name or ID of the permission, e.g. "b_client_kick_from_server".
+        :type permission: str | int
+        :param required: Minimum value of the permission, defaults to 1
+        :type required: int, optional
+        :return: Whether the user has the permission.
+        :rtype: bool
+        """
+        if not self.permissions.loaded:
+            self.permissions.load()
+        return self.permissions.has_permission(id, permission, required)
+
+    def upload_file(
+        self,
+        file: BinaryIO,
+        name: str,
+        channel_id: int = 0,
+        channel_pw: str = "",
+        resume: bool = False,
+        progress: Callable[[int, int], None] = None,
+    ) -> int:
+        """Upload a file to a channel's file repository.
+
+        :param file: File object opened in binary mode, uploaded from its current position.
+        :type file: BinaryIO
+        :param name: Path of the file in the repository, e.g. "/banner.png".
+        :type name: str
+        :param channel_id: Channel ID, defaults to 0
+        :type channel_id: int, optional
+        :param channel_pw: Channel password, defaults to ""
+        :type channel_pw: str, optional
+        :param resume: Continue an interrupted upload, defaults to False
+        :type resume: bool, optional
+        :param progress: Called with the transferred and total bytes, defaults to None
+        :type progress: Callable[[int, int], None], optional
+        :return: The number of bytes sent.
+        :rtype: int
+        """
+        return self.file_transfer.upload(file, name, channel_id, channel_pw, resume=resume, progress=progress)
+
+    def download_file(
+        self,
+        file: BinaryIO,
+        name: str,
+        channel_id: int = 0,
+        channel_pw: str = "",
+        resume: bool = False,
+        progress: Callable[[int, int], None] = None,
+    ) -> int:
+        """Download a file from a channel's file repository.
+
+        :param file: File object opened in binary mode for writing.
+        :type file: BinaryIO
+        :param name: Path of the file in the repository, e.g. "/banner.png".
+        :type name: str
+        :param channel_id: Channel ID, defaults to 0
+        :type channel_id: int, optional
+        :param channel_pw: Channel password, defaults to ""
+        :type channel_pw: str, optional
+        :param resume: Append to the bytes already in file, defaults to False
+        :type resume: bool, optional
+        :param progress: Called with the transferred and total bytes, defaults to None
+        :type progress: Callable[[int, int], None], optional
+        :return: The number of bytes received.
+        :rtype: int
+        """
+        return self.file_transfer.download(file, name, channel_id, channel_pw, resume=resume, progress=progress)
+
+    def tail_log(
+        self,
+        interval: float = 1,
+        max_interval: float = 30,
+        instance: bool = False,
+        position: int = None,
+        stop: threading.Event = None,
+    ) -> LogTailer:
+        """Follow the server log, yielding new lines as structured entries.
+        Only lines written since the last poll are fetched. The poll interval backs off
+        up to max_interval while the log is idle. The returned tailer keeps its position,
+        so it resumes where it stopped when iterated again.
+
+        :param interval: Shortest time between polls in seconds, defaults to 1
+        :type interval: float, optional
+        :param max_interval: Longest time between polls in seconds, defaults to 30
+        :type max_interval: float, optional
+        :param instance: Follow the instance log instead of the virtual server log, defaults to False
+        :type instance: bool, optional
+        :param position: File position to start at, defaults to None (the current end of the log)
+        :type position: int, optional
+        :param stop: Event that ends the iteration once set, defaults to None
+        :type stop: threading.Event, optional
+        :return: An iterator over new log entries.
+        :rtype: LogTailer
         """
-        return Channel(**TS3ClientResponse(self.query.commands.channelfind(pattern=name))[0])
+        return LogTailer(self, interval, max_interval, instance, position, stop)
 
     def get_messages(self) -> list[Message]:
         """Get a list of all messages.
@@ -433,7 +698,7 @@ class TS3Client:
     def enable_channel_events(self) -> None:
         """Enable receiving channel events."""
         self.start_polling()
-        self.query.commands.servernotifyregister(event=NotifyRegisterType.CHANNEL)
+        self.query.commands.servernotifyregister(event=NotifyRegisterType.CHANNEL, id=0)
 
     def disable_channel_events(self) -> None:
         """Disable receiving channel events."""
@@ -446,7 +711,7 @@ class TS3Client:
         self.query.commands.servernotifyregister(event=NotifyRegisterType.TEXT_CHANNEL)
         self.query.commands.servernotifyregister(event=NotifyRegisterType.TEXT_PRIVATE)
         self.query.commands.servernotifyregister(event=NotifyRegisterType.SERVER)
-        self.query.commands.servernotifyregister(event=NotifyRegisterType.CHANNEL)
+        self.query.commands.servernotifyregister(event=NotifyRegisterType.CHANNEL, id=0)
 
     def disable_events_and_messages(self) -> None:
         """Disable receiving all events."""
@@ -3,11 +3,13 @@ import socket
 import threading
 import time
 from telnetlib import Telnet
+from typing import Callable, Iterable
 
 from ..event import Event
 from ..message import Message
 from ..utils import patterns
 from ..utils.logger import create_logger
+from .ts3query_cache import TS3QueryCache
 from .ts3query_command import CommandsWrapper, TS3QueryCommand
 from .ts3query_response import TS3QueryResponse
 
@@ -30,10 +32,11 @@ class TS3Query:
     :type timeout: int, optional
     """
 
-    _lock = threading.RLock()
-
     _flood_protection: bool = True
     _flood_protection_timeout: float = 0.5
+    # The most commands written at once, well below the server's default of 10 commands per 3 seconds.
+    _flood_protection_window: int = 5
+    _caching: bool = True
     _events: list[Event] = []
     _events_limit: int = 1000
     _messages: list[Message] = []
@@ -51,6 +54,13 @@ class TS3Query:
         logger: logging.Logger = None,
     ) -> None:
         self.logger = logger or create_logger("TS3Query", "logs/main.log")
+        self.cache = TS3QueryCache()
+        # Each connection has its own lock, so sessions to several virtual servers do not wait for each other.
+        self._lock = threading.RLock()
+        # Flood protection hands out send times, so waiting for one never holds the query lock.
+        self._pacing_lock = threading.Lock()
+        self._next_send = 0.0
+        self._response_hooks: list[Callable[[TS3QueryCommand, TS3QueryResponse], None]] = []
         self.logger.info(f"Connecting to {host}:{port}...")
 
         try:
@@ -59,6 +69,8 @@ class TS3Query:
             self.logger.error(e)
             return
 
+        self.host = host
+        self.port = port
         self.timeout = timeout
         self.commands = CommandsWrapper(self)
         self._skip_greeting()
@@ -113,39 +125,150 @@ class TS3Query:
         self._telnet.close()
         self.logger.info("Connection closed")
 
-    def send(self, command: TS3QueryCommand) -> TS3QueryResponse:
+    def send(self, command: TS3QueryCommand, use_cache: bool = True) -> TS3QueryResponse:
         """
         Sends a command to the server.
+        Responses of cacheable commands are served from the cache while they are fresh.
 
         :param command: The command to send
         :type command: QueryCommand
+        :param use_cache: Whether a cached response may be returned, defaults to True
+        :type use_cache: bool, optional
         :return: The response from the server
         :rtype: QueryResponse
         """
         if not self.connected():
             return
 
+        if self._caching and use_cache:
+            cached = self.cache.get(command)
+            if cached is not None:
+                self.logger.debug(f"Cache hit: {command.command}")
+                return cached
+
+        self._pace(1)
         self.logger.debug(f"Aquiring lock...")
         with self._lock:
-            if self._flood_protection:
-                time.sleep(self._flood_protection_timeout)
-
             self.logger.debug(f"Lock aquired")
             self.logger.debug(f"Sending command: {command.command}")
             self._telnet.write(command.encoded)
-            response = self._receive()
+            response = self._receive(time.perf_counter())
             self.logger.debug(f"Releasing lock...")
 
         self.logger.debug(f"Lock released")
 
+        self._run_response_hooks(command, response)
+
+        if response.error_id == 0:
+            self.cache.invalidate(command)
+            if self._caching:
+                self.cache.put(command, response)
+
+        return response
+
+    def send_batch(self, commands: list[TS3QueryCommand]) -> list[TS3QueryResponse]:
+        """
+        Sends several commands pipelined: each write holds a window of up to flood_protection_window commands and
+        their responses are then read in order, which saves a round trip per command.
+        With flood protection, every window waits for as many send slots as it has commands, without holding the
+        query lock, and the lock is released between windows so other threads can send in between. The commands
+        therefore go out no faster than single commands would. Responses are never served from the cache.
+
+        :param commands: The commands to send
+        :type commands: list[TS3QueryCommand]
+        :return: The responses from the server, in the order of the commands
+        :rtype: list[TS3QueryResponse]
+        """
+        if not self.connected() or not commands:
+            return []
+
+        size = self._flood_protection_window if self._flood_protection else len(commands)
+        responses = []
+        for start in range(0, len(commands), size):
+            window = commands[start : start + size]
+            self._pace(len(window))
+            self.logger.debug(f"Aquiring lock...")
+            with self._lock:
+                self.logger.debug(f"Lock aquired")
+                self.logger.debug(f"Sending commands: {[command.command for command in window]}")
+                self._telnet.write(b"".join(command.encoded for command in window))
+                sent = time.perf_counter()
+                responses += [self._receive(sent) for _ in window]
+                self.logger.debug(f"Releasing lock...")
+
+            self.logger.debug(f"Lock released")
+
+        for command, response in zip(commands, responses):
+            self._run_response_hooks(command, response)
+
+            if response.error_id == 0:
+                self.cache.invalidate(command)
+                if self._caching:
+                    self.cache.put(command, response)
+
+        return responses
+
+    def send_stream(self, command: TS3QueryCommand, body: Iterable[bytes]) -> TS3QueryResponse:
+        """
+        Sends a command followed by a body that is written to the server chunk by chunk,
+        e.g. a server snapshot read from disk, so the full command never has to be built in memory.
+        The body must already be escaped.
+
+        :param command: The command to send before the body
+        :type command: TS3QueryCommand
+        :param body: The chunks of the body
+        :type body: Iterable[bytes]
+        :return: The response from the server
+        :rtype: TS3QueryResponse
+        """
+        if not self.connected():
+            return
+
+        self._pace(1)
+        self.logger.debug(f"Aquiring lock...")
+        with self._lock:
+            self.logger.debug(f"Lock aquired")
+            self.logger.debug(f"Streaming command: {command.command}")
+            self._telnet.write(command.encoded.rstrip(b"\n") + b" ")
+            for chunk in body:
+                self._telnet.write(chunk)
+            self._telnet.write(b"\n")
+            response = self._receive(time.perf_counter())
+            self.logger.debug(f"Releasing lock...")
+
+        self.logger.debug(f"Lock released")
+
+        self._run_response_hooks(command, response)
+
+        if response.error_id == 0:
+            self.cache.invalidate(command)
+
         return response
 
-    def _receive(self) -> TS3QueryResponse:
+    def _pace(self, count: int) -> None:
+        """
+        Waits for count send slots of the flood protection, one per flood_protection_timeout seconds.
+        Slots are reserved in the order threads ask for them and waited for outside the query lock.
+        """
+        if not self._flood_protection:
+            return
+
+        with self._pacing_lock:
+            now = time.monotonic()
+            start = max(now, self._next_send)
+            self._next_send = start + self._flood_protection_timeout * count
+        if start > now:
+            time.sleep(start - now)
+
+    def _receive(self, sent: float = None) -> TS3QueryResponse:
         self.logger.debug("Receiving response...")
         response = self._telnet.expect([patterns.RESPONSE_END_BYTES], self.timeout)
         self.logger.debug(f"Received response: {response}")
 
         response = TS3QueryResponse(*response)
+        if sent is not None:
+            # Only the time on the wire and in the parser, not the wait for flood protection or the lock.
+            response.latency = time.perf_counter() - sent
         self.logger.debug(f"Parsed response: {response}")
 
         self._remove_used_events()
@@ -155,6 +278,34 @@ class TS3Query:
 
         return response
 
+    def add_response_hook(self, hook: Callable[[TS3QueryCommand, TS3QueryResponse], None]) -> None:
+        """
+        Registers a function that is called with every command sent to the server and its response.
+        Hooks run on the sending thread, so they should be fast and must not send commands themselves.
+
+        :param hook: The function to call.
+        :type hook: Callable[[TS3QueryCommand, TS3QueryResponse], None]
+        """
+        if hook not in self._response_hooks:
+            self._response_hooks.append(hook)
+
+    def remove_response_hook(self, hook: Callable[[TS3QueryCommand, TS3QueryResponse], None]) -> None:
+        """
+        Unregisters a previously registered response hook.
+
+        :param hook: The function to remove.
+        :type hook: Callable[[TS3QueryCommand, TS3QueryResponse], None]
+        """
+        if hook in self._response_hooks:
+            self._response_hooks.remove(hook)
+
+    def _run_response_hooks(self, command: TS3QueryCommand, response: TS3QueryResponse) -> None:
+        for hook in list(self._response_hooks):
+            try:
+                hook(command, response)
+            except Exception as e:
+                self.logger.exception(f"Response hook {hook} failed: {e}")
+
     def keep_alive(self) -> None:
         """Waits for the polling thread to stop."""
         if self._polling_thread and self._polling_thread.is_alive():
@@ -203,7 +354,7 @@ class TS3Query:
     def _poll(self, stop: threading.Event, polling_rate: float) -> None:
         self.logger.debug("Polling...")
         while not stop.is_set():
-            self.commands.version()
+            self.send(TS3QueryCommand("version"), use_cache=False)
             stop.wait(polling_rate)
         self.logger.debug("Polling stopped")
 
@@ -251,6 +402,15 @@ class TS3Query:
                 self.timeout,
             )
 
+    def enable_cache(self) -> None:
+        self.logger.info("Enabling response cache")
+        self._caching = True
+
+    def disable_cache(self) -> None:
+        self.logger.info("Disabling response cache")
+        self._caching = False
+        self.cache.clear()
+
     @property
     def flood_protection(self) -> bool:
         return self._flood_protection
@@ -259,6 +419,14 @@ class TS3Query:
     def flood_protection_timeout(self) -> float:
         return self._flood_protection_timeout
 
+    @property
+    def flood_protection_window(self) -> int:
+        return self._flood_protection_window
+
+    @property
+    def caching(self) -> bool:
+        return self._caching
+
     @property
     def messages(self) -> list[Message]:
         return self._messages
@@ -288,6 +456,11 @@ class TS3Query:
         self.logger.info(f"Setting flood protection rate to {rate}")
         self._flood_protection_timeout = rate
 
+    @flood_protection_window.setter
+    def flood_protection_window(self, size: int) -> None:
+        self.logger.info(f"Setting flood protection window to {size}")
+        self._flood_protection_window = max(1, size)
+
     @messages_limit.setter
     def messages_limit(self, limit: int) -> None:
         self.logger.info(f"Setting messages limit to {limit}")
@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import OrderedDict
+
+from .ts3query_command import TS3QueryCommand
+from .ts3query_response import TS3QueryResponse
+
+DEFAULT_TTLS: dict[str, float] = {
+    "bindinglist": 60 * 60,
+    "channelgrouplist": 5 * 60,
+    "instanceinfo": 5 * 60,
+    "permissionlist": 60 * 60,
+    "servergrouplist": 5 * 60,
+    "version": 60 * 60,
+}
+
+DEFAULT_INVALIDATIONS: dict[str, tuple[str, ...]] = {
+    "channelgroupadd": ("channelgrouplist",),
+    "channelgroupaddperm": ("channelgrouplist",),
+    "channelgroupcopy": ("channelgrouplist",),
+    "channelgroupdel": ("channelgrouplist",),
+    "channelgroupdelperm": ("channelgrouplist",),
+    "channelgrouprename": ("channelgrouplist",),
+    "instanceedit": ("instanceinfo", "bindinglist"),
+    "permreset": ("permissionlist", "servergrouplist", "channelgrouplist"),
+    "servergroupadd": ("servergrouplist",),
+    "servergroupaddperm": ("servergrouplist",),
+    "servergroupautoaddperm": ("servergrouplist",),
+    "servergroupautodelperm": ("servergrouplist",),
+    "servergroupcopy": ("servergrouplist",),
+    "servergroupdel": ("servergrouplist",),
+    "servergroupdelperm": ("servergrouplist",),
+    "servergrouprename": ("servergrouplist",),
+    "serversnapshotdeploy": ("servergrouplist", "channelgrouplist"),
+}
+
+# Commands that change the context (virtual server or permissions) all cached responses depend on.
+CONTEXT_COMMANDS = ("use", "login", "logout")
+
+
+class TS3QueryCache:
+    """
+    A read-through cache for query commands whose responses rarely change.
+    Responses are keyed on the encoded command bytes, expire after a per-command TTL
+    and are evicted in least recently used order once max_entries is reached.
+    Successful mutating commands invalidate the cached responses they affect.
+
+    :param ttls: Seconds to keep the response of each cacheable command, defaults to DEFAULT_TTLS.
+    :type ttls: dict[str, float], optional
+    :param invalidations: Cached commands to drop whenever a mutating command succeeds,
+        defaults to DEFAULT_INVALIDATIONS.
+    :type invalidations: dict[str, tuple[str, ...]], optional
+    :param max_entries: The maximum number of cached responses, defaults to 128.
+    :type max_entries: int, optional
+    """
+
+    def __init__(
+        self,
+        ttls: dict[str, float] = None,
+        invalidations: dict[str, tuple[str, ...]] = None,
+        max_entries: int = 128,
+    ) -> None:
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.invalidations = dict(DEFAULT_INVALIDATIONS if invalidations is None else invalidations)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, tuple[str, float, TS3QueryResponse]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def cacheable(self, command: TS3QueryCommand) -> bool:
+        return command.command in self.ttls
+
+    def get(self, command: TS3QueryCommand) -> TS3QueryResponse | None:
+        """
+        Returns the cached response for a command, or None if it is not cached or expired.
+
+        :param command: The command to look up.
+        :type command: TS3QueryCommand
+        :return: The cached response.
+        :rtype: TS3QueryResponse | None
+        """
+        if not self.cacheable(command):
+            return None
+
+        with self._lock:
+            entry = self._entries.get(command.encoded)
+            if entry is None or entry[1] < time.monotonic():
+                self._entries.pop(command.encoded, None)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(command.encoded)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, command: TS3QueryCommand, response: TS3QueryResponse) -> None:
+        """
+        Stores a successful response of a cacheable command.
+
+        :param command: The command that was sent.
+        :type command: TS3QueryCommand
+        :param response: The response from the server.
+        :type response: TS3QueryResponse
+        """
+        if not self.cacheable(command) or response is None or response.error_id != 0:
+            return
+
+        with self._lock:
+            expires = time.monotonic() + self.ttls[command.command]
+            self._entries[command.encoded] = (command.command, expires, response)
+            self._entries.move_to_end(command.encoded)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, command: TS3QueryCommand) -> None:
+        """
+        Drops all cached responses affected by a command that was sent to the server.
+
+        :param command: The command that was sent.
+        :type command: TS3QueryCommand
+        """
+        if command.command in CONTEXT_COMMANDS:
+            self.clear()
+            return
+
+        affected = self.invalidations.get(command.command)
+        if affected:
+            self.invalidate_commands(*affected)
+
+    def invalidate_commands(self, *commands: str) -> None:
+        """
+        Drops all cached responses of the given commands, regardless of their arguments.
+
+        :param commands: Names of the cached commands, e.g. "servergrouplist".
+        :type commands: str
+        """
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[0] in commands]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Drops all cached responses."""
+        with self._lock:
+            self._entries.clear()
+
+    def reset_stats(self) -> None:
+        """Resets the hit and miss counters."""
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "hit_ratio": self.hit_ratio,
+        }
@@ -127,7 +127,9 @@ class CommandsWrapper:
         machines. If no subsystem is specified, "voice" is used by default.
         """
 
-        return self.query.send(TS3QueryCommand("bindinglist", kwargs={"subsystem": subsystem.value or Subsystem.VOICE}))
+        return self.query.send(
+            TS3QueryCommand("bindinglist", kwargs={"subsystem": (subsystem or Subsystem.VOICE).value})
+        )
 
     def use(
         self,
@@ -420,18 +422,19 @@ class CommandsWrapper:
             )
         )
 
-    def servergroupaddclient(self, sgid: int, cldbid: int) -> TS3QueryResponse:
+    def servergroupaddclient(self, sgid: int, cldbid: int | list[int]) -> TS3QueryResponse:
         """
         Adds a client to the server group specified with sgid. Please note that a client
-        cannot be added to default groups or template groups.
+        cannot be added to default groups or template groups. Multiple clients can be
+        added at once by passing a list of database IDs.
         """
 
         return self.query.send(TS3QueryCommand("servergroupaddclient", kwargs={"sgid": sgid, "cldbid": cldbid}))
 
-    def servergroupdelclient(self, sgid: int, cldbid: int) -> TS3QueryResponse:
+    def servergroupdelclient(self, sgid: int, cldbid: int | list[int]) -> TS3QueryResponse:
         """
         Removes a client specified with cldbid from the server group specified with
-        sgid.
+        sgid. Multiple clients can be removed at once by passing a list of database IDs.
         """
 
         return self.query.send(TS3QueryCommand("servergroupdelclient", kwargs={"sgid": sgid, "cldbid": cldbid}))
@@ -1192,7 +1195,9 @@ class CommandsWrapper:
             )
         )
 
-    def clientdelperm(self, cldbid: int, permsid: Optional[str], permid: Optional[int] = None) -> TS3QueryResponse:
+    def clientdelperm(
+        self, cldbid: int, permsid: Optional[str] = None, permid: Optional[int] = None
+    ) -> TS3QueryResponse:
         """
         Removes a set of specified permissions from a client. Multiple permissions can
         be removed at once. A permission can be specified by permid or permsid.
@@ -1249,7 +1254,7 @@ class CommandsWrapper:
         self,
         cid: int,
         cldbid: int,
-        permsid: Optional[str],
+        permsid: Optional[str] = None,
         permid: Optional[int] = None,
     ) -> TS3QueryResponse:
         """
@@ -1289,7 +1294,7 @@ class CommandsWrapper:
         self,
         cid: int,
         cldbid: int,
-        permsid: Optional[str],
+        permsid: Optional[str] = None,
         permid: Optional[int] = None,
     ) -> TS3QueryResponse:
         """
@@ -1535,9 +1540,9 @@ class CommandsWrapper:
         cid: int,
         cpw: str,
         size: int,
-        overwrite: Optional[bool],
-        resume: Optional[bool],
-        proto: Optional[Literal[0, 1]],
+        overwrite: Optional[bool] = None,
+        resume: Optional[bool] = None,
+        proto: Optional[Literal[0, 1]] = None,
     ) -> TS3QueryResponse:
         """
         Initializes a file transfer upload. clientftfid is an arbitrary ID to identify
@@ -1573,8 +1578,8 @@ class CommandsWrapper:
         name: str,
         cid: int,
         cpw: str,
-        seekpos: int,
-        proto: Optional[Literal[0, 1]],
+        seekpos: int = 0,
+        proto: Optional[Literal[0, 1]] = None,
     ) -> TS3QueryResponse:
         """
         Initializes a file transfer download. clientftfid is an arbitrary ID to identify
@@ -1627,7 +1632,7 @@ class CommandsWrapper:
 
         return self.query.send(TS3QueryCommand("ftgetfileinfo", kwargs={"cid": cid, "cpw": cpw, "name": name}))
 
-    def ftstop(self, serverftfid: int, delete: Optional[bool]) -> TS3QueryResponse:
+    def ftstop(self, serverftfid: int, delete: Optional[bool] = None) -> TS3QueryResponse:
         """
         Stops the running file transfer with server-side ID serverftfid.
         """
@@ -28,6 +28,8 @@ class TS3QueryResponse:
     :type events: list[Event]
     :param messages: The included messages in the query response.
     :type messages: list[Message]
+    :param latency: The seconds from writing the command to parsing its response, None if it was not sent by TS3Query.
+    :type latency: float, optional
     """
 
     index: int
@@ -39,6 +41,7 @@ class TS3QueryResponse:
     data: dict = field(init=False)
     events: list[Event] = field(init=False)
     messages: list[Message] = field(init=False)
+    latency: Optional[float] = field(default=None, init=False)
 
     def __post_init__(self):
         self.error_id = int(self.match.group("id").decode())
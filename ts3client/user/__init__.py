@@ -1,2 +1,6 @@
+from .client_db_iterator import ClientDBIterator
+from .connection_sampler import ClientSeries, ConnectionSampler
+from .database_user import DatabaseUser
+from .identity_index import Identity, IdentityIndex
 from .user import User
 from .user_info import UserInfo
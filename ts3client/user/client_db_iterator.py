@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Iterator
+
+from ..errors import DATABASE_EMPTY_RESULT_SET, TS3Error
+from ..ts3client_response import TS3ClientResponse
+from ..utils.parsers import dataclass_kwargs
+from .database_user import DatabaseUser
+
+if TYPE_CHECKING:
+    from ..ts3client import TS3Client
+
+
+class ClientDBIterator:
+    """
+    Iterates over all client identities in the server database, one clientdblist page at a time.
+    The next page is requested in the background while the current page is being processed.
+    The offset of the next identity to yield is kept in offset, so a scan that was interrupted,
+    e.g. by a reconnect, continues where it stopped when it is iterated again.
+
+    :param client: The client to query the database with.
+    :type client: TS3Client
+    :param page_size: The number of identities to request per page, defaults to 200.
+    :type page_size: int, optional
+    :param start: The offset to start at, defaults to 0.
+    :type start: int, optional
+    """
+
+    def __init__(self, client: TS3Client, page_size: int = 200, start: int = 0) -> None:
+        if page_size < 1:
+            raise ValueError("The page size must be at least 1.")
+
+        self.client = client
+        self.page_size = page_size
+        self.offset = start
+        self.total: int | None = None
+
+    def __iter__(self) -> Iterator[DatabaseUser]:
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ClientDBIterator")
+        try:
+            page: Future | None = executor.submit(self._fetch, self.offset)
+            while page is not None:
+                users = page.result()
+                page = None
+                if len(users) >= self.page_size:
+                    page = executor.submit(self._fetch, self.offset + len(users))
+
+                for user in users:
+                    # Counted before it is handed out, so breaking out and iterating again does not repeat it.
+                    self.offset += 1
+                    yield user
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def progress(self) -> float | None:
+        """The share of identities that have been yielded, or None while the total is unknown."""
+        if not self.total:
+            return None
+        return min(self.offset / self.total, 1.0)
+
+    def _fetch(self, start: int) -> list[DatabaseUser]:
+        try:
+            response = TS3ClientResponse(
+                self.client.query.commands.clientdblist(start=start, duration=self.page_size, count=self.total is None)
+            )
+        except TS3Error as e:
+            if e.id == DATABASE_EMPTY_RESULT_SET:
+                return []
+            raise
+
+        users = []
+        for row in response:
+            if "count" in row:
+                self.total = row["count"]
+            if "cldbid" in row:
+                users.append(DatabaseUser(**dataclass_kwargs(DatabaseUser, row)))
+
+        return users
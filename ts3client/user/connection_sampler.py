@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import threading
+import time
+from array import array
+from collections import deque
+from typing import TYPE_CHECKING, Optional
+
+from ..errors import INVALID_CLIENT_ID
+from ..ts3client_response import TS3ClientResponse
+from ..ts3query.ts3query_command import TS3QueryCommand
+
+if TYPE_CHECKING:
+    from ..ts3client import TS3Client
+
+# Series name: the clientinfo counter its rate is computed from.
+COUNTERS = {
+    "bytes_sent": "connection_bytes_sent_total",
+    "bytes_received": "connection_bytes_received_total",
+    "packets_sent": "connection_packets_sent_total",
+    "packets_received": "connection_packets_received_total",
+}
+
+
+class ClientSeries:
+    """
+    The rates of a client's connection counters per second, kept in array-backed ring buffers of a fixed capacity.
+
+    :param clid: The client ID.
+    :type clid: int
+    :param capacity: The number of samples to keep, defaults to 120.
+    :type capacity: int, optional
+    """
+
+    def __init__(self, clid: int, capacity: int = 120) -> None:
+        self.clid = clid
+        self.database_id: Optional[int] = None
+        self.nickname: Optional[str] = None
+        self.capacity = capacity
+        self._times = array("d", bytes(8 * capacity))
+        self._values = {name: array("f", bytes(4 * capacity)) for name in COUNTERS}
+        self._next = 0
+        self._length = 0
+        self._last: tuple[float, dict[str, int]] | None = None
+
+    def __len__(self) -> int:
+        return self._length
+
+    def add(self, timestamp: float, counters: dict[str, int]) -> bool:
+        """
+        Adds a sample of the counters and records their rates since the previous sample.
+        If a counter went backwards, e.g. because the client ID was reused, only the new counters are remembered.
+
+        :param timestamp: The time of the sample in seconds.
+        :type timestamp: float
+        :param counters: The counter values by series name.
+        :type counters: dict[str, int]
+        :return: Whether rates were recorded.
+        :rtype: bool
+        """
+        last, self._last = self._last, (timestamp, counters)
+        if last is None or timestamp <= last[0]:
+            return False
+        if any(counters.get(name, 0) < last[1].get(name, 0) for name in COUNTERS):
+            return False
+
+        elapsed = timestamp - last[0]
+        self._times[self._next] = timestamp
+        for name, values in self._values.items():
+            values[self._next] = (counters.get(name, 0) - last[1].get(name, 0)) / elapsed
+        self._next = (self._next + 1) % self.capacity
+        self._length = min(self._length + 1, self.capacity)
+        return True
+
+    def times(self) -> list[float]:
+        """Returns the times of the recorded rates, oldest first."""
+        return [self._times[i] for i in self._indices()]
+
+    def values(self, name: str) -> list[float]:
+        """
+        Returns the recorded rates of a series, oldest first.
+
+        :param name: The series, one of bytes_sent, bytes_received, packets_sent or packets_received.
+        :type name: str
+        :return: The rates per second.
+        :rtype: list[float]
+        """
+        values = self._values[name]
+        return [values[i] for i in self._indices()]
+
+    def latest(self, name: str) -> float:
+        """Returns the newest rate of a series, 0 if none was recorded yet."""
+        return self._values[name][(self._next - 1) % self.capacity] if self._length else 0.0
+
+    def mean(self, name: str, since: float = None) -> float:
+        """
+        Returns the average rate of a series.
+
+        :param name: The series.
+        :type name: str
+        :param since: Only average rates recorded at or after this time, defaults to None (all).
+        :type since: float, optional
+        :return: The average rate per second, 0 if none was recorded.
+        :rtype: float
+        """
+        values = self._values[name]
+        selected = [values[i] for i in self._indices() if since is None or self._times[i] >= since]
+        return sum(selected) / len(selected) if selected else 0.0
+
+    def _indices(self) -> list[int]:
+        start = (self._next - self._length) % self.capacity
+        return [(start + i) % self.capacity for i in range(self._length)]
+
+
+class ConnectionSampler:
+    """
+    Samples the connection counters of all connected clients while sending at most budget commands per sample().
+    Clients are visited in rotation with pipelined clientinfo commands, the client list is refreshed with clientlist
+    once per rotation. Rates are computed from the deltas of the byte and packet counters and kept per client, so
+    top() and series() answer from memory without querying the server.
+
+    :param client: The client to sample with.
+    :type client: TS3Client
+    :param budget: The maximum number of commands per sample, defaults to 10.
+    :type budget: int, optional
+    :param history: The number of rates to keep per client, defaults to 120.
+    :type history: int, optional
+    """
+
+    def __init__(self, client: TS3Client, budget: int = 10, history: int = 120) -> None:
+        if budget < 2:
+            raise ValueError("The budget must allow for clientlist and at least one clientinfo.")
+
+        self.client = client
+        self.budget = budget
+        self.history = history
+        self._series: dict[int, ClientSeries] = {}
+        self._rotation: deque[int] = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def __contains__(self, clid: int) -> bool:
+        return clid in self._series
+
+    def series(self, clid: int) -> ClientSeries | None:
+        return self._series.get(clid)
+
+    def sample(self) -> int:
+        """
+        Samples the next clients in the rotation.
+
+        :return: The number of commands sent.
+        :rtype: int
+        """
+        sent = 0
+        if not self._rotation:
+            self._refresh()
+            sent += 1
+
+        with self._lock:
+            clids = [self._rotation.popleft() for _ in range(min(self.budget - sent, len(self._rotation)))]
+        if not clids:
+            return sent
+
+        commands = [TS3QueryCommand("clientinfo", kwargs={"clid": clid}) for clid in clids]
+        responses = self.client.query.send_batch(commands)
+        timestamp = time.monotonic()
+        with self._lock:
+            for clid, response in zip(clids, responses):
+                series = self._series.get(clid)
+                if series is None:
+                    continue
+                if response.error_id == INVALID_CLIENT_ID:
+                    del self._series[clid]
+                    continue
+                if response.error_id != 0:
+                    continue
+
+                row = response.data.get(0, {})
+                series.database_id = row.get("client_database_id", series.database_id)
+                series.nickname = row.get("client_nickname", series.nickname)
+                series.add(timestamp, {name: row.get(counter, 0) for name, counter in COUNTERS.items()})
+        return sent + len(commands)
+
+    def run(self, stop: threading.Event, interval: float = 1) -> None:
+        """
+        Calls sample() every interval seconds until stop is set.
+
+        :param stop: Stops sampling when set.
+        :type stop: threading.Event
+        :param interval: The interval in seconds, defaults to 1.
+        :type interval: float, optional
+        """
+        while not stop.is_set():
+            self.sample()
+            stop.wait(interval)
+
+    def top(self, n: int = 10, by: str = "bytes", window: float = None) -> list[ClientSeries]:
+        """
+        Returns the clients with the highest average rates, without querying the server.
+
+        :param n: The number of clients, defaults to 10.
+        :type n: int, optional
+        :param by: The series to rank by, or "bytes" / "packets" for sent and received combined, defaults to "bytes".
+        :type by: str, optional
+        :param window: Only consider rates from the last window seconds, defaults to None (the whole history).
+        :type window: float, optional
+        :return: The clients, highest rate first.
+        :rtype: list[ClientSeries]
+        """
+        names = [f"{by}_sent", f"{by}_received"] if by in ("bytes", "packets") else [by]
+        since = time.monotonic() - window if window is not None else None
+        with self._lock:
+            ranked = [
+                (sum(series.mean(name, since) for name in names), series)
+                for series in self._series.values()
+                if len(series)
+            ]
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        return [series for _, series in ranked[:n]]
+
+    def _refresh(self) -> None:
+        rows = [row for row in TS3ClientResponse(self.client.query.commands.clientlist()) if "clid" in row]
+        connected = [row["clid"] for row in rows if row.get("client_type", 0) == 0]
+        with self._lock:
+            for clid in set(self._series) - set(connected):
+                del self._series[clid]
+            for row in rows:
+                if row["clid"] in connected and row["clid"] not in self._series:
+                    self._series[row["clid"]] = ClientSeries(row["clid"], self.history)
+                    self._series[row["clid"]].nickname = row.get("client_nickname")
+            self._rotation.extend(connected)
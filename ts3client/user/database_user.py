@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class DatabaseUser:
+    cldbid: int
+    client_unique_identifier: Optional[str] = None
+    client_nickname: Optional[str] = None
+    client_created: Optional[int] = None
+    client_lastconnected: Optional[int] = None
+    client_totalconnections: Optional[int] = None
+    client_description: Optional[str] = None
+    client_lastip: Optional[str] = None
+    client_login_name: Optional[str] = None
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional
+
+from ..event import ClientEnterViewEvent, ClientLeftViewEvent
+from ..ts3query.ts3query_cache import CONTEXT_COMMANDS
+
+if TYPE_CHECKING:
+    from ..ts3query.ts3query_command import TS3QueryCommand
+    from ..ts3query.ts3query_response import TS3QueryResponse
+
+
+@dataclass
+class Identity:
+    unique_id: str
+    database_id: Optional[int] = None
+    nickname: Optional[str] = None
+    client_ids: set[int] = field(default_factory=set)
+
+
+class IdentityIndex:
+    """
+    A bidirectional index of client identities, mapping unique IDs, database IDs,
+    client IDs and nicknames onto each other. It is fed from every query response
+    that contains identity information and evicts the least recently used identities
+    once max_entries is reached. Unique IDs the server does not know are remembered
+    for negative_ttl seconds, and so are clients that are not connected, unless they
+    connect before. The index is cleared when the virtual server or the login changes.
+
+    :param max_entries: The maximum number of identities to keep, defaults to 50000.
+    :type max_entries: int, optional
+    :param negative_ttl: Seconds to remember unknown unique IDs, defaults to 300.
+    :type negative_ttl: float, optional
+    """
+
+    def __init__(self, max_entries: int = 50000, negative_ttl: float = 300) -> None:
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self._by_unique_id: OrderedDict[str, Identity] = OrderedDict()
+        self._unique_id_by_database_id: dict[int, str] = {}
+        self._unique_id_by_client_id: dict[int, str] = {}
+        self._unknown: dict[str, float] = {}
+        self._offline: dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._by_unique_id)
+
+    def __contains__(self, unique_id: str) -> bool:
+        return unique_id in self._by_unique_id
+
+    def update(
+        self,
+        unique_id: str,
+        database_id: Optional[int] = None,
+        client_id: Optional[int] = None,
+        nickname: Optional[str] = None,
+    ) -> Identity | None:
+        """
+        Adds or updates an identity. Values that are None are left unchanged.
+
+        :param unique_id: The unique ID of the client.
+        :type unique_id: str
+        :param database_id: The database ID of the client, defaults to None.
+        :type database_id: int, optional
+        :param client_id: The client ID of a connection of the client, defaults to None.
+        :type client_id: int, optional
+        :param nickname: The nickname of the client, defaults to None.
+        :type nickname: str, optional
+        :return: The updated identity.
+        :rtype: Identity | None
+        """
+        if not unique_id:
+            return None
+
+        unique_id = str(unique_id)
+        with self._lock:
+            self._unknown.pop(unique_id, None)
+            if client_id is not None:
+                self._offline.pop(unique_id, None)
+            identity = self._by_unique_id.get(unique_id)
+            if identity is None:
+                identity = self._by_unique_id[unique_id] = Identity(unique_id)
+            self._by_unique_id.move_to_end(unique_id)
+
+            if database_id is not None:
+                identity.database_id = database_id
+                self._unique_id_by_database_id[database_id] = unique_id
+            if client_id is not None:
+                previous = self._unique_id_by_client_id.get(client_id)
+                if previous is not None and previous != unique_id and previous in self._by_unique_id:
+                    self._by_unique_id[previous].client_ids.discard(client_id)
+                identity.client_ids.add(client_id)
+                self._unique_id_by_client_id[client_id] = unique_id
+            if nickname is not None:
+                identity.nickname = str(nickname)
+
+            while len(self._by_unique_id) > self.max_entries:
+                self._evict(next(iter(self._by_unique_id)))
+
+            return identity
+
+    def by_unique_id(self, unique_id: str) -> Identity | None:
+        with self._lock:
+            identity = self._by_unique_id.get(unique_id)
+            if identity is not None:
+                self._by_unique_id.move_to_end(unique_id)
+            return identity
+
+    def by_database_id(self, database_id: int) -> Identity | None:
+        with self._lock:
+            unique_id = self._unique_id_by_database_id.get(database_id)
+            return self.by_unique_id(unique_id) if unique_id is not None else None
+
+    def by_client_id(self, client_id: int) -> Identity | None:
+        with self._lock:
+            unique_id = self._unique_id_by_client_id.get(client_id)
+            return self.by_unique_id(unique_id) if unique_id is not None else None
+
+    def mark_unknown(self, unique_id: str) -> None:
+        """Remembers that the server does not know the given unique ID."""
+        with self._lock:
+            self._unknown[unique_id] = time.monotonic() + self.negative_ttl
+
+    def is_unknown(self, unique_id: str) -> bool:
+        """Checks whether the unique ID is known to be unknown to the server."""
+        with self._lock:
+            expires = self._unknown.get(unique_id)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self._unknown[unique_id]
+                return False
+            return True
+
+    def mark_offline(self, unique_id: str) -> None:
+        """Remembers that the client with the given unique ID is not connected."""
+        with self._lock:
+            self._offline[unique_id] = time.monotonic() + self.negative_ttl
+
+    def is_offline(self, unique_id: str) -> bool:
+        """Checks whether the client is known to be not connected, until it enters the view again."""
+        with self._lock:
+            expires = self._offline.get(unique_id)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self._offline[unique_id]
+                return False
+            return True
+
+    def forget_client_id(self, client_id: int) -> None:
+        """Removes a client ID, e.g. after the client disconnected."""
+        with self._lock:
+            unique_id = self._unique_id_by_client_id.pop(client_id, None)
+            if unique_id is not None and unique_id in self._by_unique_id:
+                self._by_unique_id[unique_id].client_ids.discard(client_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_unique_id.clear()
+            self._unique_id_by_database_id.clear()
+            self._unique_id_by_client_id.clear()
+            self._unknown.clear()
+            self._offline.clear()
+
+    def feed(self, command: TS3QueryCommand, response: TS3QueryResponse) -> None:
+        """
+        Extracts identities from a query response. Meant to be registered as a response hook.
+
+        :param command: The command that was sent.
+        :type command: TS3QueryCommand
+        :param response: The response from the server.
+        :type response: TS3QueryResponse
+        """
+        for event in response.events:
+            if isinstance(event, ClientEnterViewEvent):
+                self.update(
+                    event.client_unique_identifier,
+                    event.client_database_id,
+                    event.clid,
+                    event.client_nickname,
+                )
+            elif isinstance(event, ClientLeftViewEvent) and event.clid is not None:
+                self.forget_client_id(event.clid)
+
+        if response.error_id != 0:
+            return
+
+        if command.command in CONTEXT_COMMANDS:
+            # Database IDs and client IDs belong to a virtual server.
+            self.clear()
+            return
+
+        rows = list(response.data.values())
+
+        match command.command:
+            case "clientlist":
+                self._feed_clientlist(rows)
+            case "clientdblist":
+                for row in rows:
+                    self.update(
+                        row.get("client_unique_identifier"), row.get("cldbid"), None, row.get("client_nickname")
+                    )
+            case "clientinfo":
+                for row in rows:
+                    self.update(
+                        row.get("client_unique_identifier"),
+                        row.get("client_database_id"),
+                        command.kwargs.get("clid"),
+                        row.get("client_nickname"),
+                    )
+            case "clientgetids":
+                for row in rows:
+                    self.update(row.get("cluid"), None, row.get("clid"), row.get("name"))
+            case "clientgetdbidfromuid" | "clientgetnamefromuid" | "clientgetnamefromdbid":
+                for row in rows:
+                    self.update(row.get("cluid"), row.get("cldbid"), None, row.get("name"))
+            case "clientgetuidfromclid":
+                for row in rows:
+                    self.update(row.get("cluid"), None, row.get("clid"), row.get("nickname"))
+
+    def _feed_clientlist(self, rows: list[dict]) -> None:
+        if not any("client_unique_identifier" in row for row in rows):
+            return
+
+        with self._lock:
+            # A full client list is authoritative for the client IDs that are currently in use.
+            for client_id in list(self._unique_id_by_client_id):
+                self.forget_client_id(client_id)
+            for row in rows:
+                self.update(
+                    row.get("client_unique_identifier"),
+                    row.get("client_database_id"),
+                    row.get("clid"),
+                    row.get("client_nickname"),
+                )
+
+    def _evict(self, unique_id: str) -> None:
+        identity = self._by_unique_id.pop(unique_id)
+        if self._unique_id_by_database_id.get(identity.database_id) == unique_id:
+            del self._unique_id_by_database_id[identity.database_id]
+        for client_id in identity.client_ids:
+            if self._unique_id_by_client_id.get(client_id) == unique_id:
+                del self._unique_id_by_client_id[client_id]
@@ -1,4 +1,5 @@
 import re
+from dataclasses import fields
 
 from ..constants import EventType
 from ..event import (
@@ -44,10 +45,27 @@ def response_to_dict(response: str) -> dict:
     return response_dict
 
 
+def dataclass_kwargs(cls: type, data: dict) -> dict:
+    """Filters a dict down to the fields of a dataclass, dropping properties it does not declare."""
+    names = {f.name for f in fields(cls) if f.init}
+    return {key: value for key, value in data.items() if key in names}
+
+
+def value_to_query(value: str | int | float | bool) -> str:
+    return boolean_to_literal(value) if isinstance(value, bool) else string_to_query(value)
+
+
 def dict_to_query_kwargs(parameters: dict) -> list[str]:
-    """Converts a dict to a list of query kwargs."""
+    """
+    Converts a dict to a list of query kwargs.
+    List and tuple values are joined with "|", e.g. {"cldbid": [1, 2]} becomes "cldbid=1|cldbid=2".
+    """
     return [
-        f"{key}={boolean_to_literal(value) if isinstance(value, bool) else string_to_query(value)}"
+        (
+            "|".join(f"{key}={value_to_query(item)}" for item in value)
+            if isinstance(value, (list, tuple))
+            else f"{key}={value_to_query(value)}"
+        )
         for key, value in parameters.items()
     ]
 
@@ -79,27 +97,27 @@ def parse_event_match(re_match: re.Match[str]) -> Event:
 
     match event_type:
         case EventType.CHANNEL_CREATED:
-            return ChannelCreatedEvent(**data)
+            return ChannelCreatedEvent(**dataclass_kwargs(ChannelCreatedEvent, data))
         case EventType.CHANNEL_DELETED:
-            return ChannelDeletedEvent(**data)
+            return ChannelDeletedEvent(**dataclass_kwargs(ChannelDeletedEvent, data))
         case EventType.CHANNEL_DESCRIPTION_CHANGED:
-            return ChannelDescriptionChangedEvent(**data)
+            return ChannelDescriptionChangedEvent(**dataclass_kwargs(ChannelDescriptionChangedEvent, data))
         case EventType.CHANNEL_EDITED:
-            return ChannelEditedEvent(**data)
+            return ChannelEditedEvent(**dataclass_kwargs(ChannelEditedEvent, data))
         case EventType.CHANNEL_MOVED:
-            return ChannelMovedEvent(**data)
+            return ChannelMovedEvent(**dataclass_kwargs(ChannelMovedEvent, data))
         case EventType.CHANNEL_PASSWORD_CHANGED:
-            return ChannelPasswordChangedEvent(**data)
+            return ChannelPasswordChangedEvent(**dataclass_kwargs(ChannelPasswordChangedEvent, data))
         case EventType.CLIENT_ENTER_VIEW:
-            return ClientEnterViewEvent(**data)
+            return ClientEnterViewEvent(**dataclass_kwargs(ClientEnterViewEvent, data))
         case EventType.CLIENT_LEFT_VIEW:
-            return ClientLeftViewEvent(**data)
+            return ClientLeftViewEvent(**dataclass_kwargs(ClientLeftViewEvent, data))
         case EventType.CLIENT_MOVED:
-            return ClientMovedEvent(**data)
+            return ClientMovedEvent(**dataclass_kwargs(ClientMovedEvent, data))
         case EventType.SERVER_EDITED:
-            return ServerEditedEvent(**data)
+            return ServerEditedEvent(**dataclass_kwargs(ServerEditedEvent, data))
         case EventType.TOKEN_USED:
-            return TokenUsedEvent(**data)
+            return TokenUsedEvent(**dataclass_kwargs(TokenUsedEvent, data))
         case _:
             return Event()
 
@@ -8,3 +8,19 @@ MESSAGE = compile(
 EVENT = compile(
     r"notify(?P<event>(cliententerview|clientleftview|clientmoved|serveredited|channeldescriptionchanged|channeledited|channelcreated|channeldeleted|channelmoved|channelpasswordchanged)) .+\n\r"
 )
+LOG_LINE = compile(
+    r"(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(\.\d+)?)\|\s*(?P<level>\w+)\s*\|\s*(?P<channel>[^|]*?)\s*\|\s*(?P<sid>\d*)\s*\|\s?(?P<message>.*)"
+)
+# Messages of the server log by the kind of entry they belong to, client IDs are database IDs.
+LOG_KINDS = {
+    "connect": compile(r"client connected '(?P<client_name>.*?)'\(id:(?P<client_id>\d+)\)"),
+    "disconnect": compile(
+        r"client disconnected '(?P<client_name>.*?)'\(id:(?P<client_id>\d+)\) reason '(invokerid=(?P<invoker_id>\d+) invokername=.*? invokeruid=(?P<invoker_uid>\S+) )?"
+    ),
+    "ban": compile(r"ban added .* by client '.*?'\(id:(?P<invoker_id>\d+)\)"),
+    "servergroup": compile(
+        r"client '(?P<client_name>.*?)'\(id:(?P<client_id>\d+)\) was (added to|removed from) servergroup '.*?'\(id:\d+\) by client '.*?'\(id:(?P<invoker_id>\d+)\)"
+    ),
+    "channel": compile(r"channel '.*?'\(id:\d+\) \w+ by '.*?'\(id:(?P<invoker_id>\d+)\)"),
+    "permission": compile(r"permission '.*?'\(id:\d+\) .* by client '.*?'\(id:(?P<invoker_id>\d+)\)"),
+}
@@ -0,0 +1,2 @@
+from .fan_out import FanOut, FanOutResult
+from .session_pool import SessionPool
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Generic, Iterable, TypeVar
+
+from ..constants import TargetMode
+from ..ts3client_response import TS3ClientResponse
+from .session_pool import SessionPool
+
+if TYPE_CHECKING:
+    from ..ts3client import TS3Client
+
+T = TypeVar("T")
+
+
+@dataclass
+class FanOutResult(Generic[T]):
+    results: dict[int, T] = field(default_factory=dict)
+    errors: dict[int, Exception] = field(default_factory=dict)
+    servers: dict[int, dict] = field(default_factory=dict)
+    durations: dict[int, float] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def raise_first(self) -> None:
+        """Raises the error of the first server that failed, if any."""
+        for error in self.errors.values():
+            raise error
+
+
+class FanOut:
+    """
+    Runs an operation against many virtual servers of an instance at once, each on its own pooled session.
+    The operation is called with a session that has the virtual server selected and the server's serverlist row,
+    so a fan-out takes as long as the slowest server rather than the sum of all of them.
+
+    :param pool: The sessions to run the operations on.
+    :type pool: SessionPool
+    """
+
+    def __init__(self, pool: SessionPool) -> None:
+        self.pool = pool
+
+    def servers(self, online: bool = True) -> list[dict]:
+        """
+        Lists the virtual servers of the instance.
+
+        :param online: Whether to only list servers that are online, defaults to True.
+        :type online: bool, optional
+        :return: The serverlist rows.
+        :rtype: list[dict]
+        """
+        with self.pool.session() as client:
+            rows = [row for row in TS3ClientResponse(client.query.commands.serverlist()) if "virtualserver_id" in row]
+        if online:
+            rows = [row for row in rows if row.get("virtualserver_status") == "online"]
+        return rows
+
+    def run(
+        self,
+        operation: Callable[[TS3Client, dict], T],
+        servers: Iterable[int | dict] = None,
+        online: bool = True,
+    ) -> FanOutResult[T]:
+        """
+        Runs an operation against every virtual server concurrently and collects the results and errors.
+        An exception raised for one server does not affect the others.
+
+        :param operation: Called with a session that has the server selected and the server's serverlist row.
+        :type operation: Callable[[TS3Client, dict], T]
+        :param servers: Server IDs or serverlist rows, defaults to None (all servers in serverlist).
+        :type servers: Iterable[int | dict], optional
+        :param online: Whether to skip servers that are not online when listing them, defaults to True.
+        :type online: bool, optional
+        :return: The results and errors per server ID.
+        :rtype: FanOutResult
+        """
+        rows = self.servers(online) if servers is None else [self._row(server) for server in servers]
+        result: FanOutResult[T] = FanOutResult(servers={row["virtualserver_id"]: row for row in rows})
+        if not rows:
+            return result
+
+        with ThreadPoolExecutor(max_workers=min(self.pool.size, len(rows)), thread_name_prefix="FanOut") as executor:
+            futures = {row["virtualserver_id"]: executor.submit(self._call, operation, row) for row in rows}
+
+        for sid, future in futures.items():
+            try:
+                result.results[sid], result.durations[sid] = future.result()
+            except Exception as e:
+                result.errors[sid] = e
+        return result
+
+    def broadcast(self, message: str, servers: Iterable[int | dict] = None) -> FanOutResult[Any]:
+        """
+        Sends a server message to every virtual server.
+
+        :param message: The message.
+        :type message: str
+        :param servers: Server IDs or serverlist rows, defaults to None (all online servers).
+        :type servers: Iterable[int | dict], optional
+        :return: The responses and errors per server ID.
+        :rtype: FanOutResult
+        """
+        return self.run(
+            lambda client, row: client.send_message(row["virtualserver_id"], TargetMode.SERVER, message), servers
+        )
+
+    def _call(self, operation: Callable[[TS3Client, dict], T], row: dict) -> tuple[T, float]:
+        with self.pool.session(row["virtualserver_id"]) as client:
+            start = time.monotonic()
+            return operation(client, row), time.monotonic() - start
+
+    @staticmethod
+    def _row(server: int | dict) -> dict:
+        return server if isinstance(server, dict) else {"virtualserver_id": server}
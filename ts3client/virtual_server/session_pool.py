@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Iterator
+
+from ..ts3client_response import TS3ClientResponse
+
+if TYPE_CHECKING:
+    from ..ts3client import TS3Client
+
+
+class SessionPool:
+    """
+    A pool of query sessions to one server instance, each logged in on its own connection.
+    Sessions are opened when they are first needed, up to size at once, and reused afterwards. A session remembers the
+    virtual server it has selected, so acquiring one for the same server again does not send another use.
+
+    :param host: The host of the server instance, defaults to None.
+    :type host: str, optional
+    :param port: The query port of the server instance, defaults to None.
+    :type port: int, optional
+    :param login: The query login, defaults to None.
+    :type login: str, optional
+    :param password: The query password, defaults to None.
+    :type password: str, optional
+    :param size: The maximum number of open sessions, defaults to 8.
+    :type size: int, optional
+    :param timeout: The timeout of each connection, defaults to 10.
+    :type timeout: int, optional
+    :param factory: Creates a connected and logged in client, defaults to None (connect to host and port).
+    :type factory: Callable[[], TS3Client], optional
+    """
+
+    def __init__(
+        self,
+        host: str = None,
+        port: int = None,
+        login: str = None,
+        password: str = None,
+        size: int = 8,
+        timeout: int = 10,
+        factory: Callable[[], TS3Client] = None,
+    ) -> None:
+        if size < 1:
+            raise ValueError("The pool must hold at least one session.")
+        if factory is None and (not host or not port):
+            raise ValueError("Either a host and port or a factory is required.")
+
+        self.host = host
+        self.port = port
+        self.size = size
+        self.timeout = timeout
+        self._login = login
+        self._password = password
+        self._factory = factory or self._connect
+        self._idle: list[TS3Client] = []
+        self._selected: dict[int, int | None] = {}
+        self._open = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def __enter__(self) -> SessionPool:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def open(self) -> int:
+        """The number of open sessions."""
+        return self._open
+
+    @contextmanager
+    def session(self, sid: int = None) -> Iterator[TS3Client]:
+        """
+        Borrows a session, waiting for one to become free if size sessions are in use.
+        A session that raised an exception is closed instead of being returned to the pool.
+
+        :param sid: The virtual server to select on the session, defaults to None (leave the selection as is).
+        :type sid: int, optional
+        :raises RuntimeError: If the pool is closed.
+        :return: A context manager that yields the session.
+        :rtype: Iterator[TS3Client]
+        """
+        client = self._acquire(sid)
+        try:
+            if sid is not None and self._selected.get(id(client)) != sid:
+                self._selected[id(client)] = None
+                TS3ClientResponse(client.query.commands.use(sid=sid))
+                self._selected[id(client)] = sid
+        except BaseException:
+            self._discard(client)
+            raise
+
+        try:
+            yield client
+        except BaseException:
+            self._discard(client)
+            raise
+        self._release(client)
+
+    def close(self) -> None:
+        """Closes all idle sessions, sessions still in use are closed when they are returned."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        for client in idle:
+            self._discard(client)
+
+    def _acquire(self, sid: int | None) -> TS3Client:
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("The session pool is closed.")
+                if self._idle:
+                    # Prefer a session that already has the server selected.
+                    for i, client in enumerate(self._idle):
+                        if self._selected.get(id(client)) == sid:
+                            return self._idle.pop(i)
+                    return self._idle.pop()
+                if self._open < self.size:
+                    self._open += 1
+                    break
+                self._condition.wait()
+
+        try:
+            return self._factory()
+        except BaseException:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, client: TS3Client) -> None:
+        with self._condition:
+            if not self._closed:
+                self._idle.append(client)
+                self._condition.notify()
+                return
+        self._discard(client)
+
+    def _discard(self, client: TS3Client) -> None:
+        with self._condition:
+            self._selected.pop(id(client), None)
+            self._open -= 1
+            self._condition.notify()
+        try:
+            client.disconnect()
+        except Exception:
+            pass
+
+    def _connect(self) -> TS3Client:
+        from ..ts3client import TS3Client
+
+        client = TS3Client()
+        client.connect(self.host, self.port, self.timeout)
+        if self._login and self._password:
+            client.login(self._login, self._password)
+        return client